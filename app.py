@@ -1,21 +1,52 @@
 import os
 import re
 import html
+import gzip
+import json
+import time
+import fcntl
+import sqlite3
+import socket
+import ipaddress
+import zlib
+import hmac
+import base64
+import hashlib
+import queue
 import datetime
+import threading
 import requests
 import xml.etree.ElementTree as ET
-from urllib.parse import urljoin, urlencode, quote
-from concurrent.futures import ThreadPoolExecutor
-
+from io import BytesIO
+from urllib.parse import urljoin, urlencode, quote, urlparse
+from email.utils import parsedate_to_datetime
+from functools import wraps, partial
+from collections import defaultdict, deque
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+import click
 import feedparser
 from bs4 import BeautifulSoup
-from flask import Flask, render_template, request, jsonify, Response, make_response
+from flask import Flask, render_template, request, jsonify, Response, make_response, redirect, send_file, abort
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import or_
-from sqlalchemy.orm import joinedload
+from sqlalchemy import or_, tuple_, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import joinedload, defer
 from sqlalchemy.sql import func
 from flask_migrate import Migrate
 
+try:
+    import brotli
+except ImportError: # Optional: responses fall back to gzip without it
+    brotli = None
+try:
+    from PIL import Image
+except ImportError: # Optional: without it the image proxy caches and serves originals at every width
+    Image = None
+
 # --- App Configuration ---
 basedir = os.path.abspath(os.path.dirname(__file__))
 data_dir = os.environ.get('DATA_DIR', basedir)
@@ -27,6 +58,162 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db = SQLAlchemy(app)
 migrate = Migrate(app, db)
 
+# --- SQLite Tuning ---
+# Four gunicorn workers and their scheduler threads share app.db. WAL lets readers keep going while a
+# refresh commits, and busy_timeout makes a second writer wait its turn instead of failing with
+# "database is locked". Set SQLITE_JOURNAL_MODE=DELETE if DATA_DIR is on a network filesystem (no WAL there).
+SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL').upper()
+SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL').upper()
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 30000))
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+# Page cache per connection; negative values are in KiB (-65536 = 64 MiB)
+SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -65536))
+
+if SQLITE_JOURNAL_MODE not in ('WAL', 'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'OFF'):
+    raise ValueError(f"Unsupported SQLITE_JOURNAL_MODE: {SQLITE_JOURNAL_MODE}")
+if SQLITE_SYNCHRONOUS not in ('OFF', 'NORMAL', 'FULL', 'EXTRA'):
+    raise ValueError(f"Unsupported SQLITE_SYNCHRONOUS: {SQLITE_SYNCHRONOUS}")
+
+@event.listens_for(Engine, 'connect')
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Runs on every new pooled connection, so each worker and thread gets the same settings."""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    # busy_timeout goes first so switching the journal mode also waits out other connections
+    cursor.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+    # Only takes effect on a brand-new file (and has to come before WAL for that) or at the next full VACUUM.
+    # INCREMENTAL lets cleanup jobs give space back; older databases switch with `flask enable-incremental-vacuum`.
+    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    cursor.execute(f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size = {SQLITE_CACHE_SIZE}")
+    cursor.close()
+
+# --- Background Refresh Configuration ---
+# Refreshing is owned by a scheduler thread in each gunicorn worker; a file lock in
+# DATA_DIR makes sure only one of them runs a job at any given time.
+# REFRESH_INTERVAL_MINUTES is the fastest any feed gets polled; quiet feeds back off towards MAX_POLL_MINUTES.
+REFRESH_INTERVAL_MINUTES = int(os.environ.get('REFRESH_INTERVAL_MINUTES', 15))
+MAX_POLL_MINUTES = int(os.environ.get('MAX_POLL_MINUTES', 24 * 60))
+FETCH_TIMEOUT_SECONDS = int(os.environ.get('FETCH_TIMEOUT_SECONDS', 30))
+# Total feeds fetched at once, and how many of those may hit the same host (reddit.com, RSS-Bridge, ...).
+# The per-host limit keeps one host from being asked for dozens of feeds at once; below about 8 a host that
+# serves half the subscriptions becomes the bottleneck of the whole refresh (see bench/fetch_1000_feeds.py).
+FETCH_CONCURRENCY = int(os.environ.get('FETCH_CONCURRENCY', 32))
+FETCH_PER_HOST_LIMIT = int(os.environ.get('FETCH_PER_HOST_LIMIT', 8))
+# Processes used to parse and normalize fetched feeds during a refresh (0 parses in the fetch threads instead).
+# Refreshes of fewer than PARSE_POOL_MIN_FEEDS feeds parse inline; the pool is started by the first larger one
+# and kept for the life of the worker, since each process imports the whole app.
+PARSE_WORKERS = int(os.environ.get('PARSE_WORKERS', os.cpu_count() or 1))
+PARSE_POOL_MIN_FEEDS = int(os.environ.get('PARSE_POOL_MIN_FEEDS', 16))
+SCHEDULER_POLL_SECONDS = int(os.environ.get('SCHEDULER_POLL_SECONDS', 5))
+SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', '1') == '1'
+JOB_HISTORY_DAYS = int(os.environ.get('JOB_HISTORY_DAYS', 7))
+# How many of its latest fetches are kept per feed for /api/feeds/health
+FETCH_HISTORY_SIZE = int(os.environ.get('FETCH_HISTORY_SIZE', 20))
+# Ingest writes are committed in transactions of up to WRITE_BATCH_ROWS rows or WRITE_BATCH_MS milliseconds;
+# producers block once WRITE_QUEUE_SIZE writes are waiting
+WRITE_BATCH_ROWS = int(os.environ.get('WRITE_BATCH_ROWS', 500))
+WRITE_BATCH_MS = int(os.environ.get('WRITE_BATCH_MS', 200))
+WRITE_QUEUE_SIZE = int(os.environ.get('WRITE_QUEUE_SIZE', 64))
+
+# --- Response Caching & Compression ---
+# A counter in DATA_DIR is bumped on every write, so read endpoints can answer If-None-Match without a query.
+data_version_path = os.path.join(data_dir, 'data.version')
+# Long refreshes bump it at most this often while new articles are being stored, not only when they finish
+DATA_VERSION_BUMP_SECONDS = 2
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 500))
+# Rendered /api/articles pages are kept in a small SQLite file shared by all workers (0 disables it)
+view_cache_path = os.path.join(data_dir, 'view_cache.db')
+VIEW_CACHE_MAX_ENTRIES = int(os.environ.get('VIEW_CACHE_MAX_ENTRIES', 500))
+
+# --- Event Stream ---
+# Ingest and flag changes are appended to the event table in the same transaction that makes them, so every
+# worker can stream them to its /api/events clients in commit order. Streams check for new rows every
+# EVENT_POLL_SECONDS and end after EVENT_STREAM_SECONDS (the browser reconnects where it left off); the newest
+# EVENT_LOG_SIZE events are kept for clients catching up after a reconnect.
+EVENT_POLL_SECONDS = float(os.environ.get('EVENT_POLL_SECONDS', 1))
+EVENT_STREAM_SECONDS = int(os.environ.get('EVENT_STREAM_SECONDS', 300))
+EVENT_LOG_SIZE = int(os.environ.get('EVENT_LOG_SIZE', 10000))
+
+# --- Image Proxy ---
+# Article images go through /img/<width>/, which fetches each image once, keeps it downscaled to IMAGE_WIDTHS in
+# DATA_DIR/images and evicts the least recently used files past IMAGE_CACHE_MAX_MB. IMAGE_PROXY_ENABLED=0 loads
+# images straight from their origin again; IMAGE_PREFETCH=1 builds the thumbnails of new articles during refresh.
+IMAGE_PROXY_ENABLED = os.environ.get('IMAGE_PROXY_ENABLED', '1') == '1'
+IMAGE_PREFETCH = os.environ.get('IMAGE_PREFETCH', '0') == '1'
+image_cache_dir = os.path.join(data_dir, 'images')
+IMAGE_CACHE_MAX_MB = int(os.environ.get('IMAGE_CACHE_MAX_MB', 512))
+IMAGE_WIDTHS = (320, 640, 1280)
+IMAGE_MAX_SOURCE_BYTES = 20 * 1024 * 1024
+IMAGE_CACHE_MAX_AGE = 365 * 24 * 3600
+
+# --- Retention ---
+# Cleanup jobs delete what each feed's retention policy lets go, RETENTION_BATCH_SIZE articles at a time
+# (oldest first), then hand freed pages back with incremental_vacuum. These are the defaults for feeds
+# without a policy of their own; unset keeps everything. Scheduled cleanups run every RETENTION_INTERVAL_HOURS.
+RETENTION_MAX_AGE_DAYS = int(os.environ['RETENTION_MAX_AGE_DAYS']) if os.environ.get('RETENTION_MAX_AGE_DAYS') else None
+RETENTION_KEEP_LAST = int(os.environ['RETENTION_KEEP_LAST']) if os.environ.get('RETENTION_KEEP_LAST') else None
+RETENTION_INTERVAL_HOURS = int(os.environ.get('RETENTION_INTERVAL_HOURS', 24))
+RETENTION_BATCH_SIZE = int(os.environ.get('RETENTION_BATCH_SIZE', 500))
+# Largest age a cleanup or feed policy accepts; far past it, now - age falls before datetime.min
+RETENTION_AGE_LIMIT_DAYS = 36500
+VACUUM_PAGES_PER_STEP = 2000
+
+# How many of each feed's newest articles the smart-capped "All" view shows
+SMART_CAP_SIZE = int(os.environ.get('SMART_CAP_SIZE', 10))
+# Category, custom stream and sites/videos/threads views over at most this many feeds are read as a merge
+# of per-feed index ranges; larger ones walk the global published index, which is cheap when the view holds
+# a big share of all articles. SQLite allows at most 500 arms in a UNION ALL.
+FEED_MERGE_MAX_FEEDS = min(int(os.environ.get('FEED_MERGE_MAX_FEEDS', 200)), 500)
+
+# Searches with at most this many matches are ranked by relevance (bm25); more common ones list their
+# newest SEARCH_RANK_CANDIDATES matches by date, since ranking them takes a pass over much of the index.
+SEARCH_RANK_CANDIDATES = int(os.environ.get('SEARCH_RANK_CANDIDATES', 2000))
+
+# Max links per "link IN (...)" lookup when deduplicating entries, kept under SQLite's variable limit
+DEDUP_CHUNK_SIZE = 500
+scheduler_lock_path = os.path.join(data_dir, 'scheduler.lock')
+
+# --- Feed Discovery ---
+# Adding a page URL probes it, the usual feed paths and its <link rel="alternate"> feed in parallel, all within
+# DISCOVERY_TIMEOUT_SECONDS. What a URL resolved to (and RSS-Bridge's answer for it) is remembered for
+# DISCOVERY_CACHE_DAYS; a URL without a feed is given up on for DISCOVERY_MISS_CACHE_MINUTES.
+DISCOVERY_TIMEOUT_SECONDS = int(os.environ.get('DISCOVERY_TIMEOUT_SECONDS', 10))
+DISCOVERY_CACHE_DAYS = int(os.environ.get('DISCOVERY_CACHE_DAYS', 7))
+DISCOVERY_MISS_CACHE_MINUTES = int(os.environ.get('DISCOVERY_MISS_CACHE_MINUTES', 60))
+DISCOVERY_SUFFIXES = ('/feed', '/atom.xml', '/rss.xml', '/rss')
+
+# --- Feed Kinds ---
+# Platforms that get special treatment, matched against the feed URL in order: (platform, URL substring, kind).
+# A feed's kind is stored on Feed.kind when it's added (and recomputed for every feed at startup), and picks
+# the Videos/Posts/Sites view it shows up in. Supporting a new platform is one line here.
+FEED_PLATFORMS = [
+    ('youtube', 'youtube.com', 'video'),
+    ('vimeo', 'vimeo.com', 'video'),
+    ('dailymotion', 'dailymotion.com', 'video'),
+    ('tiktok', 'tiktok', 'video'),
+    ('reddit', 'reddit.com', 'thread'),
+    ('lemmy', 'lemmy.world', 'thread'),
+]
+DEFAULT_FEED_KIND = 'site'
+# /api/articles view_type -> the Feed.kind it lists
+KIND_VIEWS = {'videos': 'video', 'threads': 'thread', 'sites': 'site'}
+
+def feed_platform(url):
+    """The FEED_PLATFORMS name matching a feed URL, or None for an ordinary site."""
+    url = (url or '').lower()
+    return next((platform for platform, pattern, _ in FEED_PLATFORMS if pattern in url), None)
+
+def classify_feed(url):
+    url = (url or '').lower()
+    return next((kind for _, pattern, kind in FEED_PLATFORMS if pattern in url), DEFAULT_FEED_KIND)
+
+def _default_feed_kind(context):
+    return classify_feed(context.get_current_parameters().get('url'))
+
 # --- Database Models ---
 
 custom_stream_feeds = db.Table('custom_stream_feeds',
@@ -45,20 +232,47 @@ class Feed(db.Model):
     title = db.Column(db.String(200), nullable=False)
     url = db.Column(db.String(500), unique=True, nullable=False)
     articles = db.relationship('Article', backref='feed', lazy=True, cascade="all, delete-orphan")
+    fetches = db.relationship('FeedFetch', lazy=True, cascade="all, delete-orphan")
     deleted_at = db.Column(db.DateTime(timezone=False), nullable=True)
     category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
     exclude_from_all = db.Column(db.Boolean, default=False, nullable=False)
     etag = db.Column(db.String(200), nullable=True)
     last_modified = db.Column(db.String(200), nullable=True)
     layout_style = db.Column(db.String(20), nullable=True)
+    last_fetched_at = db.Column(db.DateTime(timezone=False), nullable=True)
+    next_fetch_at = db.Column(db.DateTime(timezone=False), nullable=True)
+    avg_post_interval = db.Column(db.Float, nullable=True) # seconds between posts, smoothed across fetches
+    unchanged_streak = db.Column(db.Integer, default=0, nullable=False) # fetches in a row with nothing new
+    poll_hint = db.Column(db.Integer, nullable=True) # seconds the server/feed asks us to wait between polls
+    content_hash = db.Column(db.String(64), nullable=True) # sha256 of the last response body
+    entries_hash = db.Column(db.String(64), nullable=True) # sha256 of the last ingested entry id list
+    retention_keep_last = db.Column(db.Integer, nullable=True) # cleanup keeps this many newest articles (None = default)
+    retention_max_age_days = db.Column(db.Integer, nullable=True) # cleanup drops articles older than this (None = default)
+    # video, thread or site; filled from the URL on insert (bulk inserts included), see FEED_PLATFORMS
+    kind = db.Column(db.String(20), nullable=False, default=_default_feed_kind, index=True)
     custom_streams = db.relationship('CustomStream', secondary=custom_stream_feeds, lazy='dynamic', back_populates='feeds')
 
 class Article(db.Model):
+    # Matched to the /api/articles views: per-feed and global "newest first", author pages, and the
+    # unread/favorites/read-later filters as partial indexes so they only hold the rows they select.
+    __table_args__ = (
+        db.Index('ix_article_feed_published', 'feed_id', 'published'),
+        db.Index('ix_article_published', 'published'),
+        db.Index('ix_article_author_published', 'author', 'published'),
+        db.Index('ix_article_unread_published', 'published', sqlite_where=db.text('is_read = 0')),
+        db.Index('ix_article_favorite_published', 'published', sqlite_where=db.text('is_favorite = 1')),
+        db.Index('ix_article_read_later_published', 'published', sqlite_where=db.text('is_read_later = 1')),
+        # Only each feed's newest SMART_CAP_SIZE rows carry a feed_rank, so these stay small
+        db.Index('ix_article_ranked_published', 'published', sqlite_where=db.text('feed_rank IS NOT NULL')),
+        db.Index('ix_article_ranked_feed', 'feed_id', sqlite_where=db.text('feed_rank IS NOT NULL')),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(300), nullable=False)
     link = db.Column(db.String(500), unique=True, nullable=False)
     summary = db.Column(db.Text)
-    full_content = db.Column(db.Text)
+    inline_content = db.Column('full_content', db.Text) # Bodies from before the content store; moved out at startup
+    content_hash = db.Column(db.String(64), nullable=True) # Key into article_content; NULL when there is no body
     image_url = db.Column(db.String(1000))
     author = db.Column(db.String(200))
     published = db.Column(db.DateTime(timezone=False))
@@ -66,6 +280,21 @@ class Article(db.Model):
     is_read_later = db.Column(db.Boolean, default=False)
     is_read = db.Column(db.Boolean, default=False) # <--- NEW COLUMN
     feed_id = db.Column(db.Integer, db.ForeignKey('feed.id'), nullable=False)
+    feed_rank = db.Column(db.Integer, nullable=True) # 1 = newest in its feed; NULL beyond SMART_CAP_SIZE
+
+    @property
+    def full_content(self):
+        """The article body, read from the content store only when asked for."""
+        if self.content_hash:
+            return load_content(self.content_hash)
+        return self.inline_content
+
+class ArticleContent(db.Model):
+    """Article bodies, zlib-compressed and keyed by the sha256 of the HTML, so a post syndicated into several
+    feeds is stored once. refs counts the articles pointing at a row; triggers keep it and drop unused rows."""
+    hash = db.Column(db.String(64), primary_key=True)
+    body = db.Column(db.LargeBinary, nullable=False)
+    refs = db.Column(db.Integer, nullable=False, default=0)
 
 class CustomStream(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -74,6 +303,55 @@ class CustomStream(db.Model):
     feeds = db.relationship('Feed', secondary=custom_stream_feeds, lazy='dynamic', back_populates='custom_streams')
     deleted_at = db.Column(db.DateTime(timezone=False), nullable=True)
 
+class AppSetting(db.Model):
+    """Key/value store for app-wide state that must survive restarts."""
+    key = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.String(200), nullable=True)
+
+class FeedFetch(db.Model):
+    """One fetch of a feed during a refresh; the newest FETCH_HISTORY_SIZE per feed are kept."""
+    id = db.Column(db.Integer, primary_key=True)
+    feed_id = db.Column(db.Integer, db.ForeignKey('feed.id'), nullable=False, index=True)
+    fetched_at = db.Column(db.DateTime(timezone=False), nullable=False)
+    status = db.Column(db.Integer, nullable=True) # HTTP status; NULL when the request itself failed
+    error = db.Column(db.String(200), nullable=True)
+    not_modified = db.Column(db.Boolean, nullable=False, default=False) # 304, or a body identical to last time
+    wait_ms = db.Column(db.Integer, nullable=True) # request sent until headers received (DNS, connect, TLS, TTFB)
+    download_ms = db.Column(db.Integer, nullable=True)
+    parse_ms = db.Column(db.Integer, nullable=True)
+    bytes = db.Column(db.Integer, nullable=True)
+    entries_count = db.Column(db.Integer, nullable=True)
+    added_count = db.Column(db.Integer, nullable=False, default=0)
+
+class DiscoveryCache(db.Model):
+    """What feed discovery found for a URL: the feed URL, or NULL when there was none. RSS-Bridge lookups are
+    stored under their findbridge URL."""
+    url = db.Column(db.String(2048), primary_key=True)
+    feed_url = db.Column(db.String(2048), nullable=True)
+    checked_at = db.Column(db.DateTime(timezone=False), nullable=False, default=datetime.datetime.now)
+
+class Event(db.Model):
+    """One entry of the change log behind /api/events. Clients resume from an id, so AUTOINCREMENT keeps ids from
+    being handed out again after old rows are pruned."""
+    __table_args__ = {'sqlite_autoincrement': True}
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False) # articles, flags, changed
+    data = db.Column(db.Text, nullable=False) # JSON payload sent to clients as is
+    created_at = db.Column(db.DateTime(timezone=False), nullable=False, default=datetime.datetime.now)
+
+class Job(db.Model):
+    """A unit of background work queued through the API and run by the scheduler."""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False, default='refresh')
+    status = db.Column(db.String(20), nullable=False, default='queued') # queued, running, done, failed
+    trigger = db.Column(db.String(20), nullable=False, default='user') # user, schedule
+    force = db.Column(db.Boolean, default=False, nullable=False)
+    params = db.Column(db.Text, nullable=True) # JSON arguments for kinds that take any (cleanup, import)
+    result = db.Column(db.Text, nullable=True) # JSON summary, updated with progress while running
+    created_at = db.Column(db.DateTime(timezone=False), nullable=False, default=datetime.datetime.now)
+    started_at = db.Column(db.DateTime(timezone=False), nullable=True)
+    finished_at = db.Column(db.DateTime(timezone=False), nullable=True)
+
 # --- Helper Functions ---
 
 def clean_text(text, strip_html_tags=True):
@@ -144,117 +422,349 @@ def find_image_url(entry):
     
     return None
 
-def _update_articles_for_feed(feed_instance, feed_data):
-    """Parses feed data and adds new articles to the database."""
-    added_count = 0
-    is_youtube_feed = 'youtube.com' in feed_instance.url
-    is_dailymotion_feed = 'dailymotion.com' in feed_instance.url
-
-    for entry in feed_data.entries:
-        if Article.query.filter_by(link=entry.link).first():
-            continue
-
-        published_time = None
-        for field in ['published_parsed', 'updated_parsed', 'created_parsed']:
-            if field in entry and entry[field]:
-                try:
-                    published_time = datetime.datetime(*entry[field][:6])
-                    break
-                except ValueError: pass
-        
-        if not published_time:
-            raw_date = entry.get('published') or entry.get('updated') or entry.get('created')
-            if raw_date:
+def _existing_article_links(links):
+    """Returns which of the given links are already stored, using one IN query per chunk."""
+    links = list(links)
+    existing = set()
+    for i in range(0, len(links), DEDUP_CHUNK_SIZE):
+        chunk = links[i:i + DEDUP_CHUNK_SIZE]
+        existing.update(link for (link,) in db.session.query(Article.link).filter(Article.link.in_(chunk)))
+    return existing
+
+def _normalize_entry(entry, feed_url, feed_title, platform=None):
+    """Turns a feedparser entry into the plain dict of Article columns we store (minus feed_id)."""
+    is_youtube_feed = platform == 'youtube'
+    is_dailymotion_feed = platform == 'dailymotion'
+
+    published_time = None
+    for field in ['published_parsed', 'updated_parsed', 'created_parsed']:
+        if field in entry and entry[field]:
+            try:
+                published_time = datetime.datetime(*entry[field][:6])
+                break
+            except ValueError: pass
+    
+    if not published_time:
+        raw_date = entry.get('published') or entry.get('updated') or entry.get('created')
+        if raw_date:
+            try:
+                published_time = datetime.datetime.strptime(raw_date, '%Y-%m-%d')
+            except ValueError:
                 try:
-                    published_time = datetime.datetime.strptime(raw_date, '%Y-%m-%d')
+                    temp_time = datetime.datetime.strptime(raw_date, '%m-%d')
+                    published_time = temp_time.replace(year=datetime.datetime.now().year)
                 except ValueError:
-                    try:
-                        temp_time = datetime.datetime.strptime(raw_date, '%m-%d')
-                        published_time = temp_time.replace(year=datetime.datetime.now().year)
-                    except ValueError:
-                        pass
-
-        if not published_time:
-            published_time = datetime.datetime.now()
-
-        content_html = next((item['value'] for item in entry.get('content', []) if 'value' in item), entry.get('summary', ''))
-        summary_text = clean_text(entry.get('summary', ''), strip_html_tags=True)
-        if not summary_text and content_html:
-            summary_text = clean_text(content_html, strip_html_tags=True)
-        
-        smart_summary = smart_truncate(summary_text, length=300)
-        
-        raw_title = entry.get('title', 'Untitled Article')
-        clean_title = clean_text(raw_title, strip_html_tags=True)
-        generic_titles = ['tik tok', 'tiktok', 'video', 'untitled article', 'untitled']
+                    pass
+
+    if not published_time:
+        published_time = datetime.datetime.now()
+
+    content_html = next((item['value'] for item in entry.get('content', []) if 'value' in item), entry.get('summary', ''))
+    summary_text = clean_text(entry.get('summary', ''), strip_html_tags=True)
+    if not summary_text and content_html:
+        summary_text = clean_text(content_html, strip_html_tags=True)
+    
+    smart_summary = smart_truncate(summary_text, length=300)
+    
+    raw_title = entry.get('title', 'Untitled Article')
+    clean_title = clean_text(raw_title, strip_html_tags=True)
+    generic_titles = ['tik tok', 'tiktok', 'video', 'untitled article', 'untitled']
+    
+    if clean_title.lower().strip() in generic_titles:
+        soup = BeautifulSoup(content_html, 'html.parser')
+        text_content = soup.get_text(separator=' ', strip=True)
+        if text_content:
+            clean_title = smart_truncate(text_content, length=100)
+
+    image_url_found = None
+    if is_youtube_feed:
+        try:
+            video_id_match = re.search(r'(?:watch\?v=|shorts\/)([a-zA-Z0-9_-]+)', entry.link)
+            if video_id_match:
+                video_id = video_id_match.group(1)
+                image_url_found = f'https://img.youtube.com/vi/{video_id}/maxresdefault.jpg'
+        except Exception as e:
+            print(f"Error extracting YouTube video ID: {e}")
+    elif is_dailymotion_feed:
+        try:
+            dm_id_match = re.search(r'/video/([a-zA-Z0-9]+)', entry.link)
+            if dm_id_match:
+                dm_id = dm_id_match.group(1)
+                image_url_found = f'https://www.dailymotion.com/thumbnail/video/{dm_id}'
+        except Exception as e:
+             print(f"Error extracting DailyMotion video ID: {e}")
+
+    if not image_url_found:
+        image_url_found = find_image_url(entry)
+    
+    if image_url_found and 'i.pinimg.com' in image_url_found:
+        hi_res_url = re.sub(r'\/(\d+x|236x)\/', '/originals/', image_url_found)
+        if hi_res_url == image_url_found:
+            hi_res_url = re.sub(r'\/(\d+x|236x)\/', '/736x/', image_url_found)
+        image_url_found = hi_res_url if hi_res_url != image_url_found else image_url_found
+
+    if image_url_found and 'behance.net' in image_url_found:
+        image_url_found = image_url_found.replace('/projects/404/', '/projects/max_1200/')
+    
+    author_name = clean_text(entry.get('author', ''), strip_html_tags=True)
+    if not author_name:
+        author_name = clean_text(entry.get('dc_creator', ''), strip_html_tags=True)
+    
+    if (not author_name or author_name == 'Unknown Author') and platform in ('dailymotion', 'tiktok', 'vimeo'):
+         author_name = feed_title
+    
+    if not author_name:
+        author_name = 'Unknown Author'
+
+    return {
+        'title': clean_title,
+        'link': entry.link,
+        'summary': smart_summary,
+        'full_content': clean_text(content_html, strip_html_tags=False),
+        'image_url': image_url_found,
+        'author': author_name,
+        'published': published_time,
+    }
+
+def _articles_from_feed_data(feed_data, feed_url, feed_title):
+    """Normalizes every linkable entry of a parsed feed."""
+    platform = feed_platform(feed_url)
+    return [_normalize_entry(entry, feed_url, feed_title, platform) for entry in feed_data.entries if entry.get('link')]
+
+def _insert_new_articles(feed_id, articles):
+    """Inserts the normalized articles that aren't stored yet, in the caller's transaction. Returns how many."""
+    # Dedup the whole feed against the DB up front instead of one SELECT per entry
+    seen_links = _existing_article_links({article['link'] for article in articles})
+    new_articles = []
+
+    for article in articles:
+        if article['link'] in seen_links:
+            continue
+        seen_links.add(article['link'])
+        new_articles.append(dict(article, feed_id=feed_id))
         
-        if clean_title.lower().strip() in generic_titles:
-            soup = BeautifulSoup(content_html, 'html.parser')
-            text_content = soup.get_text(separator=' ', strip=True)
-            if text_content:
-                clean_title = smart_truncate(text_content, length=100)
-
-        image_url_found = None
-        if is_youtube_feed:
+    if new_articles:
+        contents = {}
+        for article in new_articles:
+            body = article.pop('full_content', None)
+            article['content_hash'] = hashlib.sha256(body.encode()).hexdigest() if body else None
+            if body:
+                contents.setdefault(article['content_hash'], body)
+        if contents:
+            _store_contents(contents)
+        article_ids = list(db.session.scalars(db.insert(Article).returning(Article.id), new_articles))
+        _rerank_feed(feed_id)
+        record_event('articles', {'feed_id': feed_id, 'ids': article_ids}, [feed_id])
+    return len(new_articles)
+
+def _update_articles_for_feed(feed_instance, articles):
+    """Adds the normalized articles that aren't stored yet to the database, through the write queue."""
+    added_count = submit_write(partial(_insert_new_articles, feed_instance.id, articles), rows=len(articles)).result()
+    if added_count:
+        invalidate_feed_views([feed_instance.id])
+        prefetch_images(article['image_url'] for article in articles)
+    return added_count
+
+def _rerank_feed(feed_id):
+    """Moves feed_rank onto the feed's newest SMART_CAP_SIZE articles. Touches at most 2 x SMART_CAP_SIZE rows."""
+    top_ids = [article_id for (article_id,) in db.session.query(Article.id)
+               .filter(Article.feed_id == feed_id)
+               .order_by(Article.published.desc(), Article.id.desc())
+               .limit(SMART_CAP_SIZE)]
+    Article.query.filter(Article.feed_id == feed_id, Article.feed_rank.isnot(None)).update(
+        {Article.feed_rank: None}, synchronize_session=False)
+    if top_ids:
+        db.session.execute(db.update(Article), [{'id': article_id, 'feed_rank': rank} for rank, article_id in enumerate(top_ids, 1)])
+
+def rerank_all_feeds():
+    """Recomputes feed_rank for every feed in two set-based statements (startup and after bulk deletes)."""
+    db.session.execute(db.text("UPDATE article SET feed_rank = NULL WHERE feed_rank IS NOT NULL"))
+    db.session.execute(db.text("""
+        UPDATE article SET feed_rank = ranked.rn
+        FROM (SELECT id, row_number() OVER (PARTITION BY feed_id ORDER BY published DESC, id DESC) AS rn FROM article) AS ranked
+        WHERE article.id = ranked.id AND ranked.rn <= :cap"""), {'cap': SMART_CAP_SIZE})
+    db.session.commit()
+
+# --- Write Queue ---
+# Ingest writes in a process all go through one writer thread. It packs whatever is queued into
+# transactions of at most WRITE_BATCH_ROWS rows or WRITE_BATCH_MS, so the SQLite write lock is only
+# ever held briefly, and a full queue makes producers (refreshes, add_feed, cleanup) wait their turn.
+_write_queue = None
+_writer_started_pid = None
+_writer_start_lock = threading.Lock()
+_write_stats = {'batches': 0, 'ops': 0, 'rows': 0, 'failed_ops': 0, 'split_batches': 0}
+_batch_durations_ms = deque(maxlen=1000)
+_op_latencies_ms = deque(maxlen=1000)
+
+def _start_writer():
+    """Starts this process's writer thread (once per gunicorn worker)."""
+    global _write_queue, _writer_started_pid
+    with _writer_start_lock:
+        if _writer_started_pid == os.getpid():
+            return
+        _writer_started_pid = os.getpid()
+        _write_queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+    threading.Thread(target=_writer_loop, name='db-writer', daemon=True).start()
+
+def submit_write(fn, rows=1):
+    """Queues fn() to run inside the writer thread's transaction, blocking while the queue is full.
+
+    Returns a Future that resolves to fn's return value once its transaction has committed.
+    Callers must not hold an open write transaction while they wait on it.
+    """
+    if _writer_started_pid != os.getpid():
+        _start_writer()
+    op = {'fn': fn, 'rows': max(rows, 1), 'future': Future(), 'queued_at': time.monotonic()}
+    _write_queue.put(op)
+    return op['future']
+
+def _writer_loop():
+    with app.app_context():
+        while True:
+            op = _write_queue.get()
             try:
-                video_id_match = re.search(r'(?:watch\?v=|shorts\/)([a-zA-Z0-9_-]+)', entry.link)
-                if video_id_match:
-                    video_id = video_id_match.group(1)
-                    image_url_found = f'https://img.youtube.com/vi/{video_id}/maxresdefault.jpg'
-            except Exception as e:
-                print(f"Error extracting YouTube video ID: {e}")
-        elif is_dailymotion_feed:
+                _apply_write_batch(op)
+            except Exception as e: # Keep the writer alive; the ops' futures already carry the error
+                print(f"Write batch failed: {e}", flush=True)
+            finally:
+                db.session.remove()
+
+def _apply_write_batch(first_op):
+    """Runs first_op plus whatever else is queued, up to the row/time budget, in one transaction."""
+    started = time.monotonic()
+    batch = [first_op]
+    results = []
+    try:
+        results.append(first_op['fn']())
+        rows = first_op['rows']
+        while rows < WRITE_BATCH_ROWS and (time.monotonic() - started) * 1000 < WRITE_BATCH_MS:
             try:
-                dm_id_match = re.search(r'/video/([a-zA-Z0-9]+)', entry.link)
-                if dm_id_match:
-                    dm_id = dm_id_match.group(1)
-                    image_url_found = f'https://www.dailymotion.com/thumbnail/video/{dm_id}'
+                op = _write_queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(op)
+            rows += op['rows']
+            results.append(op['fn']())
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        # Something in the batch failed: give every op its own transaction so the rest still land
+        _write_stats['split_batches'] += 1
+        for op in batch:
+            op_started = time.monotonic()
+            try:
+                result = op['fn']()
+                db.session.commit()
             except Exception as e:
-                 print(f"Error extracting DailyMotion video ID: {e}")
+                db.session.rollback()
+                _write_stats['failed_ops'] += 1
+                op['future'].set_exception(e)
+            else:
+                op['future'].set_result(result)
+            _record_write_batch([op], op_started)
+        return
+
+    for op, result in zip(batch, results):
+        op['future'].set_result(result)
+    _record_write_batch(batch, started)
+
+def _record_write_batch(batch, started):
+    now = time.monotonic()
+    _batch_durations_ms.append((now - started) * 1000)
+    _op_latencies_ms.extend((now - op['queued_at']) * 1000 for op in batch)
+    _write_stats['batches'] += 1
+    _write_stats['ops'] += len(batch)
+    _write_stats['rows'] += sum(op['rows'] for op in batch)
+
+def _percentiles(values):
+    values = sorted(values)
+    if not values:
+        return None
+    return {'p50': round(values[len(values) // 2], 1), 'p95': round(values[int(len(values) * 0.95)], 1), 'max': round(values[-1], 1)}
+
+def get_write_stats():
+    """Write queue counters for this worker process, with latencies over the last 1000 batches/ops."""
+    return dict(
+        _write_stats,
+        queued=_write_queue.qsize() if _write_queue else 0,
+        queue_size=WRITE_QUEUE_SIZE,
+        rows_per_batch=round(_write_stats['rows'] / _write_stats['batches'], 1) if _write_stats['batches'] else None,
+        transaction_ms=_percentiles(_batch_durations_ms),
+        latency_ms=_percentiles(_op_latencies_ms), # From submit_write until committed, queueing included
+    )
+
+SY_UPDATE_PERIODS = {'hourly': 3600, 'daily': 86400, 'weekly': 604800, 'monthly': 2592000, 'yearly': 31536000}
+
+def _poll_hint_seconds(headers, channel=None):
+    """Returns the longest polling interval the response headers or the feed channel ask for, if any."""
+    hints = []
+
+    cache_control = headers.get('cache-control', '')
+    max_age = re.search(r'max-age=(\d+)', cache_control)
+    if max_age and 'no-cache' not in cache_control:
+        hints.append(int(max_age.group(1)))
+    elif headers.get('expires'):
+        try:
+            expires = parsedate_to_datetime(headers['expires'])
+            hints.append(int((expires - datetime.datetime.now(expires.tzinfo)).total_seconds()))
+        except (TypeError, ValueError): pass
 
-        if not image_url_found:
-            image_url_found = find_image_url(entry)
-        
-        if image_url_found and 'i.pinimg.com' in image_url_found:
-            hi_res_url = re.sub(r'\/(\d+x|236x)\/', '/originals/', image_url_found)
-            if hi_res_url == image_url_found:
-                hi_res_url = re.sub(r'\/(\d+x|236x)\/', '/736x/', image_url_found)
-            image_url_found = hi_res_url if hi_res_url != image_url_found else image_url_found
-
-        if image_url_found and 'behance.net' in image_url_found:
-            image_url_found = image_url_found.replace('/projects/404/', '/projects/max_1200/')
-        
-        author_name = clean_text(entry.get('author', ''), strip_html_tags=True)
-        if not author_name:
-            author_name = clean_text(entry.get('dc_creator', ''), strip_html_tags=True)
-        
-        if (not author_name or author_name == 'Unknown Author') and (is_dailymotion_feed or 'tiktok' in feed_instance.url or 'vimeo' in feed_instance.url):
-             author_name = feed_instance.title
-        
-        if not author_name:
-            author_name = 'Unknown Author'
-
-        new_article = Article(
-            title=clean_title,
-            link=entry.link,
-            summary=smart_summary,
-            full_content=clean_text(content_html, strip_html_tags=False),
-            image_url=image_url_found,
-            author=author_name,
-            published=published_time,
-            feed_id=feed_instance.id
-        )
-        db.session.add(new_article)
-        added_count += 1
-        
-    if added_count > 0:
-        db.session.commit()
-    return added_count
+    channel = channel or {}
+    try:
+        if channel.get('ttl'):
+            hints.append(int(channel['ttl']) * 60)
+    except (TypeError, ValueError): pass
+
+    period = SY_UPDATE_PERIODS.get((channel.get('sy_updateperiod') or '').strip().lower())
+    if period:
+        try:
+            frequency = max(int(channel.get('sy_updatefrequency') or 1), 1)
+        except (TypeError, ValueError):
+            frequency = 1
+        hints.append(period // frequency)
+
+    hints = [h for h in hints if h > 0]
+    return min(max(hints), MAX_POLL_MINUTES * 60) if hints else None
+
+def _observed_post_interval(feed_data):
+    """Average seconds between the entries in a fetched feed, or None if it can't be told."""
+    times = []
+    for entry in feed_data.entries:
+        parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+        if parsed:
+            try:
+                times.append(datetime.datetime(*parsed[:6]).timestamp())
+            except ValueError: pass
+    times.sort()
+    if len(times) < 2 or times[-1] == times[0]:
+        return None
+    return (times[-1] - times[0]) / (len(times) - 1)
+
+def _schedule_next_fetch(feed, now, added_count, post_interval=None, poll_hint=None):
+    """Sets feed.next_fetch_at from its posting cadence, how often it came back unchanged, and server hints."""
+    if post_interval:
+        feed.avg_post_interval = post_interval if not feed.avg_post_interval else (feed.avg_post_interval + post_interval) / 2
+    if poll_hint is not None:
+        feed.poll_hint = poll_hint
+
+    feed.unchanged_streak = 0 if added_count else (feed.unchanged_streak or 0) + 1
+
+    min_seconds = REFRESH_INTERVAL_MINUTES * 60
+    # Poll roughly twice per expected post, then back off while the feed keeps coming back empty
+    interval = feed.avg_post_interval / 2 if feed.avg_post_interval else min_seconds
+    interval *= 1.5 ** min(feed.unchanged_streak, 10)
+    if feed.poll_hint:
+        interval = max(interval, feed.poll_hint)
+    interval = max(min_seconds, min(interval, MAX_POLL_MINUTES * 60))
+
+    feed.last_fetched_at = now
+    feed.next_fetch_at = now + datetime.timedelta(seconds=interval)
 
 def get_category_data(category):
     return {'id': category.id, 'name': category.name, 'layout_style': category.layout_style}
 
-def get_rss_bridge_feed(base_url, target_url):
+def get_rss_bridge_feed(base_url, target_url, raise_errors=False):
+    """The RSS-Bridge feed URL for target_url, or None when no bridge handles it (or on errors, unless raise_errors)."""
     try:
         find_url = f"{base_url}/?action=findbridge&url={quote(target_url)}"
         response = requests.get(find_url, timeout=10)
@@ -277,28 +787,824 @@ def get_rss_bridge_feed(base_url, target_url):
 
     except Exception as e:
         print(f"RSS-Bridge Error: {e}")
+        if raise_errors:
+            raise
         return None
 
+def _add_missing_columns(table, column_definitions):
+    """Adds any of the given columns that an older database is still missing."""
+    inspector = db.inspect(db.engine)
+    columns = [c['name'] for c in inspector.get_columns(table)]
+    for name, definition in column_definitions.items():
+        if name not in columns:
+            print(f"Migrating database: Adding '{name}' column to {table} table...")
+            with db.engine.connect() as conn:
+                conn.execute(db.text(f"ALTER TABLE {table} ADD COLUMN {name} {definition}"))
+                conn.commit()
+
+# --- Full-Text Search ---
+# article_fts is an external-content FTS5 index over article(title, summary, author); the triggers keep it in
+# step with every insert, delete and edit of those columns, whichever code path makes them.
+ARTICLE_FTS_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS article_fts USING fts5(
+        title, summary, author, content='article', content_rowid='id', tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER IF NOT EXISTS article_fts_insert AFTER INSERT ON article BEGIN
+        INSERT INTO article_fts(rowid, title, summary, author) VALUES (new.id, new.title, new.summary, new.author);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS article_fts_delete AFTER DELETE ON article BEGIN
+        INSERT INTO article_fts(article_fts, rowid, title, summary, author) VALUES ('delete', old.id, old.title, old.summary, old.author);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS article_fts_update AFTER UPDATE OF title, summary, author ON article BEGIN
+        INSERT INTO article_fts(article_fts, rowid, title, summary, author) VALUES ('delete', old.id, old.title, old.summary, old.author);
+        INSERT INTO article_fts(rowid, title, summary, author) VALUES (new.id, new.title, new.summary, new.author);
+    END""",
+]
+
+def _ensure_search_index():
+    """Creates the FTS index and its triggers, backfilling it the first time it appears on an existing DB."""
+    is_new = not db.inspect(db.engine).has_table('article_fts')
+    with db.engine.connect() as conn:
+        for statement in ARTICLE_FTS_SCHEMA:
+            conn.execute(db.text(statement))
+        conn.commit()
+    if is_new:
+        rebuild_search_index()
+
+def rebuild_search_index():
+    """Re-reads every article into the FTS index."""
+    print("Building article search index...")
+    with db.engine.connect() as conn:
+        conn.execute(db.text("INSERT INTO article_fts(article_fts) VALUES ('rebuild')"))
+        conn.commit()
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Rebuilds the article full-text search index from the article table."""
+    with app.app_context():
+        _ensure_search_index()
+        rebuild_search_index()
+    print("Search index rebuilt.")
+
+# --- Feed Counters ---
+# Unread/favorite/read-later/total counts per feed, kept current by triggers on article, so every write path
+# (ingest, mark_read, mark_all_read, the toggles, cleanup, feed deletes) updates them without extra code.
+FEED_COUNTER_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS feed_counter (
+        feed_id INTEGER PRIMARY KEY, total INTEGER NOT NULL DEFAULT 0, unread INTEGER NOT NULL DEFAULT 0,
+        favorites INTEGER NOT NULL DEFAULT 0, read_later INTEGER NOT NULL DEFAULT 0)""",
+    """CREATE TRIGGER IF NOT EXISTS feed_counter_insert AFTER INSERT ON article BEGIN
+        INSERT INTO feed_counter (feed_id, total, unread, favorites, read_later)
+        VALUES (new.feed_id, 1, new.is_read IS NOT 1, new.is_favorite IS 1, new.is_read_later IS 1)
+        ON CONFLICT (feed_id) DO UPDATE SET total = total + 1, unread = unread + excluded.unread,
+            favorites = favorites + excluded.favorites, read_later = read_later + excluded.read_later;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS feed_counter_delete AFTER DELETE ON article BEGIN
+        UPDATE feed_counter SET total = total - 1, unread = unread - (old.is_read IS NOT 1),
+            favorites = favorites - (old.is_favorite IS 1), read_later = read_later - (old.is_read_later IS 1)
+        WHERE feed_id = old.feed_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS feed_counter_update AFTER UPDATE OF is_read, is_favorite, is_read_later ON article
+    WHEN old.is_read IS NOT new.is_read OR old.is_favorite IS NOT new.is_favorite OR old.is_read_later IS NOT new.is_read_later
+    BEGIN
+        UPDATE feed_counter SET unread = unread + (new.is_read IS NOT 1) - (old.is_read IS NOT 1),
+            favorites = favorites + (new.is_favorite IS 1) - (old.is_favorite IS 1),
+            read_later = read_later + (new.is_read_later IS 1) - (old.is_read_later IS 1)
+        WHERE feed_id = new.feed_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS feed_counter_feed_delete AFTER DELETE ON feed BEGIN
+        DELETE FROM feed_counter WHERE feed_id = old.id;
+    END""",
+]
+
+FEED_COUNTS_SQL = """SELECT feed_id, COUNT(*) AS total, SUM(is_read IS NOT 1) AS unread,
+    SUM(is_favorite IS 1) AS favorites, SUM(is_read_later IS 1) AS read_later FROM article GROUP BY feed_id"""
+
+def _ensure_feed_counters():
+    """Creates the counter table and its triggers, filling it the first time it appears on an existing DB."""
+    is_new = not db.inspect(db.engine).has_table('feed_counter')
+    with db.engine.connect() as conn:
+        for statement in FEED_COUNTER_SCHEMA:
+            conn.execute(db.text(statement))
+        conn.commit()
+    if is_new:
+        rebuild_feed_counters()
+
+def rebuild_feed_counters():
+    """Recounts every feed from the article table, in one transaction."""
+    print("Counting articles per feed...")
+    with db.engine.connect() as conn:
+        conn.execute(db.text("DELETE FROM feed_counter"))
+        conn.execute(db.text(f"INSERT INTO feed_counter (feed_id, total, unread, favorites, read_later) {FEED_COUNTS_SQL}"))
+        conn.commit()
+
+def get_feed_counters(feed_ids=None):
+    """{feed_id: {'total', 'unread', 'favorites', 'read_later'}} from the counter table; one row per feed."""
+    query = db.text("SELECT feed_id, total, unread, favorites, read_later FROM feed_counter")
+    if feed_ids is not None:
+        query = db.text(f"{query.text} WHERE feed_id IN :feed_ids").bindparams(db.bindparam('feed_ids', expanding=True))
+    rows = db.session.execute(query, {'feed_ids': list(feed_ids)} if feed_ids is not None else {})
+    return {row.feed_id: {'total': row.total, 'unread': row.unread, 'favorites': row.favorites, 'read_later': row.read_later}
+            for row in rows}
+
+def _sum_counters(counters, feed_ids):
+    totals = {'total': 0, 'unread': 0, 'favorites': 0, 'read_later': 0}
+    for feed_id in feed_ids:
+        for key, value in counters.get(feed_id, {}).items():
+            totals[key] += value
+    return totals
+
+@app.cli.command('rebuild-counters')
+@click.option('--verify', is_flag=True, help='Only compare the counters with a fresh count; exit 1 if they drifted.')
+def rebuild_counters_command(verify):
+    """Rebuilds (or verifies) the per-feed unread/favorite/read-later counters."""
+    with app.app_context():
+        _ensure_feed_counters()
+        if not verify:
+            rebuild_feed_counters()
+            print("Counters rebuilt.")
+            return
+        stored = get_feed_counters()
+        actual = {row.feed_id: {'total': row.total, 'unread': row.unread, 'favorites': row.favorites, 'read_later': row.read_later}
+                  for row in db.session.execute(db.text(FEED_COUNTS_SQL))}
+        empty = {'total': 0, 'unread': 0, 'favorites': 0, 'read_later': 0}
+        drifted = [feed_id for feed_id in stored.keys() | actual.keys() if stored.get(feed_id, empty) != actual.get(feed_id, empty)]
+        for feed_id in sorted(drifted):
+            print(f"feed {feed_id}: stored {stored.get(feed_id, empty)}, actual {actual.get(feed_id, empty)}")
+        print(f"{len(drifted)} of {len(actual)} feeds drifted.")
+    if drifted:
+        raise SystemExit(1)
+
+# --- Content Store ---
+# Triggers on article keep article_content.refs equal to the number of articles using each body, and delete a
+# body once nothing points at it, so retention and feed deletes free the HTML without extra code.
+CONTENT_STORE_SCHEMA = [
+    """CREATE TRIGGER IF NOT EXISTS article_content_ref_insert AFTER INSERT ON article
+    WHEN new.content_hash IS NOT NULL BEGIN
+        UPDATE article_content SET refs = refs + 1 WHERE hash = new.content_hash;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS article_content_ref_delete AFTER DELETE ON article
+    WHEN old.content_hash IS NOT NULL BEGIN
+        UPDATE article_content SET refs = refs - 1 WHERE hash = old.content_hash;
+        DELETE FROM article_content WHERE hash = old.content_hash AND refs <= 0;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS article_content_ref_update AFTER UPDATE OF content_hash ON article
+    WHEN old.content_hash IS NOT new.content_hash BEGIN
+        UPDATE article_content SET refs = refs + 1 WHERE hash = new.content_hash;
+        UPDATE article_content SET refs = refs - 1 WHERE hash = old.content_hash;
+        DELETE FROM article_content WHERE hash = old.content_hash AND refs <= 0;
+    END""",
+]
+CONTENT_MIGRATION_BATCH = 500
+
+def _store_contents(contents):
+    """Compresses and saves the {hash: html} bodies that aren't stored yet, in the caller's transaction."""
+    existing = {h for (h,) in db.session.query(ArticleContent.hash).filter(ArticleContent.hash.in_(list(contents)))}
+    rows = [{'hash': h, 'body': zlib.compress(body.encode()), 'refs': 0} for h, body in contents.items() if h not in existing]
+    if rows:
+        # Another worker may store the same body between the check above and this insert; its row is as good as ours
+        db.session.execute(db.insert(ArticleContent).prefix_with('OR IGNORE'), rows)
+
+def load_content(content_hash):
+    row = db.session.get(ArticleContent, content_hash)
+    return zlib.decompress(row.body).decode() if row else None
+
+def _ensure_content_store():
+    """Creates the refcount triggers, then moves any inline article bodies into the store (once: finding
+    them takes a pass over the whole article table, and nothing writes inline bodies any more)."""
+    with db.engine.connect() as conn:
+        for statement in CONTENT_STORE_SCHEMA:
+            conn.execute(db.text(statement))
+        conn.commit()
+    if not db.session.get(AppSetting, 'inline_content_migrated'):
+        _migrate_inline_content()
+        db.session.merge(AppSetting(key='inline_content_migrated', value='1'))
+        db.session.commit()
+
+def _migrate_inline_content(batch_size=CONTENT_MIGRATION_BATCH):
+    """Moves article.full_content into article_content a batch at a time, walking ids in order, so memory stays
+    flat and an interrupted run resumes where it stopped. Returns how many articles were moved."""
+    last_id, moved = 0, 0
+    while True:
+        rows = db.session.execute(db.text(
+            "SELECT id, full_content FROM article WHERE id > :last_id AND full_content IS NOT NULL ORDER BY id LIMIT :limit"),
+            {'last_id': last_id, 'limit': batch_size}).all()
+        if not rows:
+            break
+        if not moved:
+            print("Moving article bodies into the content store...")
+        contents, updates = {}, []
+        for article_id, body in rows:
+            content_hash = hashlib.sha256(body.encode()).hexdigest() if body else None
+            if content_hash:
+                contents.setdefault(content_hash, body)
+            updates.append({'id': article_id, 'content_hash': content_hash, 'inline_content': None})
+        if contents:
+            _store_contents(contents)
+        db.session.execute(db.update(Article), updates)
+        db.session.commit()
+        last_id, moved = rows[-1][0], moved + len(rows)
+    if moved:
+        print(f"Moved {moved} article bodies.")
+    return moved
+
+def _fts_query(search_query):
+    """Turns search box text into an FTS5 query: "quoted phrases" match as phrases, other words as prefixes.
+    Every term is quoted, so operators (AND, OR, NEAR) and stray quotes are searched for as plain text."""
+    terms = []
+    for phrase, word in re.findall(r'"([^"]+)"|(\S+)', search_query):
+        if phrase:
+            terms.append('"' + phrase.replace('"', '""') + '"')
+        elif word.strip('"'):
+            terms.append('"' + word.strip('"').replace('"', '""') + '"*')
+    return ' '.join(terms)
+
+@app.cli.command('enable-incremental-vacuum')
+def enable_incremental_vacuum_command():
+    """Switches an existing database to auto_vacuum=INCREMENTAL. Runs one full VACUUM, so stop the app first."""
+    with app.app_context():
+        # Every connection already asks for INCREMENTAL; the VACUUM is what applies it to an existing file
+        db.session.execute(db.text("VACUUM"))
+        print(f"auto_vacuum is now {db.session.execute(db.text('PRAGMA auto_vacuum')).scalar()} (2 = incremental).")
+
 def initialize_database():
     with app.app_context():
         db.create_all()
         
-        # --- NEW: Manual Column Migration Check ---
-        # This ensures existing users get the 'is_read' column without deleting their DB
-        inspector = db.inspect(db.engine)
-        columns = [c['name'] for c in inspector.get_columns('article')]
-        if 'is_read' not in columns:
-            print("Migrating database: Adding 'is_read' column to Article table...")
-            with db.engine.connect() as conn:
-                conn.execute(db.text("ALTER TABLE article ADD COLUMN is_read BOOLEAN DEFAULT 0"))
-                conn.commit()
+        # --- Manual Column Migration Check ---
+        # This ensures existing users get new columns without deleting their DB
+        _add_missing_columns('article', {'is_read': 'BOOLEAN DEFAULT 0', 'feed_rank': 'INTEGER', 'content_hash': 'VARCHAR(64)'})
+        _add_missing_columns('feed', {
+            'last_fetched_at': 'DATETIME',
+            'next_fetch_at': 'DATETIME',
+            'avg_post_interval': 'FLOAT',
+            'unchanged_streak': 'INTEGER NOT NULL DEFAULT 0',
+            'poll_hint': 'INTEGER',
+            'content_hash': 'VARCHAR(64)',
+            'entries_hash': 'VARCHAR(64)',
+            'retention_keep_last': 'INTEGER',
+            'retention_max_age_days': 'INTEGER',
+            'kind': f"VARCHAR(20) NOT NULL DEFAULT '{DEFAULT_FEED_KIND}'",
+        })
+        _add_missing_columns('job', {'params': 'TEXT'})
         # ------------------------------------------
+        # create_all skips indexes on tables that already exist, so add any new ones here
+        for index in Article.__table__.indexes | Feed.__table__.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+        _classify_feeds()
+        _ensure_search_index()
+        _ensure_feed_counters()
+        _ensure_content_store()
+
+        # Re-rank when feed_rank is new or SMART_CAP_SIZE changed since the ranks were written
+        cap_setting = db.session.get(AppSetting, 'smart_cap_size')
+        if not cap_setting or cap_setting.value != str(SMART_CAP_SIZE):
+            print(f"Ranking each feed's newest {SMART_CAP_SIZE} articles for the All view...")
+            rerank_all_feeds()
+            db.session.merge(AppSetting(key='smart_cap_size', value=str(SMART_CAP_SIZE)))
+            db.session.commit()
+
+        # A new deploy may change what the read endpoints return, so don't let browsers reuse old copies
+        bump_data_version()
+        clear_view_cache(reset_stats=True)
 
         if not Category.query.filter_by(name='Uncategorized').first():
             db.session.add(Category(name='Uncategorized'))
             db.session.commit()
             print("Created 'Uncategorized' category.")
 
+def _classify_feeds():
+    """Recomputes Feed.kind from FEED_PLATFORMS: fills the new column, and reclassifies after a registry change."""
+    changes = [{'id': feed_id, 'kind': classify_feed(url)} for feed_id, url, kind in db.session.query(Feed.id, Feed.url, Feed.kind)
+               if classify_feed(url) != kind]
+    if changes:
+        db.session.execute(db.update(Feed), changes)
+        db.session.commit()
+        print(f"Classified {len(changes)} feeds.")
+
+def get_data_version():
+    try:
+        with open(data_version_path) as f:
+            fcntl.flock(f, fcntl.LOCK_SH)
+            return f.read().strip() or '0'
+    except FileNotFoundError:
+        return '0'
+
+def bump_data_version():
+    """Marks every cached /api/data and /api/articles response as stale, in all workers."""
+    with open(data_version_path, 'a+') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        f.seek(0)
+        current = f.read().strip()
+        # A fresh file starts from the clock so versions never repeat ones a browser saw before a reset
+        version = int(current) + 1 if current.isdigit() else int(time.time() * 1000)
+        f.seek(0)
+        f.truncate()
+        f.write(str(version))
+
+def conditional_on_data_version(view):
+    """Serves 304 Not Modified when the client's ETag matches the current data version, before the view runs."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        etag = f"{request.endpoint}-{get_data_version()}"
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            response = make_response(view(*args, **kwargs))
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return wrapper
+
+# Write endpoints that don't change anything the read endpoints return
+VERSION_NEUTRAL_ENDPOINTS = {'refresh_all_feeds', 'cleanup_articles'}
+
+@app.after_request
+def bump_version_after_write(response):
+    if (request.method in ('POST', 'PUT', 'DELETE') and response.status_code < 400
+            and request.endpoint not in VERSION_NEUTRAL_ENDPOINTS):
+        bump_data_version()
+    return response
+
+@app.after_request
+def compress_response(response):
+    """Brotli- or gzip-encodes JSON responses for clients that accept it."""
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or response.mimetype != 'application/json' or 'Content-Encoding' in response.headers):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+
+    if brotli and request.accept_encodings['br']:
+        response.set_data(brotli.compress(data, quality=5))
+        response.headers['Content-Encoding'] = 'br'
+    elif request.accept_encodings['gzip']:
+        response.set_data(gzip.compress(data, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        return response
+    response.vary.add('Accept-Encoding')
+    return response
+
+# --- View Cache ---
+# /api/articles pages are cached under their request args and tagged with what they depend on:
+# the view's scope ("feed:3", "category:2", "stream:5", "all", "videos", "favorites", "author", ...),
+# the same scope suffixed ":unread" for unread-only views, and "article:<id>" for every article on the page.
+# Writes invalidate tags; an invalidated tag drops every cached page of the views carrying it.
+VIEW_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS view_cache (key TEXT PRIMARY KEY, view TEXT NOT NULL, body BLOB NOT NULL, last_used REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS ix_view_cache_view ON view_cache (view);
+CREATE INDEX IF NOT EXISTS ix_view_cache_last_used ON view_cache (last_used);
+CREATE TABLE IF NOT EXISTS view_cache_tag (
+    tag TEXT NOT NULL,
+    key TEXT NOT NULL REFERENCES view_cache (key) ON DELETE CASCADE,
+    PRIMARY KEY (tag, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_view_cache_tag_key ON view_cache_tag (key);
+CREATE TABLE IF NOT EXISTS view_cache_stat (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO view_cache_stat VALUES ('hits', 0), ('misses', 0), ('invalidations', 0), ('epoch', 0);
+"""
+
+_view_cache_local = threading.local()
+
+def _view_cache_conn():
+    """One autocommit connection per thread; the schema is created on first use."""
+    conn = getattr(_view_cache_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(view_cache_path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF") # The cache is disposable, it only needs to be consistent
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.executescript(VIEW_CACHE_SCHEMA)
+        _view_cache_local.conn = conn
+    return conn
+
+def view_cache_get(key):
+    """Returns (body or None, epoch). Pass the epoch back to view_cache_put on a miss."""
+    conn = _view_cache_conn()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT body FROM view_cache WHERE key = ?", (key,)).fetchone()
+        if row:
+            conn.execute("UPDATE view_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+        conn.execute("UPDATE view_cache_stat SET value = value + 1 WHERE name = ?", ('hits' if row else 'misses',))
+        (epoch,) = conn.execute("SELECT value FROM view_cache_stat WHERE name = 'epoch'").fetchone()
+    return (row[0] if row else None), epoch
+
+def view_cache_put(key, view, body, tags, epoch):
+    """Stores a rendered page, unless something was invalidated since it was looked up (it may be stale)."""
+    conn = _view_cache_conn()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        (current_epoch,) = conn.execute("SELECT value FROM view_cache_stat WHERE name = 'epoch'").fetchone()
+        if current_epoch != epoch:
+            return
+        conn.execute("INSERT OR REPLACE INTO view_cache VALUES (?, ?, ?, ?)", (key, view, body, time.time()))
+        conn.executemany("INSERT OR IGNORE INTO view_cache_tag VALUES (?, ?)", [(tag, key) for tag in tags])
+        conn.execute("DELETE FROM view_cache WHERE key IN (SELECT key FROM view_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                     (VIEW_CACHE_MAX_ENTRIES,))
+
+def invalidate_views(tags):
+    """Drops every cached page of every view carrying one of the tags."""
+    if not VIEW_CACHE_MAX_ENTRIES:
+        return
+    tags = list(set(tags))
+    conn = _view_cache_conn()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        for start in range(0, len(tags), DEDUP_CHUNK_SIZE):
+            chunk = tags[start:start + DEDUP_CHUNK_SIZE]
+            conn.execute(f"""DELETE FROM view_cache WHERE view IN (
+                SELECT view_cache.view FROM view_cache_tag JOIN view_cache ON view_cache.key = view_cache_tag.key
+                WHERE view_cache_tag.tag IN ({','.join('?' * len(chunk))}))""", chunk)
+        # Bumping the epoch stops pages computed before this point from being stored afterwards
+        conn.execute("UPDATE view_cache_stat SET value = value + 1 WHERE name IN ('epoch', 'invalidations')")
+
+def clear_view_cache(reset_stats=False):
+    conn = _view_cache_conn()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM view_cache")
+        if reset_stats:
+            conn.execute("UPDATE view_cache_stat SET value = 0 WHERE name IN ('hits', 'misses', 'invalidations')")
+        conn.execute("UPDATE view_cache_stat SET value = value + 1 WHERE name IN ('epoch', 'invalidations')")
+
+def view_cache_stats():
+    conn = _view_cache_conn()
+    stats = dict(conn.execute("SELECT name, value FROM view_cache_stat"))
+    (entries,) = conn.execute("SELECT COUNT(*) FROM view_cache").fetchone()
+    lookups = stats['hits'] + stats['misses']
+    return {
+        'entries': entries,
+        'max_entries': VIEW_CACHE_MAX_ENTRIES,
+        'hits': stats['hits'],
+        'misses': stats['misses'],
+        'hit_rate': round(stats['hits'] / lookups, 3) if lookups else None,
+        'invalidations': stats['invalidations'],
+    }
+
+def _view_scope_tags(view_type, view_id=None):
+    """Scope tags for a cacheable view, or None when the view isn't cached."""
+    if view_type in ('feed', 'category', 'custom_stream'):
+        return [f"{'stream' if view_type == 'custom_stream' else view_type}:{view_id}"] if view_id else None
+    if view_type in ('all', 'sites', 'videos', 'threads', 'favorites', 'readLater', 'author'):
+        return [view_type]
+    return None
+
+def _feed_scope_tags(feed_ids):
+    """Scope tags of every view that can list articles from these feeds."""
+    tags = {'author'}
+    feeds = Feed.query.filter(Feed.id.in_(feed_ids)).all() if feed_ids else []
+    stream_links = db.session.query(custom_stream_feeds.c.custom_stream_id).filter(custom_stream_feeds.c.feed_id.in_(feed_ids)) if feed_ids else []
+    for feed in feeds:
+        tags.update({f"feed:{feed.id}", f"category:{feed.category_id}"})
+        tags.update(view for view, kind in KIND_VIEWS.items() if kind == feed.kind)
+        if not feed.exclude_from_all: tags.add('all')
+    tags.update(f"stream:{stream_id}" for (stream_id,) in stream_links)
+    return tags
+
+def invalidate_feed_views(feed_ids):
+    """After articles were added to or removed from these feeds."""
+    invalidate_views(_feed_scope_tags(feed_ids))
+
+def invalidate_article_views(article_ids, scope_tags=()):
+    """After the read/favorite/read-later state of these articles changed.
+
+    Pages showing them are dropped, plus unread-only views of their feeds (an article may
+    drop out of one without being on a cached page) and any extra view scopes passed in.
+    """
+    feed_ids = [feed_id for (feed_id,) in db.session.query(Article.feed_id).filter(Article.id.in_(article_ids)).distinct()]
+    tags = [f"article:{article_id}" for article_id in article_ids]
+    tags += [f"{tag}:unread" for tag in _feed_scope_tags(feed_ids) | {'favorites', 'readLater'}]
+    invalidate_views(tags + list(scope_tags))
+
+# Write endpoints that invalidate the view cache themselves; any other write clears it
+VIEW_CACHE_TARGETED_ENDPOINTS = {'mark_read', 'mark_all_read', 'toggle_favorite', 'toggle_bookmark',
+                                 'add_feed', 'cleanup_articles', 'refresh_all_feeds'}
+
+@app.after_request
+def clear_view_cache_after_write(response):
+    if (VIEW_CACHE_MAX_ENTRIES and request.method in ('POST', 'PUT', 'DELETE') and response.status_code < 400
+            and request.endpoint not in VIEW_CACHE_TARGETED_ENDPOINTS):
+        clear_view_cache()
+    return response
+
+# --- Event Stream ---
+# /api/events is a Server-Sent Events stream of the event table:
+#   articles  {"feed_id", "ids", "counts"}              new articles stored for a feed
+#   flags     {"ids", "is_read" | "is_favorite" | "is_read_later", "counts"}
+#   changed   {"endpoint"}                              anything else; clients reload /api/data
+#   reset     {}                                        the log no longer reaches back to the client's id
+# "counts" holds the touched feeds' counters as of that commit, so clients update badges without a reload.
+EVENT_TARGETED_ENDPOINTS = {'mark_read', 'mark_all_read', 'toggle_favorite', 'toggle_bookmark', 'import_opml'} | VERSION_NEUTRAL_ENDPOINTS
+
+def record_event(kind, data, feed_ids=()):
+    """Appends an event in the caller's transaction, with the current counters of feed_ids."""
+    if feed_ids:
+        db.session.flush() # let the counter triggers see pending ORM changes first
+        data = dict(data, counts=get_feed_counters(feed_ids))
+    event = Event(kind=kind, data=json.dumps(data))
+    db.session.add(event)
+    db.session.flush()
+    if event.id % 1000 == 0:
+        Event.query.filter(Event.id <= event.id - EVENT_LOG_SIZE).delete(synchronize_session=False)
+
+@app.after_request
+def record_event_after_write(response):
+    if (request.method in ('POST', 'PUT', 'DELETE') and response.status_code < 400
+            and request.endpoint not in EVENT_TARGETED_ENDPOINTS):
+        record_event('changed', {'endpoint': request.endpoint})
+        db.session.commit()
+    return response
+
+@app.route('/api/events')
+def stream_events():
+    """Streams events after Last-Event-ID (sent by the browser on reconnect) or ?since=, then follows the log."""
+    since = request.headers.get('Last-Event-ID') or request.args.get('since')
+    last_id = int(since) if since and since.isdigit() else None
+
+    def generate(last_id):
+        # A read-only connection of its own, so a long-lived stream doesn't hold one of the pool's
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000)
+        try:
+            oldest, newest = conn.execute("SELECT min(id), max(id) FROM event").fetchone()
+            if last_id is None:
+                last_id = newest or 0
+            elif oldest is not None and last_id < oldest - 1:
+                yield f"id: {newest}\nevent: reset\ndata: {{}}\n\n"
+                last_id = newest
+            yield "retry: 3000\n\n"
+            deadline = time.monotonic() + EVENT_STREAM_SECONDS
+            last_write = time.monotonic()
+            while time.monotonic() < deadline:
+                rows = conn.execute("SELECT id, kind, data FROM event WHERE id > ? ORDER BY id LIMIT 500", (last_id,)).fetchall()
+                for event_id, kind, data in rows:
+                    yield f"id: {event_id}\nevent: {kind}\ndata: {data}\n\n"
+                    last_id = event_id
+                if rows:
+                    last_write = time.monotonic()
+                elif time.monotonic() - last_write >= 15:
+                    yield ": keep-alive\n\n" # lets proxies and the server notice a closed connection
+                    last_write = time.monotonic()
+                time.sleep(EVENT_POLL_SECONDS)
+        finally:
+            conn.close()
+
+    response = Response(generate(last_id), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+# --- Image Proxy ---
+# /img/<width>/<signature>?url=... only serves URLs the API signed, so it can't be used as an open proxy.
+# Each image is fetched once and written as "<sha256 of url>_<width>" under DATA_DIR/images/<first 2 hex>/,
+# or as "..._0" when it is served unresized (animated, already small, or no Pillow). A hit bumps the file's
+# mtime, which is what the LRU evicts by.
+_image_key = None
+_image_builds = {} # url -> Future of a fetch in progress in this process
+_image_builds_lock = threading.Lock()
+_image_failures = {} # url -> monotonic time of its last failed fetch in this process, oldest first
+_image_bytes_since_prune = 0
+_image_prefetch_pool = None
+IMAGE_RETRY_SECONDS = 600
+IMAGE_FAILURES_MAX = 10000
+IMAGE_MAX_REDIRECTS = 5
+
+def _image_signing_key():
+    """A random key kept in DATA_DIR, created once and shared by every worker."""
+    global _image_key
+    if _image_key is None:
+        key_path = os.path.join(data_dir, 'image_proxy.key')
+        if not os.path.exists(key_path):
+            tmp_path = f"{key_path}.{os.getpid()}"
+            with open(tmp_path, 'wb') as f:
+                f.write(os.urandom(32))
+            try:
+                os.link(tmp_path, key_path) # fails if another worker got there first; keep theirs
+            except FileExistsError:
+                pass
+            os.remove(tmp_path)
+        with open(key_path, 'rb') as f:
+            _image_key = f.read()
+    return _image_key
+
+def image_signature(url):
+    return hmac.new(_image_signing_key(), url.encode(), hashlib.sha256).hexdigest()[:32]
+
+def _is_proxyable(url):
+    return bool(url) and url.startswith(('http://', 'https://'))
+
+def _image_mimetype(head):
+    """Sniffs the raster formats browsers show; anything else (SVG, HTML error pages) is not proxied."""
+    if head.startswith(b'\xff\xd8\xff'): return 'image/jpeg'
+    if head.startswith(b'\x89PNG'): return 'image/png'
+    if head.startswith(b'GIF8'): return 'image/gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP': return 'image/webp'
+    if head[4:12] in (b'ftypavif', b'ftypavis'): return 'image/avif'
+    return None
+
+def _image_path(url, width):
+    url_hash = hashlib.sha256(url.encode()).hexdigest()
+    return os.path.join(image_cache_dir, url_hash[:2], f"{url_hash}_{width}")
+
+def _cached_image_path(url, width):
+    for path in (_image_path(url, width), _image_path(url, 0)):
+        if os.path.exists(path):
+            return path
+    return None
+
+def _check_public_url(url):
+    """Raises ValueError unless every address url's host resolves to is publicly routable, so feed-supplied
+    image URLs can't make the server fetch from loopback, the LAN or cloud metadata endpoints."""
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        raise ValueError("not an http(s) URL")
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(parsed.hostname, parsed.port or 443, proto=socket.IPPROTO_TCP)}
+    except socket.gaierror as e:
+        raise ValueError(f"cannot resolve {parsed.hostname}: {e}")
+    for address in addresses:
+        if not ipaddress.ip_address(address.split('%')[0]).is_global:
+            raise ValueError(f"{parsed.hostname} resolves to non-public address {address}")
+
+def _download_image(url):
+    # Redirects are followed by hand so each hop's host gets checked too
+    for _ in range(IMAGE_MAX_REDIRECTS + 1):
+        _check_public_url(url)
+        with _host_slot(url), _fetch_session.get(url, timeout=FETCH_TIMEOUT_SECONDS, stream=True, allow_redirects=False) as response:
+            if response.is_redirect:
+                url = urljoin(url, response.headers['Location'])
+                continue
+            if response.status_code == 404 and 'maxresdefault.jpg' in url:
+                # Not every YouTube video has a max-res thumbnail
+                url = url.replace('maxresdefault.jpg', 'hqdefault.jpg')
+                continue
+            response.raise_for_status()
+            data = bytearray()
+            for chunk in response.iter_content(64 * 1024):
+                data += chunk
+                if len(data) > IMAGE_MAX_SOURCE_BYTES:
+                    raise ValueError(f"larger than {IMAGE_MAX_SOURCE_BYTES} bytes")
+            return bytes(data)
+    raise ValueError("too many redirects")
+
+def _resize_image(data):
+    """{width: encoded bytes} for each IMAGE_WIDTHS narrower than the image, plus 0 for the original when some
+    widths don't need resizing."""
+    if Image is None:
+        return {0: data}
+    try:
+        image = Image.open(BytesIO(data))
+    except Image.UnidentifiedImageError: # e.g. AVIF on a Pillow without the plugin
+        return {0: data}
+    if getattr(image, 'is_animated', False):
+        return {0: data}
+    outputs = {}
+    for width in IMAGE_WIDTHS:
+        if image.width <= width:
+            outputs[0] = data
+            break
+        resized = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+        out = BytesIO()
+        if resized.mode in ('RGBA', 'LA') or (resized.mode == 'P' and 'transparency' in resized.info):
+            resized.save(out, 'PNG', optimize=True)
+        else:
+            resized.convert('RGB').save(out, 'JPEG', quality=82, optimize=True, progressive=True)
+        outputs[width] = out.getvalue()
+    return outputs
+
+def _build_thumbnails(url):
+    """Fetches url once and writes its cached sizes; concurrent requests for the same url wait for one fetch."""
+    with _image_builds_lock:
+        build = _image_builds.get(url)
+        owner = build is None
+        if owner:
+            build = _image_builds[url] = Future()
+    if not owner:
+        return build.result()
+    try:
+        data = _download_image(url)
+        if not _image_mimetype(data[:16]):
+            raise ValueError("not a supported image")
+        written = 0
+        for width, body in _resize_image(data).items():
+            path = _image_path(url, width)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}"
+            with open(tmp_path, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+            written += len(body)
+        build.set_result(None)
+    except Exception as e:
+        build.set_exception(e)
+        raise
+    finally:
+        with _image_builds_lock:
+            _image_builds.pop(url, None)
+    _note_image_bytes(written)
+
+def _note_image_bytes(written):
+    """Prunes once this process has written another 5% of the cap since its last prune."""
+    global _image_bytes_since_prune
+    _image_bytes_since_prune += written
+    if _image_bytes_since_prune >= IMAGE_CACHE_MAX_MB * 1024 * 1024 // 20:
+        _image_bytes_since_prune = 0
+        prune_image_cache()
+
+def prune_image_cache():
+    """Deletes the least recently used images until the cache is back under 90% of IMAGE_CACHE_MAX_MB.
+    Returns how many files were removed; 0 when another worker is already pruning."""
+    os.makedirs(image_cache_dir, exist_ok=True)
+    with open(os.path.join(image_cache_dir, '.prune.lock'), 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return 0
+        files, total = [], 0
+        for subdir in os.scandir(image_cache_dir):
+            if not subdir.is_dir():
+                continue
+            for entry in os.scandir(subdir.path):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        limit = IMAGE_CACHE_MAX_MB * 1024 * 1024
+        if total <= limit:
+            return 0
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= limit * 0.9:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+def prefetch_images(urls):
+    """Builds thumbnails for new articles in the background when IMAGE_PREFETCH is on."""
+    global _image_prefetch_pool
+    if not (IMAGE_PROXY_ENABLED and IMAGE_PREFETCH):
+        return
+    if _image_prefetch_pool is None:
+        _image_prefetch_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='image-prefetch')
+    for url in set(urls):
+        if _is_proxyable(url) and not _cached_image_path(url, IMAGE_WIDTHS[0]):
+            _image_prefetch_pool.submit(_prefetch_image, url)
+
+def _prefetch_image(url):
+    try:
+        _build_thumbnails(url)
+    except Exception as e:
+        print(f"Image prefetch failed for {url}: {e}")
+
+def _note_image_failure(url):
+    """Remembers a failed fetch, keeping at most IMAGE_FAILURES_MAX entries: expired ones go first, then the oldest."""
+    with _image_builds_lock:
+        _image_failures.pop(url, None)
+        _image_failures[url] = time.monotonic()
+        if len(_image_failures) > IMAGE_FAILURES_MAX:
+            cutoff = time.monotonic() - IMAGE_RETRY_SECONDS
+            for expired in [u for u, failed_at in _image_failures.items() if failed_at < cutoff]:
+                del _image_failures[expired]
+            while len(_image_failures) > IMAGE_FAILURES_MAX:
+                del _image_failures[next(iter(_image_failures))]
+
+@app.route('/img/<int:width>/<signature>')
+def proxy_image(width, signature):
+    """Serves a cached, downscaled copy of an article image; falls back to the origin when it can't."""
+    url = request.args.get('url', '')
+    if width not in IMAGE_WIDTHS or not _is_proxyable(url) or not hmac.compare_digest(signature, image_signature(url)):
+        return jsonify({'error': 'Unknown image'}), 404
+    path = _cached_image_path(url, width)
+    if not path:
+        # Let the browser try the origin itself, without us retrying a broken or slow host on every page load
+        if time.monotonic() - _image_failures.get(url, -IMAGE_RETRY_SECONDS) < IMAGE_RETRY_SECONDS:
+            return redirect(url)
+        try:
+            _build_thumbnails(url)
+        except Exception as e:
+            print(f"Image proxy failed for {url}: {e}")
+            _note_image_failure(url)
+            return redirect(url)
+        path = _cached_image_path(url, width)
+    try:
+        os.utime(path)
+        with open(path, 'rb') as f:
+            mimetype = _image_mimetype(f.read(16))
+    except (TypeError, FileNotFoundError): # evicted in the meantime
+        return redirect(url)
+    # The file name is stable for a url and width, unlike the mtime the LRU keeps bumping
+    response = send_file(path, mimetype=mimetype, max_age=IMAGE_CACHE_MAX_AGE, conditional=True, etag=os.path.basename(path))
+    response.headers['Cache-Control'] = f'public, max-age={IMAGE_CACHE_MAX_AGE}, immutable'
+    return response
+
 # --- Routes ---
 
 @app.route('/')
@@ -306,7 +1612,11 @@ def home():
     return render_template('index.html')
 
 @app.route('/api/data')
+@conditional_on_data_version
 def get_data():
+    # Where this snapshot sits in the event log, read first so /api/events?since=<event_seq> can't skip a change
+    # committed while the rest is loaded (replaying one the snapshot already has is harmless)
+    event_seq = db.session.query(func.max(Event.id)).scalar() or 0
     categories = Category.query.order_by(Category.name).all()
     active_feeds = Feed.query.filter(Feed.deleted_at.is_(None)).all()
     removed_feeds = Feed.query.filter(Feed.deleted_at.isnot(None)).order_by(Feed.deleted_at.desc()).all()
@@ -314,87 +1624,69 @@ def get_data():
     removed_streams = CustomStream.query.filter(CustomStream.deleted_at.isnot(None)).order_by(CustomStream.deleted_at.desc()).all()
     stream_feed_links = db.session.query(custom_stream_feeds).all()
 
+    # Counts come from the trigger-maintained counter table and are rolled up here, O(feeds + stream links)
+    counters = get_feed_counters()
+    empty = _sum_counters(counters, [])
+    feed_ids_by_category = defaultdict(list)
+    for f in active_feeds: feed_ids_by_category[f.category_id].append(f.id)
+    active_feed_ids = {f.id for f in active_feeds}
+    feed_ids_by_stream = defaultdict(list)
+    for link in stream_feed_links:
+        if link.feed_id in active_feed_ids: feed_ids_by_stream[link.custom_stream_id].append(link.feed_id)
+
     return jsonify({
-        'categories': [get_category_data(cat) for cat in categories],
-        'feeds': [{'id': f.id, 'title': f.title, 'url': f.url, 'category_id': f.category_id, 'exclude_from_all': f.exclude_from_all, 'layout_style': f.layout_style} for f in active_feeds],
+        'categories': [dict(get_category_data(cat), counts=_sum_counters(counters, feed_ids_by_category[cat.id])) for cat in categories],
+        'feeds': [{'id': f.id, 'title': f.title, 'url': f.url, 'category_id': f.category_id, 'exclude_from_all': f.exclude_from_all, 'layout_style': f.layout_style,
+                   'retention_keep_last': f.retention_keep_last, 'retention_max_age_days': f.retention_max_age_days,
+                   'counts': counters.get(f.id, empty)} for f in active_feeds],
         'removedFeeds': [{'id': f.id, 'title': f.title, 'deleted_at': f.deleted_at.isoformat()} for f in removed_feeds],
-        'customStreams': [{'id': cs.id, 'name': cs.name, 'layout_style': cs.layout_style} for cs in active_streams],
+        'customStreams': [{'id': cs.id, 'name': cs.name, 'layout_style': cs.layout_style,
+                           'counts': _sum_counters(counters, feed_ids_by_stream[cs.id])} for cs in active_streams],
         'removedStreams': [{'id': cs.id, 'name': cs.name, 'deleted_at': cs.deleted_at.isoformat()} for cs in removed_streams],
         'customStreamFeedLinks': [{'custom_stream_id': link.custom_stream_id, 'feed_id': link.feed_id} for link in stream_feed_links],
+        'event_seq': event_seq,
+        # Totals over active feeds, plus the unread count of the All view (which leaves out excluded feeds)
+        'counts': dict(_sum_counters(counters, active_feed_ids),
+                       all_unread=_sum_counters(counters, [f.id for f in active_feeds if not f.exclude_from_all])['unread']),
     })
 
-@app.route('/api/articles')
-def get_articles():
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 24, type=int)
-    view_type = request.args.get('view_type', 'all')
-    view_id = request.args.get('view_id', type=int)
-    author_name = request.args.get('author_name', type=str)
-    unread_only = request.args.get('unread_only') == 'true'
-    search_query = request.args.get('search', '').lower()
-    
-    # *** NEW: Get smart_cap param (Default to True) ***
-    smart_cap = request.args.get('smart_cap', 'true') == 'true'
-
+def _articles_query(view_type, view_id=None, author_name=None, unread_only=False, search_query='', smart_cap=True):
+    """Builds the filtered article query for a view. Returns (query, order_by, is_reddit_source)."""
     # Base query
     query = Article.query.join(Feed).filter(Feed.deleted_at.is_(None))
     
     is_reddit_source = False
+    view_feeds = None # Feed query for views that list a set of feeds, see _merge_by_feed
 
     # --- View Filters ---
     if view_type == 'feed' and view_id:
         query = query.filter(Article.feed_id == view_id)
         feed = Feed.query.get(view_id)
-        if feed and ('reddit.com' in feed.url or 'lemmy.world' in feed.url):
+        if feed and feed.kind == 'thread':
             is_reddit_source = True
     elif view_type == 'category' and view_id:
         query = query.filter(Feed.category_id == view_id)
+        view_feeds = Feed.query.filter(Feed.category_id == view_id)
     elif view_type == 'custom_stream' and view_id:
         query = query.join(custom_stream_feeds, Feed.id == custom_stream_feeds.c.feed_id).filter(custom_stream_feeds.c.custom_stream_id == view_id)
+        view_feeds = Feed.query.join(custom_stream_feeds, Feed.id == custom_stream_feeds.c.feed_id).filter(
+            custom_stream_feeds.c.custom_stream_id == view_id)
     elif view_type == 'favorites':
         query = query.filter(Article.is_favorite == True)
     elif view_type == 'readLater':
         query = query.filter(Article.is_read_later == True)
     elif view_type == 'author' and author_name:
         query = query.filter(Article.author == author_name)
-    elif view_type == 'sites':
-        query = query.filter(
-            ~or_(
-                Feed.url.like('%youtube.com%'),
-                Feed.url.like('%vimeo.com%'),
-                Feed.url.like('%dailymotion.com%'),
-                Feed.url.like('%tiktok%'),
-                Feed.url.like('%reddit.com%'),
-                Feed.url.like('%lemmy.world%')
-            )
-        )
-    elif view_type == 'videos':
-        query = query.filter(
-            or_(
-                Feed.url.like('%youtube.com%'),
-                Feed.url.like('%vimeo.com%'),
-                Feed.url.like('%dailymotion.com%'),
-                Feed.url.like('%tiktok%')
-            )
-        )
-    elif view_type == 'threads':
-        query = query.filter(or_(Feed.url.like('%reddit.com%'), Feed.url.like('%lemmy.world%')))
-        is_reddit_source = True
+    elif view_type in KIND_VIEWS:
+        query = query.filter(Feed.kind == KIND_VIEWS[view_type])
+        view_feeds = Feed.query.filter(Feed.kind == KIND_VIEWS[view_type])
+        is_reddit_source = view_type == 'threads'
     
     elif view_type == 'all':
         # *** SMART CAPPING LOGIC ***
+        # feed_rank is maintained at ingest/cleanup time, so this reads only the capped rows
         if smart_cap:
-            # 1. Create a subquery that ranks articles within their feed by date
-            subquery = db.session.query(
-                Article.id,
-                func.row_number().over(
-                    partition_by=Article.feed_id,
-                    order_by=Article.published.desc()
-                ).label('rn')
-            ).subquery()
-
-            # 2. Join and filter rank <= 10
-            query = query.join(subquery, Article.id == subquery.c.id).filter(subquery.c.rn <= 10)
+            query = query.filter(Article.feed_rank.isnot(None))
         
         # Always respect "Exclude from All"
         query = query.filter(Feed.exclude_from_all == False)
@@ -403,56 +1695,205 @@ def get_articles():
     if unread_only:
         query = query.filter(Article.is_read == False)
     
-    if search_query:
-        s = f"%{search_query}%"
-        query = query.filter(or_(
-            Article.title.ilike(s),
-            Article.summary.ilike(s),
-            Feed.title.ilike(s),
-            Article.author.ilike(s)
-        ))
+    # id breaks ties between articles published at the same moment, so keyset cursors are stable
+    order_by = [Article.published.desc(), Article.id.desc()]
+    fts_query = _fts_query(search_query)
+    if fts_query:
+        # Title/summary/author go through the FTS index, read newest match first (FTS5 walks rowids backwards
+        # and stops at the LIMIT). Feed titles are matched against the small feed table.
+        candidate_ids = [article_id for (article_id,) in db.session.execute(
+            db.text("SELECT rowid FROM article_fts WHERE article_fts MATCH :q ORDER BY rowid DESC LIMIT :limit"),
+            {'q': fts_query, 'limit': SEARCH_RANK_CANDIDATES + 1})]
+        title_pattern = search_query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        matching_feed_ids = [feed_id for (feed_id,) in db.session.query(Feed.id).filter(Feed.title.ilike(f"%{title_pattern}%", escape='\\'))]
+        if len(candidate_ids) > SEARCH_RANK_CANDIDATES:
+            # Too common to rank: bm25 needs each term's document count, a pass over the term's whole index
+            # entry, so list the newest matches by date instead
+            is_match = Article.id.in_(candidate_ids[:SEARCH_RANK_CANDIDATES])
+            query = query.filter(or_(is_match, Article.feed_id.in_(matching_feed_ids)) if matching_feed_ids else is_match)
+        else:
+            # Ranked by bm25, titles weighing most; feed title matches come after real hits
+            matches = db.text(
+                "SELECT rowid AS id, bm25(article_fts, 10.0, 1.0, 5.0) AS rank FROM article_fts WHERE article_fts MATCH :q"
+            ).bindparams(q=fts_query).columns(id=db.Integer, rank=db.Float).subquery('fts')
+            if matching_feed_ids:
+                query = query.outerjoin(matches, matches.c.id == Article.id).filter(
+                    or_(matches.c.id.isnot(None), Article.feed_id.in_(matching_feed_ids)))
+            else:
+                query = query.join(matches, matches.c.id == Article.id)
+            order_by = [func.coalesce(matches.c.rank, 0), Article.published.desc()]
+    elif view_feeds is not None:
+        query = _merge_by_feed(query, view_feeds)
+
+    return query, order_by, is_reddit_source
+
+def _merge_by_feed(query, view_feeds):
+    """Rewrites a view over a set of feeds as a UNION ALL with one arm per feed.
+
+    SQLite merges the arms, each read newest-first from ix_article_feed_published, so a page reads about
+    a page of rows instead of sorting every article in the view. Filters and ordering added afterwards
+    are pushed down into each arm.
+    """
+    feed_ids = [feed_id for (feed_id,) in view_feeds.filter(Feed.deleted_at.is_(None)).with_entities(Feed.id)]
+    if not feed_ids:
+        return query.filter(db.false())
+    if len(feed_ids) > FEED_MERGE_MAX_FEEDS:
+        return query
+    arms = [query.filter(Article.feed_id == feed_id) for feed_id in feed_ids]
+    return arms[0].union_all(*arms[1:]) if len(arms) > 1 else arms[0]
 
-    # --- Ordering & Pagination ---
-    pagination = query.order_by(Article.published.desc()).paginate(page=page, per_page=per_page, error_out=False)
+@app.route('/api/articles')
+@conditional_on_data_version
+def get_articles():
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 24, type=int)
+    view_type = request.args.get('view_type', 'all')
+    view_id = request.args.get('view_id', type=int)
+    author_name = request.args.get('author_name', type=str)
+    unread_only = request.args.get('unread_only') == 'true'
+    search_query = request.args.get('search', '').lower()
     
-    return jsonify({
-        'articles': [
-            {
-                'id': a.id, 
-                'title': a.title, 
-                'link': a.link, 
-                'summary': a.summary,
-                'full_content': a.full_content, 
-                'image_url': a.image_url, 
-                'author': a.author,
-                'published': a.published.isoformat() if a.published else datetime.datetime.now().isoformat(),
-                'is_favorite': a.is_favorite, 
-                'is_read_later': a.is_read_later,
-                'is_read': a.is_read,
-                'feed_title': a.feed.title if a.feed else 'Unknown Feed', 
-                'feed_id': a.feed_id
-            } for a in pagination.items
-        ],
-        'total_pages': pagination.pages,
-        'current_page': page,
-        'has_next': pagination.has_next,
-        'is_reddit_source': is_reddit_source
-    })
+    # *** NEW: Get smart_cap param (Default to True) ***
+    smart_cap = request.args.get('smart_cap', 'true') == 'true'
+
+    # "ids" narrows the view to the given articles, so clients can load just the new ones /api/events announced
+    if 'ids' in request.args:
+        article_ids = [int(i) for i in request.args['ids'].split(',') if i.isdigit()][:500]
+        query, order_by, is_reddit_source = _articles_query(view_type, view_id, author_name, unread_only, search_query, smart_cap)
+        items = query.options(defer(Article.inline_content)).filter(Article.id.in_(article_ids)).order_by(*order_by).all()
+        return jsonify({'articles': [get_article_data(a) for a in items]})
+
+    # Searches are too varied to be worth caching; every other view is served from the shared view cache
+    scope_tags = None if search_query or not VIEW_CACHE_MAX_ENTRIES else _view_scope_tags(view_type, view_id)
+    if scope_tags:
+        view_key = json.dumps([view_type, view_id, author_name, unread_only, smart_cap])
+        cache_key = json.dumps([view_key, per_page, request.args.get('cursor') if 'cursor' in request.args else page])
+        body, cache_epoch = view_cache_get(cache_key)
+        if body is not None:
+            return Response(body, mimetype='application/json')
+
+    try:
+        query, order_by, is_reddit_source = _articles_query(view_type, view_id, author_name, unread_only, search_query, smart_cap)
+        # Lists never need article bodies; the reader loads them one at a time from /api/article/<id>
+        query = query.options(defer(Article.inline_content))
+        response, items = _articles_page(query, order_by, is_reddit_source, search_query, page, per_page)
+    except OperationalError:
+        # FTS5 rejects the odd query _fts_query doesn't anticipate; that's the client's input, not a server error
+        if not search_query:
+            raise
+        db.session.rollback()
+        return jsonify({'error': 'Invalid search query'}), 400
+
+    if scope_tags:
+        tags = scope_tags + [f"{tag}:unread" for tag in scope_tags if unread_only] + [f"article:{a.id}" for a in items]
+        view_cache_put(cache_key, view_key, response.get_data(), tags, cache_epoch)
+    return response
+
+def _articles_page(query, order_by, is_reddit_source, search_query, page, per_page):
+    """Runs an /api/articles query for one page. Returns (response, articles on it)."""
+    # --- Keyset Pagination ---
+    # Passing "cursor" (empty for the first page) switches to keyset mode: no COUNT(*) and no OFFSET,
+    # just the rows after the last (published, id) the client has seen. Searches are ranked, so they stay paged.
+    if 'cursor' in request.args and not _fts_query(search_query):
+        cursor = _decode_cursor(request.args.get('cursor'))
+        if cursor:
+            query = query.filter(tuple_(Article.published, Article.id) < cursor)
+        rows = query.order_by(*order_by).limit(per_page + 1).all()
+        items = rows[:per_page]
+        has_next = len(rows) > per_page
+        response = jsonify({
+            'articles': [get_article_data(a) for a in items],
+            'next_cursor': _encode_cursor(items[-1]) if has_next else None,
+            'has_next': has_next,
+            'is_reddit_source': is_reddit_source
+        })
+    else:
+        # --- Ordering & Pagination ---
+        pagination = query.order_by(*order_by).paginate(page=page, per_page=per_page, error_out=False)
+        items = pagination.items
+        response = jsonify({
+            'articles': [get_article_data(a) for a in items],
+            'total_pages': pagination.pages,
+            'current_page': page,
+            'has_next': pagination.has_next,
+            'is_reddit_source': is_reddit_source
+        })
+    return response, items
+
+@app.route('/api/write_queue/stats')
+def get_write_queue_stats():
+    """Batching and latency numbers of this worker's write queue."""
+    return jsonify(get_write_stats())
+
+@app.route('/api/cache/stats')
+def get_cache_stats():
+    """Hit/miss counters of the view cache, summed over all workers since startup."""
+    return jsonify(view_cache_stats())
+
+def _encode_cursor(article):
+    """Opaque keyset cursor pointing just after the given article."""
+    raw = json.dumps([article.published.isoformat(), article.id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def _decode_cursor(cursor):
+    """Returns (published, id) from a cursor, or None for an empty or malformed one."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        published, article_id = json.loads(raw)
+        return datetime.datetime.fromisoformat(published), int(article_id)
+    except (ValueError, TypeError):
+        return None
+
+def get_article_data(a, include_content=False):
+    data = {
+        'id': a.id,
+        'title': a.title,
+        'link': a.link,
+        'summary': a.summary,
+        'image_url': a.image_url,
+        'author': a.author,
+        'published': a.published.isoformat() if a.published else datetime.datetime.now().isoformat(),
+        'is_favorite': a.is_favorite,
+        'is_read_later': a.is_read_later,
+        'is_read': a.is_read,
+        'feed_title': a.feed.title if a.feed else 'Unknown Feed',
+        'feed_id': a.feed_id,
+        'image_sig': image_signature(a.image_url) if IMAGE_PROXY_ENABLED and _is_proxyable(a.image_url) else None,
+    }
+    if include_content:
+        data['full_content'] = a.full_content
+    return data
+
+@app.route('/api/article/<int:article_id>')
+def get_article(article_id):
+    """Returns one article including its full body, with an ETag so re-opening it costs a 304."""
+    article = Article.query.get_or_404(article_id)
+    response = jsonify(get_article_data(article, include_content=True))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.add_etag()
+    return response.make_conditional(request)
+
+def _set_article_flag(article_id, flag, value=None):
+    """Sets (or, with value None, flips) one of the article's flags in the writer's transaction.
+    Returns the new value, or None if there is no such article."""
+    article = db.session.get(Article, article_id)
+    if article is None:
+        return None
+    setattr(article, flag, (not getattr(article, flag)) if value is None else value)
+    record_event('flags', {'ids': [article.id], flag: getattr(article, flag)}, [article.feed_id])
+    return getattr(article, flag)
 
 @app.route('/api/article/<int:article_id>/mark_read', methods=['POST'])
 def mark_read(article_id):
-    article = Article.query.get_or_404(article_id)
-    article.is_read = True
-    db.session.commit()
+    if submit_write(partial(_set_article_flag, article_id, 'is_read', True)).result() is None:
+        abort(404)
+    invalidate_article_views([article_id])
     return jsonify({'success': True})
 
-@app.route('/api/mark_all_read', methods=['POST'])
-def mark_all_read():
-    """Marks articles as read based on the current context (view_type/id)."""
-    data = request.get_json()
-    view_type = data.get('view_type', 'all')
-    view_id = data.get('view_id')
-    
+def _mark_view_read(view_type, view_id):
+    """Marks the view's unread articles read in the writer's transaction. Returns (count, their feed ids)."""
     query = db.session.query(Article).filter(Article.is_read == False)
     
     # Apply same filters as get_articles
@@ -466,9 +1907,24 @@ def mark_all_read():
         query = query.join(Feed).filter(Feed.exclude_from_all == False)
     # (Add other filters like sites/videos if desired, generally 'all' or 'feed' is most common)
 
+    # Articles about to flip, for the event and for invalidating their feeds' cached views afterwards
+    flipped = query.with_entities(Article.id, Article.feed_id).all()
+    feed_ids = list({feed_id for _, feed_id in flipped})
+
     # Bulk update
     updated_count = query.update({Article.is_read: True}, synchronize_session=False)
-    db.session.commit()
+    if updated_count:
+        record_event('flags', {'ids': [article_id for article_id, _ in flipped], 'is_read': True}, feed_ids)
+    return updated_count, feed_ids
+
+@app.route('/api/mark_all_read', methods=['POST'])
+def mark_all_read():
+    """Marks articles as read based on the current context (view_type/id)."""
+    data = request.get_json()
+    updated_count, feed_ids = submit_write(partial(_mark_view_read, data.get('view_type', 'all'), data.get('view_id'))).result()
+    if updated_count:
+        # Favorites and read-later pages may show the same articles with their read flag
+        invalidate_views(_feed_scope_tags(feed_ids) | {'favorites', 'readLater'})
     
     return jsonify({'success': True, 'updated_count': updated_count})
 
@@ -554,48 +2010,16 @@ def add_feed():
             db.session.commit()
 
     try:
-        feed_data = None
         feed_url = url
-        headers = {'User-Agent': 'VolumeRead21-Feed-Finder/1.0'}
-        
         if not feed_url.startswith(('http://', 'https://')):
             feed_url = 'https://' + feed_url
 
-        parsed_data = feedparser.parse(feed_url, request_headers=headers)
-        if parsed_data.feed and (parsed_data.entries or parsed_data.feed.get('title')):
-            feed_data = parsed_data
-        else:
-            base_url = feed_url.rstrip('/')
-            for suffix in ['/feed', '/atom.xml', '/rss.xml', '/rss']:
-                test_url = base_url + suffix
-                parsed_data = feedparser.parse(test_url, request_headers=headers)
-                if parsed_data.feed and (parsed_data.entries or parsed_data.feed.get('title')):
-                    feed_data = parsed_data
-                    feed_url = test_url
-                    break
-            
-            if not feed_data:
-                try:
-                    response = requests.get(feed_url, headers=headers, timeout=5)
-                    if 'xml' in response.headers.get('Content-Type', '').lower():
-                        feed_data = feedparser.parse(response.content, request_headers=headers)
-                        feed_url = response.url
-                    else:
-                        soup = BeautifulSoup(response.text, 'html.parser')
-                        link_tag = soup.find('link', {'rel': 'alternate', 'type': re.compile(r'application/(rss|atom)\+xml')})
-                        if link_tag and link_tag.get('href'):
-                            feed_url = urljoin(response.url, link_tag['href'])
-                            feed_data = feedparser.parse(feed_url, request_headers=headers)
-                except Exception: pass
-
-        if not feed_data:
-            rss_bridge_base_url = os.environ.get('RSS_BRIDGE_URL')
-            if rss_bridge_base_url:
-                bridge_url = get_rss_bridge_feed(rss_bridge_base_url, feed_url)
-                if bridge_url:
-                    feed_data = feedparser.parse(bridge_url, request_headers=headers)
-                    feed_url = bridge_url
+        # Re-adding a feed that's already subscribed (directly or by a page URL seen before) needs no fetch
+        _, cached_url = _cached_discovery(feed_url)
+        if Feed.query.filter(Feed.url.in_([feed_url, cached_url])).first():
+            return jsonify({'error': 'Feed already exists.'}), 400
 
+        feed_url, feed_data = discover_feed(feed_url)
         if not feed_data or not feed_data.feed:
             return jsonify({'error': 'Could not find a valid feed.'}), 400
 
@@ -608,12 +2032,16 @@ def add_feed():
             url=feed_url, 
             category_id=target_category.id,
             etag=feed_data.get('etag'),
-            last_modified=feed_data.get('modified')
+            last_modified=feed_data.get('modified'),
+            entries_hash=_entries_hash(feed_data)
         )
         db.session.add(new_feed)
         db.session.commit()
 
-        _update_articles_for_feed(new_feed, feed_data)
+        added_count = _update_articles_for_feed(new_feed, _articles_from_feed_data(feed_data, feed_url, feed_title))
+        _schedule_next_fetch(new_feed, datetime.datetime.now(), added_count,
+                             _observed_post_interval(feed_data), _poll_hint_seconds(feed_data.get('headers', {}), feed_data.feed))
+        db.session.commit()
         return jsonify({'success': True, 'title': feed_title}), 201
 
     except Exception as e:
@@ -649,75 +2077,673 @@ def restore_feed(feed_id):
     db.session.commit()
     return jsonify({'success': True}), 200
 
-def _fetch_one_feed(args):
-    """Worker function for parallel feed refreshing. args is (feed, force_refresh)"""
-    feed, force_refresh = args
+# --- Pooled Feed Fetching ---
+# One keep-alive session per process, with a connection pool per host sized to the per-host limit.
+_fetch_session = requests.Session()
+_fetch_session.mount('http://', requests.adapters.HTTPAdapter(pool_connections=64, pool_maxsize=FETCH_PER_HOST_LIMIT))
+_fetch_session.mount('https://', requests.adapters.HTTPAdapter(pool_connections=64, pool_maxsize=FETCH_PER_HOST_LIMIT))
+_fetch_session.headers.update({
+    # Use a real Browser User-Agent to avoid blocking
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+})
+_host_slots = defaultdict(lambda: threading.BoundedSemaphore(FETCH_PER_HOST_LIMIT))
+_host_slots_lock = threading.Lock()
+
+def _host_slot(url):
+    with _host_slots_lock:
+        return _host_slots[urlparse(url).hostname or '']
+
+def _interleave_by_host(feeds):
+    """Orders feeds round-robin across hosts so fetch threads aren't all queued on the same host's limit."""
+    by_host = defaultdict(deque)
+    for feed in feeds:
+        by_host[urlparse(feed.url).hostname or ''].append(feed)
+    queues = list(by_host.values())
+    ordered = []
+    while queues:
+        ordered.extend(q.popleft() for q in queues)
+        queues = [q for q in queues if q]
+    return ordered
+
+# --- Feed Discovery ---
+_discovery_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix='discovery')
+
+def _probe_feed(url, deadline, follow_links=True):
+    """Fetches url before the deadline. Returns (url, parsed feed or None, the feed URL an HTML page links to or None,
+    definite), where definite is False when the answer may change on a retry: timeouts, network errors, 5xx, 429..."""
+    slot = _host_slot(url)
+    if not slot.acquire(timeout=max(0, deadline - time.monotonic())):
+        return url, None, None, False
     try:
-        # Use a real Browser User-Agent to avoid blocking
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        if force_refresh:
-            feed_data = feedparser.parse(feed.url, request_headers=headers, etag=None, modified=None)
+        response = _fetch_session.get(url, headers={'User-Agent': 'VolumeRead21-Feed-Finder/1.0'},
+                                      timeout=max(0.1, deadline - time.monotonic()))
+    except requests.RequestException:
+        return url, None, None, False
+    finally:
+        slot.release()
+    if response.status_code >= 400:
+        return url, None, None, response.status_code in (404, 410)
+    if follow_links and 'html' in response.headers.get('Content-Type', '').lower():
+        soup = BeautifulSoup(response.text, 'html.parser')
+        link_tag = soup.find('link', {'rel': 'alternate', 'type': re.compile(r'application/(rss|atom)\+xml')})
+        if link_tag and link_tag.get('href'):
+            return url, None, urljoin(response.url, link_tag['href']), True
+    # Some feeds are served as text/html or application/xhtml+xml, so anything without a feed link gets parsed
+    response_headers = {k.lower(): v for k, v in response.headers.items()}
+    response_headers.setdefault('content-location', response.url)
+    feed_data = feedparser.parse(response.content, response_headers=response_headers)
+    if not (feed_data.feed and (feed_data.entries or feed_data.feed.get('title'))):
+        return url, None, None, True
+    # What feedparser fills in itself when it does the fetch
+    feed_data['etag'], feed_data['modified'] = response_headers.get('etag'), response_headers.get('last-modified')
+    feed_data['headers'] = response_headers
+    return url, feed_data, None, True
+
+def _probe_candidates(url, deadline):
+    """Probes url and its usual feed paths at once, plus the feed url links to if it's a page.
+    Returns (feed_url, feed_data, True) for the first candidate in the order add_feed used to try them one by
+    one (url, DISCOVERY_SUFFIXES, the linked feed) that is a feed, however fast the others answered; or
+    (None, None, definite) where definite says every probe got an answer that a retry wouldn't change."""
+    base_url = url.rstrip('/')
+    candidates = [_discovery_pool.submit(_probe_feed, url, deadline)]
+    candidates += [_discovery_pool.submit(_probe_feed, base_url + suffix, deadline, False) for suffix in DISCOVERY_SUFFIXES]
+    results = {}
+    while True:
+        for future in candidates:
+            if future not in results:
+                break
+            probe_url, feed_data, linked_url, _ = results[future]
+            if feed_data:
+                return probe_url, feed_data, True
         else:
-            feed_data = feedparser.parse(feed.url, request_headers=headers, etag=feed.etag, modified=feed.last_modified)
+            return None, None, all(probe_definite for *_, probe_definite in results.values())
+        done, _ = wait([f for f in candidates if f not in results], timeout=max(0, deadline - time.monotonic()),
+                       return_when=FIRST_COMPLETED)
+        if not done:
+            # Out of time; the stragglers finish in the background. A later candidate that did answer still counts.
+            found = [results[f] for f in candidates if f in results and results[f][1]]
+            return (found[0][0], found[0][1], True) if found else (None, None, False)
+        for future in done:
+            try:
+                results[future] = future.result()
+            except Exception:
+                results[future] = (None, None, None, False)
+            if future is candidates[0] and results[future][2]:
+                candidates.append(_discovery_pool.submit(_probe_feed, results[future][2], deadline, False))
+
+def _cached_discovery(key):
+    """(True, feed_url or None) when key has a cached result that hasn't expired, else (False, None)."""
+    entry = db.session.get(DiscoveryCache, key)
+    if entry:
+        ttl = datetime.timedelta(days=DISCOVERY_CACHE_DAYS) if entry.feed_url else datetime.timedelta(minutes=DISCOVERY_MISS_CACHE_MINUTES)
+        if entry.checked_at > datetime.datetime.now() - ttl:
+            return True, entry.feed_url
+    return False, None
+
+def _remember_discovery(key, feed_url):
+    try:
+        db.session.merge(DiscoveryCache(url=key, feed_url=feed_url, checked_at=datetime.datetime.now()))
+        db.session.commit()
+    except Exception as e: # another worker cached the same URL at the same moment
+        db.session.rollback()
+        print(f"Could not cache discovery of {key}: {e}")
+
+def discover_feed(url):
+    """Resolves url to (feed_url, parsed feed), or (None, None) when neither it nor RSS-Bridge has a feed for it."""
+    deadline = time.monotonic() + DISCOVERY_TIMEOUT_SECONDS
+    cached, feed_url = _cached_discovery(url)
+    if cached:
+        if not feed_url:
+            return None, None
+        feed_data = _probe_feed(feed_url, deadline, follow_links=False)[1]
+        if feed_data:
+            return feed_url, feed_data
+        # The feed it resolved to is gone or unreachable; discover again
+
+    # RSS-Bridge is asked alongside the probes, but its answer only counts when they find nothing
+    bridge_base_url = os.environ.get('RSS_BRIDGE_URL')
+    bridge_key = f"{bridge_base_url}/?action=findbridge&url={quote(url)}" if bridge_base_url else None
+    bridge_cached, bridge_url = _cached_discovery(bridge_key) if bridge_key else (True, None)
+    bridge_lookup = None if bridge_cached else _discovery_pool.submit(get_rss_bridge_feed, bridge_base_url, url, True)
+
+    feed_url, feed_data, definite = _probe_candidates(url, deadline)
+    if bridge_lookup and (not feed_data or bridge_lookup.done()):
+        try:
+            bridge_url = bridge_lookup.result(timeout=max(0, deadline - time.monotonic()))
+            _remember_discovery(bridge_key, bridge_url)
+        except Exception: # timed out or RSS-Bridge errored; try again next time
+            definite = False
+    if not feed_data and bridge_url:
+        feed_url, feed_data, _, bridge_definite = _probe_feed(bridge_url, deadline, follow_links=False)
+        definite = definite and bridge_definite
+
+    # A miss is only remembered when it's a real answer; a network blip shouldn't block retries for an hour
+    if feed_data:
+        _remember_discovery(url, feed_url)
+        return feed_url, feed_data
+    if definite:
+        _remember_discovery(url, None)
+    return None, None
+
+def _entries_hash(feed_data):
+    """Fingerprint of the entry ids in a parsed feed, for origins whose body changes but whose items don't."""
+    entry_ids = sorted(entry.get('id') or entry.get('link') or '' for entry in feed_data.entries)
+    return hashlib.sha256('\n'.join(entry_ids).encode('utf-8')).hexdigest()
+
+def _parse_feed_payload(body, response_headers, feed_url, feed_title, known_entries_hash=None):
+    """Parses a fetched feed body into plain article dicts. Runs in the parse process pool.
+
+    Articles are left as None when the entry list matches known_entries_hash, since there is nothing to ingest.
+    """
+    started = time.perf_counter()
+    feed_data = feedparser.parse(body, response_headers=response_headers)
+    parsed = {
+        'poll_hint': _poll_hint_seconds(response_headers, feed_data.feed),
+        'post_interval': _observed_post_interval(feed_data),
+        'entries_hash': _entries_hash(feed_data),
+        'entries_count': len(feed_data.entries),
+        'articles': None,
+    }
+    if parsed['entries_hash'] != known_entries_hash:
+        parsed['articles'] = _articles_from_feed_data(feed_data, feed_url, feed_title)
+    parsed['parse_ms'] = round((time.perf_counter() - started) * 1000)
+    return parsed
+
+_parse_pool = None
+_parse_pool_pid = None
+_parse_pool_lock = threading.Lock()
+
+def _get_parse_pool(feed_count):
+    """Returns this worker's parse pool, starting it on first use, or None when parsing inline is cheaper."""
+    global _parse_pool, _parse_pool_pid
+    if PARSE_WORKERS <= 1 or feed_count < PARSE_POOL_MIN_FEEDS:
+        return None
+    with _parse_pool_lock:
+        if _parse_pool_pid != os.getpid():
+            # Spawn rather than fork: the scheduler forks from a threaded gunicorn worker
+            _parse_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+            _parse_pool_pid = os.getpid()
+        return _parse_pool
+
+def _discard_parse_pool(pool):
+    """Drops a pool whose process died, so the next refresh starts a new one."""
+    global _parse_pool_pid
+    with _parse_pool_lock:
+        if _parse_pool is pool:
+            _parse_pool_pid = None
+    pool.shutdown(wait=False)
+
+def _fetch_one_feed(args):
+    """Worker function for parallel feed refreshing. args is (feed, force_refresh).
+
+    Returns a dict with the normalized articles, or with unchanged=True when the server answered 304 or sent
+    back exactly what we saw last time, in which case parsing and article work are skipped. Parsing is
+    handed to parse_pool when there is one, so this thread only waits on the network and the pool.
+    """
+    feed, force_refresh, parse_pool = args
+    # telemetry becomes the feed's FeedFetch row
+    telemetry = {'fetched_at': datetime.datetime.now(), 'status': None, 'not_modified': False, 'wait_ms': None,
+                 'download_ms': None, 'parse_ms': None, 'bytes': None, 'entries_count': None}
+    result = {'feed': feed, 'articles': None, 'error': None, 'etag': None, 'modified': None, 'poll_hint': None,
+              'post_interval': None, 'content_hash': None, 'entries_hash': None, 'unchanged': False, 'telemetry': telemetry}
+    try:
+        headers = {}
+        if not force_refresh:
+            if feed.etag: headers['If-None-Match'] = feed.etag
+            if feed.last_modified: headers['If-Modified-Since'] = feed.last_modified
+
+        with _host_slot(feed.url):
+            response = _fetch_session.get(feed.url, headers=headers, timeout=FETCH_TIMEOUT_SECONDS, stream=True)
+            telemetry['wait_ms'] = round(response.elapsed.total_seconds() * 1000)
+            download_started = time.perf_counter()
+            telemetry['bytes'] = len(response.content)
+            telemetry['download_ms'] = round((time.perf_counter() - download_started) * 1000)
+        telemetry['status'] = response.status_code
+        response_headers = {k.lower(): v for k, v in response.headers.items()}
         
         # *** FIX: Add flush=True to force the log out immediately ***
-        status_code = feed_data.status if hasattr(feed_data, 'status') else 'Unknown'
-        print(f"Checking {feed.title} ({feed.url})... Status: {status_code}", flush=True)
-
-        if hasattr(feed_data, 'status'):
-            if feed_data.status == 304: return (feed, None, None, None, None)
-            # *** FIX: Allow 301/302 Redirects. Only block 4xx/5xx errors ***
-            if feed_data.status >= 400:
-                return (feed, None, f"Status {feed_data.status}", None, None)
-            
-        return (feed, feed_data, None, feed_data.get('etag'), feed_data.get('modified'))
+        print(f"Checking {feed.title} ({feed.url})... Status: {response.status_code}", flush=True)
+
+        result['poll_hint'] = _poll_hint_seconds(response_headers)
+        if response.status_code == 304:
+            result['unchanged'] = telemetry['not_modified'] = True
+            return result
+        # *** FIX: Allow 301/302 Redirects. Only block 4xx/5xx errors ***
+        if response.status_code >= 400:
+            result['error'] = f"Status {response.status_code}"
+            return result
+
+        result['etag'] = response_headers.get('etag')
+        result['modified'] = response_headers.get('last-modified')
+        result['content_hash'] = hashlib.sha256(response.content).hexdigest()
+        if not force_refresh and result['content_hash'] == feed.content_hash:
+            result['unchanged'] = telemetry['not_modified'] = True
+            return result
+
+        # Let relative links in the feed resolve against where it was actually served from
+        response_headers.setdefault('content-location', response.url)
+        parse_args = (response.content, response_headers, feed.url, feed.title, None if force_refresh else feed.entries_hash)
+        parsed = None
+        if parse_pool:
+            try:
+                parsed = parse_pool.submit(_parse_feed_payload, *parse_args).result()
+            except BrokenProcessPool:
+                _discard_parse_pool(parse_pool)
+        if parsed is None:
+            parsed = _parse_feed_payload(*parse_args)
+
+        result.update(poll_hint=parsed['poll_hint'], post_interval=parsed['post_interval'],
+                      entries_hash=parsed['entries_hash'], articles=parsed['articles'])
+        telemetry.update(parse_ms=parsed['parse_ms'], entries_count=parsed['entries_count'])
+        result['unchanged'] = parsed['articles'] is None
+        return result
     except Exception as e:
         # *** FIX: Print errors too ***
         print(f"Error checking {feed.title}: {e}", flush=True)
-        return (feed, None, str(e), None, None)
+        result['error'] = str(e)
+        return result
+
+def _refresh_feeds(force_refresh=False, feed_ids=None, on_progress=None):
+    """Fetches every due feed (or every active feed when forced, or just feed_ids) and stores new articles.
+
+    on_progress, if given, is called about once a second with {'checked_count', 'feeds_total', 'stored_count',
+    'added_count'}; fetching and storing run side by side.
+    """
+    now = datetime.datetime.now()
+    query = Feed.query.filter(Feed.deleted_at.is_(None))
+    if feed_ids is not None:
+        query = query.filter(Feed.id.in_(feed_ids))
+    elif not force_refresh:
+        query = query.filter(or_(Feed.next_fetch_at.is_(None), Feed.next_fetch_at <= now))
+    feeds = query.all()
+    # Fetch threads read these without an app context, so a progress commit must not expire them
+    for feed in feeds:
+        db.session.expunge(feed)
+
+    summary = {'added_count': 0, 'checked_count': 0, 'unchanged_count': 0, 'errors': []}
+    if not feeds: return summary
+
+    parse_pool = _get_parse_pool(len(feeds))
+    pending_args = deque((f, force_refresh, parse_pool) for f in _interleave_by_host(feeds))
+
+    # Each feed goes to the writer thread as soon as its fetch completes, so ingest overlaps the network. At most
+    # FETCH_CONCURRENCY * 2 fetches are submitted ahead and WRITE_QUEUE_SIZE written feeds wait to be collected,
+    # which bounds how many parsed feeds are held at once, however many feeds there are.
+    fetching = set()
+    writing = deque() # (fetch result, Future of its write), oldest first
+    stored_count = 0
+    last_progress = time.monotonic()
+    version_bump = {'at': time.monotonic(), 'added_count': 0}
+
+    def bump_version_if_due():
+        # Articles are committed feed by feed, so let clients' conditional requests see them as they land
+        if summary['added_count'] > version_bump['added_count'] and time.monotonic() - version_bump['at'] >= DATA_VERSION_BUMP_SECONDS:
+            bump_data_version()
+            version_bump.update(at=time.monotonic(), added_count=summary['added_count'])
+
+    with ThreadPoolExecutor(max_workers=FETCH_CONCURRENCY) as executor:
+        while pending_args or fetching:
+            while pending_args and len(fetching) < FETCH_CONCURRENCY * 2:
+                fetching.add(executor.submit(_fetch_one_feed, pending_args.popleft()))
+            done, fetching = wait(fetching, return_when=FIRST_COMPLETED)
+            for fetch in done:
+                result = fetch.result()
+                summary['checked_count'] += 1
+                writing.append((result, submit_write(partial(_store_fetch_result, result['feed'].id, result, now),
+                                                     rows=len(result['articles'] or ()))))
+            while writing and (writing[0][1].done() or len(writing) > WRITE_QUEUE_SIZE):
+                _collect_fetch_result(*writing.popleft(), now, summary)
+                stored_count += 1
+            bump_version_if_due()
+            if on_progress and time.monotonic() - last_progress >= 1:
+                on_progress({'checked_count': summary['checked_count'], 'feeds_total': len(feeds),
+                             'stored_count': stored_count, 'added_count': summary['added_count']})
+                last_progress = time.monotonic()
+
+    while writing:
+        _collect_fetch_result(*writing.popleft(), now, summary)
+        bump_version_if_due()
+    return summary
+
+def _collect_fetch_result(result, future, now, summary):
+    """Waits for one feed's write and adds its outcome to the refresh summary."""
+    feed = result['feed']
+    if result['error']:
+        summary['errors'].append(f"{feed.title}: {result['error']}")
+    if result['content_hash'] and result['unchanged']:
+        summary['unchanged_count'] += 1 # skipped because its body or entry list matched the stored hash
+    try:
+        added_count = future.result()
+    except Exception as e:
+        summary['errors'].append(f"{feed.title}: DB Error {e}")
+        # Still push the next fetch back, as for a feed that failed to fetch
+        submit_write(partial(_store_fetch_result, feed.id, dict(result, error=str(e)), now)).result()
+        return
+    if added_count:
+        summary['added_count'] += added_count
+        invalidate_feed_views([feed.id])
+        prefetch_images(article['image_url'] for article in result['articles'])
+
+def _store_fetch_result(feed_id, result, now):
+    """Saves one feed's fetch outcome and new articles (runs in the writer thread). Returns the number added."""
+    feed = db.session.get(Feed, feed_id)
+    if not feed: return 0
+
+    if result['error']:
+        # Failing feeds back off like unchanged ones instead of being retried on every tick
+        _schedule_next_fetch(feed, now, 0, poll_hint=result['poll_hint'])
+        _record_fetch(feed.id, result, 0)
+        return 0
+
+    # Only update cache headers if we actually got data back
+    if result['etag']: feed.etag = result['etag']
+    if result['modified']: feed.last_modified = result['modified']
+    if result['content_hash']: feed.content_hash = result['content_hash']
 
-@app.route('/api/refresh_all_feeds', methods=['POST'])
-def refresh_all_feeds():
-    feeds = Feed.query.filter(Feed.deleted_at.is_(None)).all()
-    if not feeds: return jsonify({'success': True, 'added_count': 0})
-    
-    # Check if this is a forced refresh from the frontend
-    data = request.get_json() or {}
-    force_refresh = data.get('force', False)
-    
-    total_added = 0
-    errors = []
+    added_count = 0
+    if result['articles'] is not None:
+        added_count = _insert_new_articles(feed.id, result['articles'])
+        feed.entries_hash = result['entries_hash']
 
-    # Map expects a single iterable, so we zip feeds with the force flag
-    feed_args = [(f, force_refresh) for f in feeds]
+    _schedule_next_fetch(feed, now, added_count, result['post_interval'], result['poll_hint'])
+    _record_fetch(feed.id, result, added_count)
+    return added_count
 
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        results = executor.map(_fetch_one_feed, feed_args)
-    
-    for feed, feed_data, error, new_etag, new_modified in results:
-        if error:
-            errors.append(f"{feed.title}: {error}")
-            continue
-        
-        feed_in_session = db.session.get(Feed, feed.id)
-        if not feed_in_session: continue
+def _record_fetch(feed_id, result, added_count):
+    """Adds the fetch to the feed's telemetry and drops what falls out of its FETCH_HISTORY_SIZE window."""
+    error = result['error'][:200] if result['error'] else None
+    db.session.add(FeedFetch(feed_id=feed_id, error=error, added_count=added_count, **result['telemetry']))
+    db.session.flush()
+    db.session.execute(db.text(
+        "DELETE FROM feed_fetch WHERE feed_id = :feed_id AND id <= "
+        "(SELECT id FROM feed_fetch WHERE feed_id = :feed_id ORDER BY id DESC LIMIT 1 OFFSET :keep)"),
+        {'feed_id': feed_id, 'keep': FETCH_HISTORY_SIZE})
+
+def _retention_conditions(feed_id, keep_last, max_age_days, now):
+    """Filters for a feed's articles that its retention policy lets go, or None when it keeps everything.
+
+    Favorites and read-later articles are never deleted, but they do count towards keep_last.
+    """
+    expired = []
+    if max_age_days:
+        expired.append(Article.published < now - datetime.timedelta(days=max_age_days))
+    if keep_last:
+        oldest_kept = (db.session.query(Article.published, Article.id).filter(Article.feed_id == feed_id)
+                       .order_by(Article.published.desc(), Article.id.desc()).offset(keep_last - 1).first())
+        if oldest_kept:
+            expired.append(tuple_(Article.published, Article.id) < tuple(oldest_kept))
+    if not expired:
+        return None
+    return [Article.feed_id == feed_id, Article.is_favorite == False, Article.is_read_later == False, or_(*expired)]
+
+def _delete_articles(article_ids):
+    return Article.query.filter(Article.id.in_(article_ids)).delete(synchronize_session=False)
+
+def _incremental_vacuum():
+    """Returns free pages to the filesystem VACUUM_PAGES_PER_STEP at a time. Returns bytes freed.
+
+    Only does something when the database uses auto_vacuum=INCREMENTAL; otherwise the free pages
+    simply get reused by later inserts.
+    """
+    if db.session.execute(db.text("PRAGMA auto_vacuum")).scalar() != 2:
+        return 0
+    page_size = db.session.execute(db.text("PRAGMA page_size")).scalar()
+    freed_pages = 0
+    while True:
+        free_pages = db.session.execute(db.text("PRAGMA freelist_count")).scalar()
+        if not free_pages:
+            break
+        # Each step of this pragma frees one page, and sqlite3's execute() steps only once; executescript()
+        # runs it to the end. It owns its transaction, so it goes straight to the database rather than
+        # through the write queue; busy_timeout lines it up with the writer, and each step is short.
+        with db.engine.connect() as conn:
+            conn.connection.driver_connection.executescript(f"PRAGMA incremental_vacuum({VACUUM_PAGES_PER_STEP})")
+        freed_pages += free_pages - db.session.execute(db.text("PRAGMA freelist_count")).scalar()
+        if free_pages <= VACUUM_PAGES_PER_STEP:
+            break
+    return freed_pages * page_size
+
+def _apply_retention(max_age_days=None, keep_last=None, on_progress=None):
+    """Deletes what each feed's retention policy lets go, a batch at a time, then reclaims the space.
+
+    max_age_days/keep_last apply to feeds without a policy of their own. A feed with either of its own
+    retention fields set follows only those, so the one it leaves unset means no limit. on_progress(summary)
+    is called every couple of seconds so the job can report how far it got.
+    """
+    now = datetime.datetime.now()
+    policies = db.session.query(Feed.id, Feed.retention_keep_last, Feed.retention_max_age_days).all()
+    summary = {'deleted_count': 0, 'feeds_checked': 0, 'feeds_total': len(policies), 'reclaimed_bytes': 0}
+    last_report = time.monotonic()
+
+    for feed_id, feed_keep_last, feed_max_age_days in policies:
+        if feed_keep_last or feed_max_age_days:
+            conditions = _retention_conditions(feed_id, feed_keep_last, feed_max_age_days, now)
+        else:
+            conditions = _retention_conditions(feed_id, keep_last, max_age_days, now)
+        deleted_count = 0
+        while conditions:
+            # Oldest first, so an interrupted run has still removed the most expired articles
+            article_ids = [article_id for (article_id,) in db.session.query(Article.id).filter(*conditions)
+                           .order_by(Article.published).limit(RETENTION_BATCH_SIZE)]
+            if not article_ids:
+                break
+            batch_deleted = submit_write(partial(_delete_articles, article_ids), rows=len(article_ids)).result()
+            deleted_count += batch_deleted
+            summary['deleted_count'] += batch_deleted
+            if on_progress and time.monotonic() - last_report > 2:
+                on_progress(summary)
+                last_report = time.monotonic()
+
+        if deleted_count:
+            # The deleted rows may have included some of the feed's newest articles, so hand their ranks down
+            submit_write(partial(_rerank_feed, feed_id)).result()
+            invalidate_feed_views([feed_id])
+        summary['feeds_checked'] += 1
+
+    summary['reclaimed_bytes'] = _incremental_vacuum()
+    return summary
+
+def _retention_due(now):
+    """True when some retention policy is set and no cleanup has run in the last RETENTION_INTERVAL_HOURS."""
+    has_policy = RETENTION_MAX_AGE_DAYS or RETENTION_KEEP_LAST or Feed.query.filter(
+        or_(Feed.retention_keep_last.isnot(None), Feed.retention_max_age_days.isnot(None))).first()
+    if not has_policy:
+        return False
+    last_cleanup = Job.query.filter(Job.kind == 'cleanup', Job.finished_at.isnot(None)).order_by(Job.finished_at.desc()).first()
+    return not last_cleanup or last_cleanup.finished_at <= now - datetime.timedelta(hours=RETENTION_INTERVAL_HOURS)
+
+def get_job_data(job):
+    data = {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'trigger': job.trigger,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+    if job.result:
+        data.update(json.loads(job.result))
+    return data
+
+def _run_job(job):
+    """Runs a queued job to completion, recording its outcome on the row."""
+    job.status = 'running'
+    job.started_at = datetime.datetime.now()
+    db.session.commit()
+    job_id = job.id
 
-        # Only update cache headers if we actually got data back
-        if new_etag: feed_in_session.etag = new_etag
-        if new_modified: feed_in_session.last_modified = new_modified
-        
-        if feed_data:
+    def save_progress(summary):
+        Job.query.filter_by(id=job_id).update({Job.result: json.dumps(summary)}, synchronize_session=False)
+        db.session.commit()
+
+    try:
+        if job.kind == 'cleanup':
+            summary = _apply_retention(on_progress=save_progress, **json.loads(job.params or '{}'))
+        elif job.kind == 'import':
+            # First fetch of the feeds an OPML import added, so they don't sit empty until their next refresh
+            summary = _refresh_feeds(force_refresh=True, feed_ids=json.loads(job.params)['feed_ids'], on_progress=save_progress)
+        else:
+            summary = _refresh_feeds(force_refresh=job.force)
+        status = 'done'
+    except Exception as e:
+        print(f"Job {job_id} failed: {e}", flush=True)
+        db.session.rollback()
+        summary = {'error': str(e)}
+        status = 'failed'
+
+    job = db.session.get(Job, job_id)
+    job.status = status
+    job.result = json.dumps(summary)
+    job.finished_at = datetime.datetime.now()
+    db.session.commit()
+    if summary.get('deleted_count'):
+        record_event('changed', {'job': job.kind})
+        db.session.commit()
+    if summary.get('added_count') or summary.get('deleted_count'):
+        bump_data_version()
+
+def _scheduler_tick():
+    """Runs the next queued job, or a scheduled refresh if any feed is due.
+
+    Returns False without doing anything when another worker holds the lock.
+    """
+    with open(scheduler_lock_path, 'w') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+
+        with app.app_context():
             try:
-                total_added += _update_articles_for_feed(feed_in_session, feed_data)
-            except Exception as e:
-                errors.append(f"{feed.title}: DB Error {e}")
-                db.session.rollback()
-    
+                # Holding the lock means nothing else is running, so any 'running' job was orphaned by a dead worker
+                Job.query.filter_by(status='running').update(
+                    {Job.status: 'failed', Job.finished_at: datetime.datetime.now()}, synchronize_session=False)
+                db.session.commit()
+
+                job = Job.query.filter_by(status='queued').order_by(Job.id).first()
+                if not job:
+                    now = datetime.datetime.now()
+                    is_due = Feed.query.filter(
+                        Feed.deleted_at.is_(None),
+                        or_(Feed.next_fetch_at.is_(None), Feed.next_fetch_at <= now)
+                    ).first() is not None
+                    if is_due:
+                        job = Job(kind='refresh', trigger='schedule')
+                    elif _retention_due(now):
+                        job = Job(kind='cleanup', trigger='schedule', params=json.dumps(
+                            {'max_age_days': RETENTION_MAX_AGE_DAYS, 'keep_last': RETENTION_KEEP_LAST}))
+                    if job:
+                        db.session.add(job)
+                        db.session.commit()
+
+                if job:
+                    _run_job(job)
+
+                cutoff = datetime.datetime.now() - datetime.timedelta(days=JOB_HISTORY_DAYS)
+                Job.query.filter(Job.finished_at < cutoff).delete(synchronize_session=False)
+                cutoff = datetime.datetime.now() - datetime.timedelta(days=DISCOVERY_CACHE_DAYS)
+                DiscoveryCache.query.filter(DiscoveryCache.checked_at < cutoff).delete(synchronize_session=False)
+                db.session.commit()
+            finally:
+                db.session.remove()
+    return True
+
+_scheduler_wakeup = threading.Event()
+_scheduler_started_pid = None
+_scheduler_start_lock = threading.Lock()
+
+def _scheduler_loop():
+    while True:
+        _scheduler_wakeup.wait(SCHEDULER_POLL_SECONDS)
+        _scheduler_wakeup.clear()
+        try:
+            _scheduler_tick()
+        except Exception as e:
+            print(f"Scheduler error: {e}", flush=True)
+
+def start_scheduler():
+    """Starts this process's scheduler thread (once per gunicorn worker, from post_worker_init in gunicorn.conf.py)."""
+    global _scheduler_started_pid
+    with _scheduler_start_lock:
+        if _scheduler_started_pid == os.getpid():
+            return
+        _scheduler_started_pid = os.getpid()
+    threading.Thread(target=_scheduler_loop, name='refresh-scheduler', daemon=True).start()
+
+@app.route('/api/refresh_all_feeds', methods=['POST'])
+def refresh_all_feeds():
+    """Queues a refresh for the scheduler and returns its job id straight away."""
+    data = request.get_json(silent=True) or {}
+    force_refresh = bool(data.get('force', False))
+
+    # Coalesce with a refresh that is already waiting, so many tabs don't queue many runs
+    job = Job.query.filter_by(kind='refresh', status='queued').order_by(Job.id).first()
+    if job:
+        job.force = job.force or force_refresh
+        job.trigger = 'user'
+    else:
+        job = Job(kind='refresh', trigger='user', force=force_refresh)
+        db.session.add(job)
     db.session.commit()
-    return jsonify({'success': True, 'added_count': total_added, 'errors': errors})
+
+    _scheduler_wakeup.set()
+    return jsonify({'success': True, 'job_id': job.id, 'status': job.status}), 202
+
+@app.route('/api/jobs/<int:job_id>')
+def get_job(job_id):
+    job = Job.query.get_or_404(job_id)
+    return jsonify(get_job_data(job))
+
+@app.route('/api/jobs/latest')
+def get_latest_job():
+    """Returns the most recently finished job, so clients can tell when new articles arrived."""
+    kind = request.args.get('kind', 'refresh')
+    job = Job.query.filter(Job.kind == kind, Job.finished_at.isnot(None)).order_by(Job.finished_at.desc()).first()
+    return jsonify(get_job_data(job) if job else {})
+
+@app.route('/api/feeds/health')
+def get_feeds_health():
+    """Per-feed stats over the recent fetches in feed_fetch: the slowest and heaviest feeds, the ones whose every
+    recent fetch failed, and each feed's share of total fetch time. ?limit= caps each list (default 10)."""
+    limit = request.args.get('limit', 10, type=int)
+    fetch_ms = func.coalesce(FeedFetch.wait_ms, 0) + func.coalesce(FeedFetch.download_ms, 0) + func.coalesce(FeedFetch.parse_ms, 0)
+    rows = (db.session.query(
+                FeedFetch.feed_id, Feed.title, Feed.url,
+                func.count(FeedFetch.id), func.sum(fetch_ms), func.avg(fetch_ms), func.avg(FeedFetch.wait_ms),
+                func.avg(FeedFetch.download_ms), func.avg(FeedFetch.parse_ms), func.avg(FeedFetch.bytes),
+                func.sum(db.case((FeedFetch.error.isnot(None), 1), else_=0)),
+                func.sum(db.case((FeedFetch.not_modified, 1), else_=0)),
+                func.avg(FeedFetch.entries_count), func.sum(FeedFetch.added_count), func.max(FeedFetch.fetched_at))
+            .join(Feed, Feed.id == FeedFetch.feed_id).filter(Feed.deleted_at.is_(None))
+            .group_by(FeedFetch.feed_id).all())
+    last_errors = dict(db.session.query(FeedFetch.feed_id, FeedFetch.error).filter(
+        FeedFetch.id.in_(db.session.query(func.max(FeedFetch.id)).group_by(FeedFetch.feed_id))))
+
+    total_ms = sum(row[4] or 0 for row in rows) or 1
+    feeds = []
+    for (feed_id, title, url, fetches, sum_ms, avg_ms, avg_wait, avg_download, avg_parse, avg_bytes,
+         failures, not_modified, avg_entries, added, last_fetched) in rows:
+        feeds.append({
+            'feed_id': feed_id, 'title': title, 'url': url,
+            'fetches': fetches,
+            'avg_ms': round(avg_ms or 0), 'avg_wait_ms': round(avg_wait or 0),
+            'avg_download_ms': round(avg_download or 0), 'avg_parse_ms': round(avg_parse or 0),
+            'avg_bytes': round(avg_bytes or 0), 'avg_entries': round(avg_entries or 0),
+            'time_share': round((sum_ms or 0) / total_ms, 4),
+            'failures': failures, 'not_modified': not_modified, 'added_count': added,
+            'last_fetched_at': last_fetched.isoformat() if last_fetched else None,
+            'last_error': last_errors.get(feed_id),
+        })
+
+    return jsonify({
+        'window': FETCH_HISTORY_SIZE,
+        'feeds_tracked': len(feeds),
+        'slowest': sorted(feeds, key=lambda f: f['avg_ms'], reverse=True)[:limit],
+        'heaviest': sorted(feeds, key=lambda f: f['avg_bytes'], reverse=True)[:limit],
+        'failing': sorted((f for f in feeds if f['failures'] == f['fetches']), key=lambda f: f['fetches'], reverse=True)[:limit],
+        'time_share': sorted(feeds, key=lambda f: f['time_share'], reverse=True)[:limit],
+    })
 
 @app.route('/api/move_feed', methods=['POST'])
 def move_feed():
@@ -727,6 +2753,16 @@ def move_feed():
     db.session.commit()
     return jsonify({'success': True})
 
+def _positive_int(value, maximum=2**63 - 1):
+    """A positive int up to maximum from a JSON value (a number or numeric string), or None if it isn't one."""
+    if isinstance(value, bool): return None
+    if isinstance(value, float) and not value.is_integer(): return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return value if 0 < value <= maximum else None
+
 @app.route('/api/feed/<int:feed_id>', methods=['PUT'])
 def update_feed_settings(feed_id):
     data = request.get_json()
@@ -738,6 +2774,13 @@ def update_feed_settings(feed_id):
         feed.exclude_from_all = bool(data.get('exclude_from_all'))
     if 'layout_style' in data:
         feed.layout_style = data.get('layout_style')
+    for key in ('retention_keep_last', 'retention_max_age_days'):
+        if key in data:
+            maximum = RETENTION_AGE_LIMIT_DAYS if key == 'retention_max_age_days' else 2**63 - 1
+            value = _positive_int(data[key], maximum) if data[key] not in (None, '') else None
+            if value is None and data[key] not in (None, ''):
+                return jsonify({'error': 'Retention values must be positive whole numbers'}), 400
+            setattr(feed, key, value)
         
     db.session.commit()
     return jsonify({'success': True})
@@ -871,17 +2914,19 @@ def remove_feed_from_stream(stream_id, feed_id):
 
 @app.route('/api/article/<int:article_id>/favorite', methods=['POST'])
 def toggle_favorite(article_id):
-    article = Article.query.get_or_404(article_id)
-    article.is_favorite = not article.is_favorite
-    db.session.commit()
-    return jsonify({'is_favorite': article.is_favorite})
+    is_favorite = submit_write(partial(_set_article_flag, article_id, 'is_favorite')).result()
+    if is_favorite is None:
+        abort(404)
+    invalidate_article_views([article_id], ['favorites'])
+    return jsonify({'is_favorite': is_favorite})
 
 @app.route('/api/article/<int:article_id>/bookmark', methods=['POST'])
 def toggle_bookmark(article_id):
-    article = Article.query.get_or_404(article_id)
-    article.is_read_later = not article.is_read_later
-    db.session.commit()
-    return jsonify({'is_read_later': article.is_read_later})
+    is_read_later = submit_write(partial(_set_article_flag, article_id, 'is_read_later')).result()
+    if is_read_later is None:
+        abort(404)
+    invalidate_article_views([article_id], ['readLater'])
+    return jsonify({'is_read_later': is_read_later})
 
 @app.route('/api/export_opml')
 def export_opml():
@@ -916,66 +2961,89 @@ def export_opml():
     response.headers["Content-Type"] = "application/xml"
     return response
 
+def _iter_opml_feeds(file):
+    """Yields (category name or None, title, xmlUrl) for each feed in an OPML file, parsing it incrementally.
+    A feed belongs to the innermost folder outline around it; feeds outside any folder have no category.
+    Each element is detached from its parent once parsed, so memory stays flat however long the file is."""
+    open_elements = []
+    folders = [] # one entry per open outline: its name if it's a folder, None if it's a feed
+    for event, element in ET.iterparse(file, events=('start', 'end')):
+        if event == 'end':
+            open_elements.pop()
+            if open_elements:
+                open_elements[-1].remove(element)
+            if element.tag == 'outline':
+                folders.pop()
+            continue
+        open_elements.append(element)
+        if element.tag != 'outline':
+            continue
+        text = element.get('text') or element.get('title') or 'Untitled'
+        xml_url = element.get('xmlUrl')
+        if xml_url:
+            yield next((name for name in reversed(folders) if name is not None), None), text, xml_url
+        folders.append(None if xml_url else text)
+
+def _import_feeds(new_feeds):
+    """Adds the (category name, title, url) feeds in the writer's transaction, with their missing categories
+    and an import job that fetches them. Skips urls another request stored in the meantime.
+    Returns (feed ids, number of categories added, job id or None)."""
+    urls = [url for _, _, url in new_feeds]
+    stored = set()
+    for start in range(0, len(urls), DEDUP_CHUNK_SIZE):
+        stored.update(db.session.scalars(db.select(Feed.url).where(Feed.url.in_(urls[start:start + DEDUP_CHUNK_SIZE]))))
+    category_ids = {name: category_id for category_id, name in db.session.query(Category.id, Category.name)}
+    added_categories = 0
+    rows = []
+    for category_name, title, url in new_feeds:
+        if url in stored:
+            continue
+        if category_name not in category_ids:
+            category = Category(name=category_name)
+            db.session.add(category)
+            db.session.flush()
+            category_ids[category_name] = category.id
+            added_categories += 1
+        rows.append({'title': title, 'url': url, 'category_id': category_ids[category_name]})
+
+    if not rows:
+        return [], added_categories, None
+    feed_ids = list(db.session.scalars(db.insert(Feed).returning(Feed.id), rows))
+    job = Job(kind='import', trigger='user', params=json.dumps({'feed_ids': feed_ids}))
+    db.session.add(job)
+    record_event('changed', {'endpoint': 'import_opml'})
+    return feed_ids, added_categories, job.id
+
 @app.route('/api/import_opml', methods=['POST'])
 def import_opml():
+    """Adds the OPML file's new feeds and categories, then queues a job that fetches the new feeds.
+    Poll /api/jobs/<job_id> for its progress."""
     if 'file' not in request.files:
         return jsonify({'error': 'No file uploaded'}), 400
-        
+
     file = request.files['file']
     if file.filename == '':
         return jsonify({'error': 'No file selected'}), 400
 
     try:
-        tree = ET.parse(file)
-        root = tree.getroot()
-        body = root.find('body')
-        
-        added_feeds = 0
-        added_categories = 0
-        
-        def process_outline(outline, current_category_id=None):
-            nonlocal added_feeds, added_categories
-            
-            text = outline.get('text') or outline.get('title') or 'Untitled'
-            xml_url = outline.get('xmlUrl')
-            
-            if xml_url:
-                if not Feed.query.filter_by(url=xml_url).first():
-                    target_cat_id = current_category_id
-                    if not target_cat_id:
-                        uncat = Category.query.filter_by(name='Uncategorized').first()
-                        if not uncat:
-                            uncat = Category(name='Uncategorized')
-                            db.session.add(uncat)
-                            db.session.commit()
-                        target_cat_id = uncat.id
-                    
-                    new_feed = Feed(title=text, url=xml_url, category_id=target_cat_id)
-                    db.session.add(new_feed)
-                    added_feeds += 1
-
-            elif list(outline): 
-                category = Category.query.filter_by(name=text).first()
-                if not category:
-                    category = Category(name=text)
-                    db.session.add(category)
-                    db.session.commit()
-                    added_categories += 1
-                
-                for child in outline:
-                    process_outline(child, category.id)
-
-        if body is not None:
-            for outline in body:
-                process_outline(outline)
-        
-        db.session.commit()
+        # Dedup against everything already stored with one query, instead of one per outline
+        known_urls = {url for (url,) in db.session.query(Feed.url)}
+        new_feeds = []
+        for category_name, title, xml_url in _iter_opml_feeds(file):
+            if xml_url not in known_urls:
+                known_urls.add(xml_url)
+                new_feeds.append((category_name or 'Uncategorized', title, xml_url))
+        db.session.rollback() # end the read before waiting on the writer
+
+        feed_ids, added_categories, job_id = submit_write(partial(_import_feeds, new_feeds), rows=len(new_feeds)).result()
         return jsonify({
-            'success': True, 
-            'message': f'Successfully imported {added_feeds} feeds and {added_categories} categories.'
+            'success': True,
+            'message': f'Successfully imported {len(feed_ids)} feeds and {added_categories} categories.',
+            'job_id': job_id,
         })
 
     except ET.ParseError:
+        db.session.rollback()
         return jsonify({'error': 'Invalid OPML file format'}), 400
     except Exception as e:
         print(f"Import Error: {e}")
@@ -985,27 +3053,30 @@ def import_opml():
 # *** NEW: Database Cleanup Route ***
 @app.route('/api/maintenance/cleanup', methods=['POST'])
 def cleanup_articles():
-    """Deletes articles older than 'days' (default 30) that are NOT favorites or bookmarks."""
-    days = request.get_json().get('days', 30)
-    cutoff_date = datetime.datetime.now() - datetime.timedelta(days=days)
-    
-    try:
-        deleted_count = Article.query.filter(
-            Article.published < cutoff_date,
-            Article.is_favorite == False,
-            Article.is_read_later == False
-        ).delete(synchronize_session=False)
-        
-        db.session.commit()
-        db.session.execute(db.text("VACUUM"))
-        
-        return jsonify({'success': True, 'deleted_count': deleted_count, 'message': f"Cleaned {deleted_count} old articles."})
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': str(e)}), 500
+    """Queues a cleanup job: articles older than 'days' (default 30) go, except in feeds with their own
+    retention policy. Favorites and bookmarks are always kept. Poll /api/jobs/<id> for progress."""
+    days = _positive_int((request.get_json(silent=True) or {}).get('days', 30), RETENTION_AGE_LIMIT_DAYS)
+    if days is None:
+        return jsonify({'error': 'days must be a positive whole number'}), 400
+    params = json.dumps({'max_age_days': days, 'keep_last': RETENTION_KEEP_LAST})
+
+    job = Job.query.filter_by(kind='cleanup', status='queued').order_by(Job.id).first()
+    if job:
+        job.params = params
+        job.trigger = 'user'
+    else:
+        job = Job(kind='cleanup', trigger='user', params=params)
+        db.session.add(job)
+    db.session.commit()
+
+    _scheduler_wakeup.set()
+    return jsonify({'success': True, 'job_id': job.id, 'status': job.status}), 202
 
 if __name__ == '__main__':
     if 'DATA_DIR' in os.environ and not os.path.exists(data_dir):
         os.makedirs(data_dir)
     initialize_database()
+    # With the debug reloader only the child that serves requests runs the scheduler
+    if SCHEDULER_ENABLED and (os.environ.get('FLASK_DEBUG') != '1' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        start_scheduler()
     app.run(debug=(os.environ.get('FLASK_DEBUG') == '1'), host='0.0.0.0', port=5000)
\ No newline at end of file
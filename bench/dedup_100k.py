@@ -0,0 +1,122 @@
+"""Queries and wall time of one refresh's dedup and insert on a 100k-article database (user-003).
+
+    python bench/dedup_100k.py [--feeds 500] [--stored 200] [--entries 50] [--new 2]
+
+Builds a database of --feeds feeds with --stored articles each (100k by default), then stores one refresh
+worth of payloads: --entries entries per feed, of which --new are not stored yet. "before" is the old
+ingest loop (a SELECT by link per entry and an ORM add per new article), "after" is _insert_new_articles
+(one IN lookup per DEDUP_CHUNK_SIZE links and a bulk insert). Both run on copies of the same database,
+each feed in its own transaction as ingest does, and count every statement the engine executes.
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+from sqlalchemy import event
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EPOCH = datetime.datetime(2026, 1, 1)
+
+
+def load_app(data_dir):
+    os.environ.update(DATA_DIR=data_dir, SCHEDULER_ENABLED='0')
+    sys.path.insert(0, ROOT)
+    import app as volumeread
+    volumeread.initialize_database()
+    return volumeread
+
+
+def article(n, i):
+    body = f'<p>Body of post {n}-{i}</p>'
+    return {'title': f'Post {n}-{i}', 'link': f'https://feed{n}.example/{i}', 'summary': f'Summary {n}-{i}',
+            'full_content': body, 'image_url': None, 'author': f'Author {n}',
+            'published': EPOCH + datetime.timedelta(minutes=i)}
+
+
+def build(data_dir, feeds, stored):
+    volumeread = load_app(data_dir)
+    with volumeread.app.app_context():
+        category_id = volumeread.Category.query.first().id
+        volumeread.db.session.execute(volumeread.db.insert(volumeread.Feed), [
+            {'id': n + 1, 'title': f'Feed {n}', 'url': f'https://feed{n}.example/rss', 'category_id': category_id}
+            for n in range(feeds)])
+        for n in range(feeds):
+            rows, contents = [article(n, i) for i in range(stored)], {}
+            for row in rows:
+                body = row.pop('full_content')
+                row.update(feed_id=n + 1, content_hash=hashlib.sha256(body.encode()).hexdigest())
+                contents[row['content_hash']] = body
+            volumeread._store_contents(contents)
+            volumeread.db.session.execute(volumeread.db.insert(volumeread.Article), rows)
+        volumeread.db.session.commit()
+        volumeread.rerank_all_feeds()
+
+
+def measure(mode, data_dir, feeds, stored, entries, new):
+    """Runs in a child process on its own copy of the database. Returns the numbers as a dict."""
+    volumeread = load_app(data_dir)
+    db, Article = volumeread.db, volumeread.Article
+    statements = [0]
+    with volumeread.app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.__setitem__(0, statements[0] + 1))
+        payloads = [[article(n, i) for i in range(stored - entries + new, stored + new)] for n in range(feeds)]
+        added = 0
+        started = time.perf_counter()
+        for feed_id, articles in enumerate(payloads, 1):
+            if mode == 'before':
+                for entry in articles:
+                    if Article.query.filter_by(link=entry['link']).first():
+                        continue
+                    body = entry.pop('full_content')
+                    db.session.add(Article(feed_id=feed_id, inline_content=body, **entry))
+                    added += 1
+            else:
+                added += volumeread._insert_new_articles(feed_id, articles)
+            db.session.commit()
+        return {'mode': mode, 'added': added, 'statements': statements[0], 'seconds': round(time.perf_counter() - started, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--feeds', type=int, default=500)
+    parser.add_argument('--stored', type=int, default=200)
+    parser.add_argument('--entries', type=int, default=50)
+    parser.add_argument('--new', type=int, default=2)
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'DATA_DIR'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    sizes = (args.feeds, args.stored)
+
+    if args.child:
+        mode, data_dir = args.child
+        if mode == 'build':
+            build(data_dir, *sizes)
+        else:
+            print(json.dumps(measure(mode, data_dir, *sizes, args.entries, args.new)))
+        return
+
+    def child(mode, data_dir):
+        command = [sys.executable, __file__, '--child', mode, data_dir, '--feeds', str(args.feeds), '--stored',
+                   str(args.stored), '--entries', str(args.entries), '--new', str(args.new)]
+        return subprocess.run(command, capture_output=True, text=True, check=True).stdout
+
+    template = tempfile.mkdtemp(prefix='bench-dedup-')
+    print(f"building {args.feeds * args.stored:,} articles in {args.feeds} feeds...")
+    child('build', template)
+    print(f"{'':>7} {'added':>7} {'queries':>8} {'seconds':>8}")
+    for mode in ('before', 'after'):
+        data_dir = tempfile.mkdtemp(prefix=f'bench-dedup-{mode}-')
+        with sqlite3.connect(os.path.join(template, 'app.db')) as source, sqlite3.connect(os.path.join(data_dir, 'app.db')) as copy:
+            source.backup(copy)
+        result = json.loads(child(mode, data_dir).strip().splitlines()[-1])
+        print(f"{result['mode']:>7} {result['added']:>7} {result['statements']:>8,} {result['seconds']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Local stand-in for feed origins, used by the refresh benchmarks.
+
+    python bench/feedserver.py [--host 127.0.0.1] [--port 8791] [--entries 150] [--body-bytes 8000] [--latency-ms 50 600]
+
+GET /f/<n>.xml returns feed n: an RSS document with --entries items whose links are unique to the feed,
+each carrying about --body-bytes of HTML, after a random delay in the --latency-ms range. The content is
+the same on every request, so a second refresh sees nothing new. GET /stats returns how many TCP
+connections and requests were served, which is how the pooled-session benchmark counts reconnects. Servers
+on different loopback addresses (127.0.0.2, 127.0.0.3, ...) stand in for different hosts.
+"""
+import argparse
+import json
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def build_feed(n, entries, body_bytes):
+    body = ('<p>' + 'lorem ipsum dolor sit amet ' * (body_bytes // 27 + 1))[:body_bytes] + '</p>'
+    items = ''.join(
+        f'<item><title>Post {n}-{i}</title><link>https://feed{n}.example/{i}</link><guid>https://feed{n}.example/{i}</guid>'
+        f'<pubDate>Mon, {1 + i % 28:02d} Jun 2026 10:00:00 GMT</pubDate><description><![CDATA[{body} {n}-{i}]]></description></item>'
+        for i in range(entries))
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>Feed {n}</title>{items}</channel></rss>'.encode()
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so connection reuse shows up in /stats
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests += 1
+        if self.path == '/stats':
+            body, ctype = json.dumps({'connections': self.server.connections, 'requests': self.server.requests}).encode(), 'application/json'
+        else:
+            match = re.match(r'/f/(\d+)\.xml', self.path)
+            if not match:
+                self.send_error(404)
+                return
+            time.sleep(random.uniform(*self.server.latency) / 1000)
+            body, ctype = build_feed(int(match.group(1)), self.server.entries, self.server.body_bytes), 'application/rss+xml'
+        self.send_response(200)
+        self.send_header('Content-Type', ctype)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start(entries=150, body_bytes=8000, latency_ms=(50, 600), host='127.0.0.1'):
+    """Runs the server in a child process (so it doesn't count towards the benchmark's memory).
+    Returns (process, base URL)."""
+    process = subprocess.Popen(
+        [sys.executable, __file__, '--host', host, '--port', '0', '--entries', str(entries), '--body-bytes', str(body_bytes),
+         '--latency-ms', str(latency_ms[0]), str(latency_ms[1])], stdout=subprocess.PIPE, text=True)
+    port = int(process.stdout.readline().split()[-1])
+    return process, f'http://{host}:{port}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8791)
+    parser.add_argument('--entries', type=int, default=150)
+    parser.add_argument('--body-bytes', type=int, default=8000)
+    parser.add_argument('--latency-ms', type=int, nargs=2, default=(50, 600))
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), FeedHandler)
+    server.daemon_threads = True
+    server.request_queue_size = 1024
+    server.lock = threading.Lock()
+    server.connections = server.requests = 0
+    server.entries, server.body_bytes, server.latency = args.entries, args.body_bytes, args.latency_ms
+    print(f'listening on {server.server_port}', flush=True)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
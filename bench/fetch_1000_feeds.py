@@ -0,0 +1,115 @@
+"""Connections, errors and wall time of fetching 1,000 feeds from local stand-in hosts (user-005).
+
+    python bench/fetch_1000_feeds.py [--feeds 1000] [--hosts 10] [--entries 10] [--latency-ms 50 600]
+
+Feeds are served by bench/feedserver.py on --hosts loopback addresses: half of them on the first host, the
+way dozens of reddit.com or RSS-Bridge feeds share one, and the rest spread over the others. Three runs:
+
+  urllib   the old fetch path: feedparser.parse(url) in a ThreadPoolExecutor of 10, a new connection per feed
+  session  the new fetch path: _fetch_one_feed over the pooled keep-alive session, FETCH_CONCURRENCY threads,
+           at most FETCH_PER_HOST_LIMIT requests open per host; parses like urllib but stores nothing
+  refresh  a forced _refresh_feeds, i.e. session plus storing every article
+
+Connection counts come from the servers' /stats. Set FETCH_CONCURRENCY or FETCH_PER_HOST_LIMIT in the
+environment to try other limits. With --hosts 1 every feed waits for the same FETCH_PER_HOST_LIMIT slots,
+so session is slower than urllib's 10 unthrottled connections: that is the limit doing its job, not a
+regression.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import feedserver
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ('urllib', 'session', 'refresh')
+
+
+def server_stats(base_urls):
+    totals = {'connections': 0, 'requests': 0}
+    for base_url in base_urls:
+        with urllib.request.urlopen(f'{base_url}/stats') as response:
+            for key, value in json.load(response).items():
+                totals[key] += value
+    return totals
+
+
+def feed_urls(base_urls, feed_count):
+    """Half the feeds on the first host, the rest round-robin over the others."""
+    if len(base_urls) == 1:
+        return [f'{base_urls[0]}/f/{n}.xml' for n in range(feed_count)]
+    return [f'{base_urls[0] if n % 2 else base_urls[1 + (n // 2) % (len(base_urls) - 1)]}/f/{n}.xml' for n in range(feed_count)]
+
+
+def measure(mode, feed_count, base_urls):
+    """Runs in the child process. Returns the numbers as a dict."""
+    os.environ.update(DATA_DIR=tempfile.mkdtemp(prefix='bench-fetch-'), SCHEDULER_ENABLED='0', PARSE_WORKERS='0')
+    sys.path.insert(0, ROOT)
+    import app as volumeread
+
+    urls = feed_urls(base_urls, feed_count)
+    volumeread.initialize_database()
+    with volumeread.app.app_context():
+        category_id = volumeread.Category.query.first().id
+        volumeread.db.session.execute(volumeread.db.insert(volumeread.Feed), [
+            {'title': f'Feed {n}', 'url': url, 'category_id': category_id} for n, url in enumerate(urls)])
+        volumeread.db.session.commit()
+        feeds = volumeread.Feed.query.all()
+        before = server_stats(base_urls)
+        started = time.perf_counter()
+        if mode == 'urllib':
+            with ThreadPoolExecutor(max_workers=10) as executor:
+                parsed = list(executor.map(volumeread.feedparser.parse, urls))
+            errors = sum(1 for feed_data in parsed if feed_data.bozo and not feed_data.entries)
+        elif mode == 'session':
+            with ThreadPoolExecutor(max_workers=volumeread.FETCH_CONCURRENCY) as executor:
+                results = list(executor.map(volumeread._fetch_one_feed,
+                                            [(feed, True, None) for feed in volumeread._interleave_by_host(feeds)]))
+            errors = sum(1 for result in results if result['error'])
+        else:
+            errors = len(volumeread._refresh_feeds(force_refresh=True)['errors'])
+        seconds = time.perf_counter() - started
+        after = server_stats(base_urls)
+    # Less the /stats calls themselves: one connection and one request per server
+    return {'mode': mode, 'feeds': feed_count, 'errors': errors, 'seconds': round(seconds, 1),
+            'connections': after['connections'] - before['connections'] - len(base_urls),
+            'requests': after['requests'] - before['requests'] - len(base_urls)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--feeds', type=int, default=1000)
+    parser.add_argument('--hosts', type=int, default=10)
+    parser.add_argument('--entries', type=int, default=10)
+    parser.add_argument('--body-bytes', type=int, default=2000)
+    parser.add_argument('--latency-ms', type=int, nargs=2, default=(50, 600))
+    parser.add_argument('--child', nargs='+', metavar='MODE BASE_URL', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child[0], args.feeds, args.child[1:])))
+        return
+
+    servers = [feedserver.start(args.entries, args.body_bytes, args.latency_ms, host=f'127.0.0.{n + 1}') for n in range(args.hosts)]
+    base_urls = [base_url for _, base_url in servers]
+    try:
+        print(f"{'':>8} {'feeds':>6} {'errors':>6} {'connections':>11} {'requests':>8} {'seconds':>8}")
+        for mode in MODES:
+            output = subprocess.run([sys.executable, __file__, '--feeds', str(args.feeds), '--child', mode, *base_urls],
+                                    capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{result['mode']:>8} {result['feeds']:>6} {result['errors']:>6} {result['connections']:>11} "
+                  f"{result['requests']:>8} {result['seconds']:>8}")
+    finally:
+        for process, _ in servers:
+            process.terminate()
+
+
+if __name__ == '__main__':
+    main()
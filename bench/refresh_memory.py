@@ -0,0 +1,71 @@
+"""Peak memory of a full refresh against local feeds (user-024).
+
+    python bench/refresh_memory.py [--feeds 100 400 800] [--entries 150] [--body-bytes 8000]
+
+Each run starts a fresh process with an empty DATA_DIR, adds N feeds served by bench/feedserver.py and
+times one forced _refresh_feeds. Peak RSS is the process's ru_maxrss. With the pipelined refresh it should
+stay roughly flat as N grows: only FETCH_CONCURRENCY * 2 fetches and WRITE_QUEUE_SIZE writes are held at
+once. What growth remains is SQLite's page cache and mmap of the growing file (SQLITE_CACHE_SIZE,
+SQLITE_MMAP_SIZE). PARSE_WORKERS=0 keeps parsing in the measured process.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import feedserver
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(feed_count, base_url):
+    """Runs in the child process: one forced refresh of feed_count feeds. Returns the numbers as a dict."""
+    os.environ.update(DATA_DIR=tempfile.mkdtemp(prefix='bench-refresh-'), SCHEDULER_ENABLED='0', PARSE_WORKERS='0',
+                      FETCH_PER_HOST_LIMIT='64')
+    sys.path.insert(0, ROOT)
+    import app as volumeread
+
+    volumeread.initialize_database()
+    with volumeread.app.app_context():
+        category_id = volumeread.Category.query.first().id
+        volumeread.db.session.execute(volumeread.db.insert(volumeread.Feed), [
+            {'title': f'Feed {n}', 'url': f'{base_url}/f/{n}.xml', 'category_id': category_id} for n in range(feed_count)])
+        volumeread.db.session.commit()
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.perf_counter()
+        summary = volumeread._refresh_feeds(force_refresh=True)
+        return {'feeds': feed_count, 'added': summary['added_count'], 'errors': len(summary['errors']),
+                'seconds': round(time.perf_counter() - started, 1),
+                'rss_before_mb': rss_before // 1024, 'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--feeds', type=int, nargs='+', default=[100, 400, 800])
+    parser.add_argument('--entries', type=int, default=150)
+    parser.add_argument('--body-bytes', type=int, default=8000)
+    parser.add_argument('--child', nargs=2, metavar=('FEEDS', 'BASE_URL'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(int(args.child[0]), args.child[1])))
+        return
+
+    server, base_url = feedserver.start(args.entries, args.body_bytes)
+    try:
+        print(f"{'feeds':>6} {'added':>8} {'errors':>6} {'seconds':>8} {'peak RSS':>9}")
+        for feed_count in args.feeds:
+            output = subprocess.run([sys.executable, __file__, '--child', str(feed_count), base_url],
+                                    capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{result['feeds']:>6} {result['added']:>8} {result['errors']:>6} {result['seconds']:>8} {result['peak_rss_mb']:>6} MB")
+    finally:
+        server.terminate()
+
+
+if __name__ == '__main__':
+    main()
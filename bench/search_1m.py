@@ -0,0 +1,122 @@
+"""Latency of /api/articles search over 1M articles: the FTS5 index against the old ilike scan (user-007).
+
+    python bench/search_1m.py [--articles 1000000] [--feeds 1000] [--data-dir DIR] [--runs 5]
+
+Fills a database with synthetic articles whose titles, summaries and authors are drawn from a fixed
+vocabulary, so common and rare words both occur. For each sample word, and one that occurs nowhere, it
+times the first page of GET /api/articles?search=<word> (FTS5: ranked by bm25, or newest first for words
+with more than SEARCH_RANK_CANDIDATES matches) and the query the endpoint used to run: four ilike('%word%')
+clauses over title, summary, feed title and author, newest first. It then times a full
+'rebuild-search-index'. Building 1M articles takes a few minutes; pass --data-dir to keep the database and
+reuse it on the next run.
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VOCABULARY_SIZE = 20000
+SAMPLE_RANKS = (5, 50, 500, 5000, 19000)  # common to rare, by Zipf rank
+MISSING_WORD = 'xylograph'  # in no article, so ilike scans the whole table
+PER_PAGE = 24
+
+
+def make_vocabulary(rng):
+    syllables = ['ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'to', 'vi', 'ze', 'po', 'qu', 'fi', 'da', 'gen', 'har', 'bel']
+    words = {}  # insertion-ordered, so a word's rank doesn't follow the alphabet
+    while len(words) < VOCABULARY_SIZE:
+        words.setdefault(''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4))))
+    return list(words)
+
+
+def build(volumeread, article_count, feed_count):
+    rng = random.Random(21)
+    vocabulary = make_vocabulary(rng)
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    started = time.perf_counter()
+    with volumeread.app.app_context():
+        db = volumeread.db
+        category_id = volumeread.Category.query.first().id
+        db.session.execute(db.insert(volumeread.Feed), [
+            {'id': n + 1, 'title': f'Feed {n}', 'url': f'https://feed{n}.example/rss', 'category_id': category_id}
+            for n in range(feed_count)])
+        epoch = datetime.datetime(2026, 1, 1)
+        for start in range(0, article_count, 10000):
+            count = min(10000, article_count - start)
+            words = rng.choices(vocabulary, weights, k=count * 36)
+            db.session.execute(db.insert(volumeread.Article), [
+                {'feed_id': i % feed_count + 1, 'link': f'https://feed{i % feed_count}.example/{i}',
+                 'title': ' '.join(words[j * 36:j * 36 + 6]), 'summary': ' '.join(words[j * 36 + 6:j * 36 + 35]),
+                 'author': words[j * 36 + 35].title(), 'published': epoch - datetime.timedelta(minutes=i)}
+                for j, i in enumerate(range(start, start + count))])
+            db.session.commit()
+            print(f"  {start + count:,} articles", end='\r', flush=True)
+    print(f"\nbuilt {article_count:,} articles in {time.perf_counter() - started:.0f} s")
+    return [vocabulary[rank - 1] for rank in SAMPLE_RANKS]
+
+
+def old_search(volumeread, word):
+    """The ilike query /api/articles ran for a search before the FTS index."""
+    Article, Feed = volumeread.Article, volumeread.Feed
+    pattern = f'%{word}%'
+    return (Article.query.join(Feed)
+            .filter(volumeread.or_(Article.title.ilike(pattern), Article.summary.ilike(pattern),
+                                   Feed.title.ilike(pattern), Article.author.ilike(pattern)))
+            .order_by(Article.published.desc()).limit(PER_PAGE).all())
+
+
+def timed_ms(fn, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--articles', type=int, default=1000000)
+    parser.add_argument('--feeds', type=int, default=1000)
+    parser.add_argument('--data-dir')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.update(DATA_DIR=args.data_dir or tempfile.mkdtemp(prefix='bench-search-'), SCHEDULER_ENABLED='0')
+    os.makedirs(os.environ['DATA_DIR'], exist_ok=True)
+    sys.path.insert(0, ROOT)
+    import app as volumeread
+
+    volumeread.initialize_database()
+    with volumeread.app.app_context():
+        stored = volumeread.Article.query.count()
+    if stored:
+        print(f"reusing {stored:,} articles in {os.environ['DATA_DIR']}")
+        samples = [make_vocabulary(random.Random(21))[rank - 1] for rank in SAMPLE_RANKS]
+    else:
+        samples = build(volumeread, args.articles, args.feeds)
+
+    client = volumeread.app.test_client()
+    print(f"{'word':>14} {'rank':>6} {'ilike ms':>9} {'fts ms':>7}")
+    with volumeread.app.app_context():
+        for rank, word in zip(SAMPLE_RANKS + ('-',), samples + [MISSING_WORD]):
+            def fts():
+                response = client.get('/api/articles', query_string={'view_type': 'all', 'smart_cap': 'false',
+                                                                     'search': word, 'per_page': PER_PAGE})
+                assert response.status_code == 200, response.status_code
+            ilike_ms = timed_ms(lambda: old_search(volumeread, word), args.runs)
+            fts_ms = timed_ms(fts, args.runs)
+            print(f"{word:>14} {rank:>6} {ilike_ms:>9.0f} {fts_ms:>7.0f}")
+
+        started = time.perf_counter()
+        volumeread.rebuild_search_index()
+        print(f"rebuild-search-index: {time.perf_counter() - started:.0f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -46,4 +46,5 @@ echo "App initialization complete."
 
 # Now, start the Gunicorn server
 echo "Starting Gunicorn..."
-exec gunicorn --workers 4 --bind 0.0.0.0:5000 app:app
\ No newline at end of file
+# Threaded workers: each open /api/events stream holds a thread, not a whole worker
+exec gunicorn --config gunicorn.conf.py --workers 4 --threads "${GUNICORN_THREADS:-16}" --bind 0.0.0.0:5000 app:app
\ No newline at end of file
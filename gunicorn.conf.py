@@ -0,0 +1,8 @@
+# Gunicorn settings for the container (entrypoint.sh passes --config gunicorn.conf.py)
+
+
+def post_worker_init(worker):
+    """Starts each worker's refresh scheduler as soon as the worker has booted, not on its first request."""
+    import app
+    if app.SCHEDULER_ENABLED:
+        app.start_scheduler()
@@ -21,12 +21,14 @@ document.addEventListener('alpine:init', () => {
             removedFeeds: [],
             removedStreams: [],
             customStreamFeedLinks: [],
+            counts: {},
         },
         articles: [],
         currentView: { type: 'all', id: null, title: 'All Feeds' },
 
         // --- Article Loading State ---
         currentPage: 1,
+        nextCursor: null,
         totalPages: 1,
         hasNextPage: false,
         isLoadingArticles: false,
@@ -38,6 +40,7 @@ document.addEventListener('alpine:init', () => {
         modalEmbedHtml: null, 
         activeArticleIndex: -1, 
         isRefreshing: false,
+        cleanupStatus: null,
         copiedArticleId: null,
         
         // --- Sidebar State ---
@@ -56,6 +59,8 @@ document.addEventListener('alpine:init', () => {
         
         // --- Filtering & Sorting ---
         searchQuery: '',
+        activeSearch: '',
+        searchTimer: null,
         sortOrder: 'newest',
         unreadOnly: false,
 
@@ -75,7 +80,7 @@ document.addEventListener('alpine:init', () => {
 
         // --- Edit Modal State ---
         isEditModalOpen: false,
-        editModal: { type: null, id: null, currentName: '', url: '', layout_style: 'default' },
+        editModal: { type: null, id: null, currentName: '', url: '', layout_style: 'default', retention_keep_last: '', retention_max_age_days: '' },
         editModalNewName: '',
         editModalError: '',
         editModalExcludeAll: false,
@@ -103,12 +108,22 @@ document.addEventListener('alpine:init', () => {
                 }
             });
 
+            // Search once typing pauses for 250ms, not on every keystroke
+            this.$watch('searchQuery', () => {
+                clearTimeout(this.searchTimer);
+                this.searchTimer = setTimeout(() => {
+                    this.searchTimer = null;
+                    if (this.searchQuery.trim() !== this.activeSearch) this.fetchArticles(true);
+                }, 250);
+            });
+
             this.isRefreshing = true;
             await this.fetchAppData();
             await this.fetchArticles(true); 
             this.isRefreshing = false;
             
-            setInterval(() => this.refreshAllFeeds(true), 15 * 60 * 1000);
+            // Refreshing happens on the server; it pushes what changed over /api/events
+            this.connectEvents();
         },
 
         // --- Keyboard Shortcuts (J/K Navigation) ---
@@ -162,10 +177,16 @@ document.addEventListener('alpine:init', () => {
         },
 
         // --- Smart Image Error Handler ---
+        imageSrc(article, width) {
+            // Signed /img/ URLs come from the API; without a signature the image loads from its origin
+            if (!article.image_sig) return article.image_url;
+            return `/img/${width}/${article.image_sig}?url=${encodeURIComponent(article.image_url)}`;
+        },
         handleImageError(event) {
             const img = event.target;
             const src = img.src;
-            if (src.includes('maxresdefault.jpg')) {
+            // Proxied (/img/) URLs are signed, and the proxy already falls back to hqdefault itself
+            if (src.includes('maxresdefault.jpg') && !new URL(src).pathname.startsWith('/img/')) {
                 img.src = src.replace('maxresdefault.jpg', 'hqdefault.jpg');
             } else {
                 img.style.display = 'none';
@@ -209,6 +230,8 @@ document.addEventListener('alpine:init', () => {
                     removedFeeds: data.removedFeeds || [],
                     removedStreams: data.removedStreams || [],
                     customStreamFeedLinks: data.customStreamFeedLinks || [],
+                    counts: data.counts || {},
+                    event_seq: data.event_seq || 0,
                 };
             } catch (error) {
                 console.error('Error fetching app data:', error);
@@ -218,6 +241,7 @@ document.addEventListener('alpine:init', () => {
         async fetchArticles(isNewQuery = false) {
             if (isNewQuery) {
                 this.currentPage = 1;
+                this.nextCursor = null;
                 this.articles = [];
                 this.hasNextPage = false;
             }
@@ -228,12 +252,20 @@ document.addEventListener('alpine:init', () => {
 
             this.isLoadingArticles = true;
 
-            let url = `/api/articles?page=${this.currentPage}`;
+            // Browsing pages by cursor keeps deep infinite scroll cheap; ranked searches still go by page number
+            const useCursor = !this.searchQuery.trim();
+            let url = useCursor
+                ? `/api/articles?cursor=${encodeURIComponent(this.nextCursor || '')}`
+                : `/api/articles?page=${this.currentPage}`;
             if (this.unreadOnly) url += '&unread_only=true';
             
             // Add Smart Cap parameter
             url += `&smart_cap=${this.smartFeedCap}`; 
 
+            // Search runs on the server so it covers every stored article, not just the loaded pages
+            this.activeSearch = this.searchQuery.trim();
+            if (this.activeSearch) url += `&search=${encodeURIComponent(this.activeSearch)}`;
+
             url += `&view_type=${this.currentView.type}`;
             if (this.currentView.id) url += `&view_id=${this.currentView.id}`;
             if (this.currentView.type === 'author' && this.currentView.title) {
@@ -246,7 +278,8 @@ document.addEventListener('alpine:init', () => {
                 const data = await response.json();
                 
                 this.articles = this.articles.concat(data.articles);
-                this.totalPages = data.total_pages;
+                if (data.total_pages !== undefined) this.totalPages = data.total_pages;
+                this.nextCursor = data.next_cursor || null;
                 this.hasNextPage = data.has_next;
                 
                 if (data.is_reddit_source) {
@@ -259,6 +292,9 @@ document.addEventListener('alpine:init', () => {
                 console.error('Error fetching articles:', error);
             } finally {
                 this.isLoadingArticles = false;
+                // The search box changed while this page was loading; start over with the new query,
+                // unless the watcher is still waiting for typing to pause
+                if (!this.searchTimer && this.searchQuery.trim() !== this.activeSearch) this.fetchArticles(true);
             }
         },
 
@@ -267,11 +303,15 @@ document.addEventListener('alpine:init', () => {
             this.isRefreshing = true;
             try {
                 const payload = { force: !isAutoRefresh };
-                await fetch('/api/refresh_all_feeds', { 
+                const response = await fetch('/api/refresh_all_feeds', { 
                     method: 'POST',
                     headers: { 'Content-Type': 'application/json' },
                     body: JSON.stringify(payload)
                 });
+                const data = await response.json();
+                if (data.job_id) {
+                    await this.waitForJob(data.job_id);
+                }
                 await this.fetchAppData();
                 await this.fetchArticles(true); 
             } catch (error) {
@@ -280,7 +320,124 @@ document.addEventListener('alpine:init', () => {
                 this.isRefreshing = false;
             }
         },
-        
+
+        // Polls a background job until the scheduler has finished it
+        async waitForJob(jobId, intervalMs = 2000, onProgress = null) {
+            while (true) {
+                const response = await fetch(`/api/jobs/${jobId}`);
+                if (!response.ok) return null;
+                const job = await response.json();
+                if (job.status === 'done' || job.status === 'failed') return job;
+                if (onProgress) onProgress(job);
+                await new Promise(resolve => setTimeout(resolve, intervalMs));
+            }
+        },
+
+        // Runs the retention cleanup as a background job, showing how far it got
+        async cleanOldArticles(days = 30) {
+            if (this.cleanupStatus) return;
+            this.cleanupStatus = 'Queued...';
+            try {
+                const data = await this.apiRequest('POST', '/api/maintenance/cleanup', { days });
+                if (!data || !data.job_id) {
+                    alert((data && data.error) || 'Cleanup failed.');
+                    return;
+                }
+                const job = await this.waitForJob(data.job_id, 1000, (job) => {
+                    if (job.feeds_total) {
+                        this.cleanupStatus = `Checked ${job.feeds_checked} of ${job.feeds_total} feeds, ${job.deleted_count} articles removed...`;
+                    }
+                });
+                if (!job || job.status === 'failed') {
+                    alert('Cleanup failed' + (job && job.error ? `: ${job.error}` : '.'));
+                } else {
+                    const freedMb = (job.reclaimed_bytes || 0) / (1024 * 1024);
+                    alert(`Cleaned ${job.deleted_count} old articles` + (freedMb >= 0.1 ? `, freed ${freedMb.toFixed(1)} MB.` : '.'));
+                    await this.fetchArticles(true);
+                }
+            } finally {
+                this.cleanupStatus = null;
+            }
+        },
+
+        // Follows the server's event log. The browser reconnects on its own and resumes after the last event id.
+        connectEvents() {
+            const source = new EventSource(`/api/events?since=${this.appData.event_seq || 0}`);
+            source.addEventListener('articles', (e) => this.onArticlesEvent(JSON.parse(e.data)));
+            source.addEventListener('flags', (e) => this.onFlagsEvent(JSON.parse(e.data)));
+            source.addEventListener('changed', () => this.fetchAppData());
+            source.addEventListener('reset', async () => {
+                await this.fetchAppData();
+                await this.fetchArticles(true);
+            });
+        },
+
+        // Loads just the announced articles that belong in the current view, and puts them in date order
+        async onArticlesEvent(event) {
+            this.applyFeedCounts(event.counts);
+            if (this.activeSearch || this.isRefreshing || this.isLoadingArticles) return;
+            const known = new Set(this.articles.map(a => a.id));
+            const ids = event.ids.filter(id => !known.has(id));
+            if (!ids.length) return;
+
+            let url = `/api/articles?ids=${ids.join(',')}&smart_cap=${this.smartFeedCap}&view_type=${this.currentView.type}`;
+            if (this.unreadOnly) url += '&unread_only=true';
+            if (this.currentView.id) url += `&view_id=${this.currentView.id}`;
+            if (this.currentView.type === 'author' && this.currentView.title) {
+                url += `&author_name=${encodeURIComponent(this.currentView.title)}`;
+            }
+            try {
+                const response = await fetch(url);
+                if (!response.ok) return;
+                const data = await response.json();
+                const oldest = this.articles.length ? this.articles[this.articles.length - 1].published : null;
+                // Articles older than the loaded pages arrive with the next page instead
+                const fresh = data.articles.filter(a => !known.has(a.id) && (!this.hasNextPage || !oldest || a.published >= oldest));
+                if (!fresh.length) return;
+                this.articles = this.articles.concat(fresh)
+                    .sort((a, b) => (b.published > a.published) - (b.published < a.published) || b.id - a.id);
+            } catch (error) {
+                console.error('Error loading new articles:', error);
+            }
+        },
+
+        onFlagsEvent(event) {
+            this.applyFeedCounts(event.counts);
+            const ids = new Set(event.ids);
+            const changes = {};
+            for (const flag of ['is_read', 'is_favorite', 'is_read_later']) {
+                if (flag in event) changes[flag] = event[flag];
+            }
+            for (const article of this.articles) {
+                if (ids.has(article.id)) Object.assign(article, changes);
+            }
+            if (this.modalArticle && ids.has(this.modalArticle.id)) Object.assign(this.modalArticle, changes);
+        },
+
+        // Takes per-feed counters from an event and recomputes the category, stream and total badges from them
+        applyFeedCounts(counts) {
+            if (!counts) return;
+            const feeds = this.appData.feeds;
+            for (const feed of feeds) {
+                if (counts[feed.id]) feed.counts = counts[feed.id];
+            }
+            const sum = (list) => {
+                const totals = { total: 0, unread: 0, favorites: 0, read_later: 0 };
+                for (const feed of list) {
+                    for (const key in totals) totals[key] += (feed.counts && feed.counts[key]) || 0;
+                }
+                return totals;
+            };
+            for (const category of this.appData.categories) {
+                category.counts = sum(feeds.filter(f => f.category_id === category.id));
+            }
+            for (const stream of this.appData.customStreams) {
+                const feedIds = new Set(this.appData.customStreamFeedLinks.filter(l => l.custom_stream_id === stream.id).map(l => l.feed_id));
+                stream.counts = sum(feeds.filter(f => feedIds.has(f.id)));
+            }
+            this.appData.counts = Object.assign(sum(feeds), { all_unread: sum(feeds.filter(f => !f.exclude_from_all)).unread });
+        },
+
         // --- Computed Properties ---
         get currentTitle() {
             if (this.currentView.type === 'all') return 'All Feeds';
@@ -311,15 +468,8 @@ document.addEventListener('alpine:init', () => {
         get filteredArticles() {
             let articles = [...this.articles];
 
-            if (this.searchQuery.trim() !== '') {
-                const query = this.searchQuery.toLowerCase();
-                articles = articles.filter(a =>
-                    a.title.toLowerCase().includes(query) ||
-                    (a.summary && a.summary.toLowerCase().includes(query)) ||
-                    a.feed_title.toLowerCase().includes(query) ||
-                    a.author.toLowerCase().includes(query)
-                );
-            }
+            // Search results come back from the server already filtered and ranked by relevance
+            if (this.activeSearch) return articles;
 
             articles.sort((a, b) => {
                 const dateA = new Date(a.published);
@@ -506,7 +656,7 @@ document.addEventListener('alpine:init', () => {
         },
 
         openEditModal(type, id, currentName) {
-            this.editModal = { type, id, currentName, url: '', layout_style: 'default' };
+            this.editModal = { type, id, currentName, url: '', layout_style: 'default', retention_keep_last: '', retention_max_age_days: '' };
             this.editModalNewName = currentName;
             this.editModalError = '';
             this.editModalFeedStates = {};
@@ -518,6 +668,8 @@ document.addEventListener('alpine:init', () => {
                     this.editModalFeedStates[id] = feed.exclude_from_all;
                     this.editModal.url = feed.url;
                     this.editModal.layout_style = feed.layout_style || 'default';
+                    this.editModal.retention_keep_last = feed.retention_keep_last || '';
+                    this.editModal.retention_max_age_days = feed.retention_max_age_days || '';
                 }
             } else if (type === 'category') {
                 const cat = this.appData.categories.find(c => c.id === id);
@@ -567,6 +719,8 @@ document.addEventListener('alpine:init', () => {
             if (type === 'feed') {
                 url = `/api/feed/${id}`;
                 payload.exclude_from_all = this.editModalFeedStates[id];
+                payload.retention_keep_last = this.editModal.retention_keep_last || null;
+                payload.retention_max_age_days = this.editModal.retention_max_age_days || null;
             } else if (type === 'category') {
                 url = `/api/category/${id}`;
                 payload.feed_exclusion_states = this.editModalFeedStates;
@@ -617,10 +771,23 @@ document.addEventListener('alpine:init', () => {
                 const data = await response.json();
                 
                 if (response.ok) {
-                    this.importStatus = 'success';
                     this.importMessage = data.message;
                     await this.fetchAppData();
-                    this.refreshAllFeeds(true);
+                    if (data.job_id) {
+                        // The new feeds are fetched by a background job; show how far it got
+                        const job = await this.waitForJob(data.job_id, 1000, (job) => {
+                            if (job.feeds_total) {
+                                this.importMessage = `${data.message} Fetched ${job.checked_count} of ${job.feeds_total} feeds, ${job.added_count} articles saved so far...`;
+                            }
+                        });
+                        if (job && job.status === 'done') {
+                            const failed = job.errors && job.errors.length ? ` ${job.errors.length} feeds could not be fetched.` : '';
+                            this.importMessage = `${data.message} Loaded ${job.added_count} articles.${failed}`;
+                        }
+                        await this.fetchAppData();
+                        await this.fetchArticles(true);
+                    }
+                    this.importStatus = 'success';
                 } else {
                     this.importStatus = 'error';
                     this.importMessage = data.error || 'Import failed';
@@ -739,7 +906,7 @@ document.addEventListener('alpine:init', () => {
         },
         
         // --- Modal & Autoplay ---
-        openModal(article) {
+        async openModal(article) {
             if (this.ytPlayer) {
                 try { this.ytPlayer.destroy(); } catch(e) {}
                 this.ytPlayer = null;
@@ -755,6 +922,11 @@ document.addEventListener('alpine:init', () => {
 
             // Push history state so back button closes modal
             window.history.pushState({ modalOpen: true }, '', `#article-${article.id}`);
+
+            // Lists arrive without bodies; load this one now and warm up the next one for J / autoplay
+            await this.loadArticleContent(article);
+            if (!this.modalArticle || this.modalArticle.id !== article.id) return;
+            this.loadArticleContent(currentList[this.activeArticleIndex + 1]);
             
             this.modalEmbedHtml = this.getYouTubeEmbed(article.link) || 
                                   this.getTikTokEmbed(article.link) || 
@@ -775,6 +947,18 @@ document.addEventListener('alpine:init', () => {
             });
         },
 
+        async loadArticleContent(article) {
+            if (!article || article.full_content !== undefined) return;
+            try {
+                const response = await fetch(`/api/article/${article.id}`);
+                if (!response.ok) return;
+                const data = await response.json();
+                article.full_content = data.full_content;
+            } catch (error) {
+                console.error('Error loading article content:', error);
+            }
+        },
+
         closeModal() {
             if (this.isModalOpen) {
                 if (window.history.state && window.history.state.modalOpen) {
@@ -829,13 +1013,17 @@ document.addEventListener('alpine:init', () => {
             }
         },
 
-        playNext() {
+        async playNext() {
             if (this.activeArticleIndex === -1) return;
+            const startedFrom = this.activeArticleIndex;
             let nextIndex = this.activeArticleIndex + 1;
             const articles = this.filteredArticles;
             while (nextIndex < articles.length) {
                 const nextArticle = articles[nextIndex];
                 const isYouTube = !!this.getYouTubeEmbed(nextArticle.link);
+                // Native videos are found in the body, which lists don't carry; load it first
+                if (!isYouTube) await this.loadArticleContent(nextArticle);
+                if (this.activeArticleIndex !== startedFrom) return; // the user moved on meanwhile
                 const isNative = !!this.getImgurEmbed(nextArticle.full_content);
                 if (isYouTube || isNative) {
                     console.log("Autoplaying next:", nextArticle.title);
@@ -0,0 +1,41 @@
+import app as volumeread
+
+
+def newest_article_id(app, feed_id):
+    with app.app_context():
+        return volumeread.db.session.query(volumeread.func.max(volumeread.Article.id)).filter_by(feed_id=feed_id).scalar()
+
+
+def store_body(app, article_id, body):
+    with app.app_context():
+        article = volumeread.db.session.get(volumeread.Article, article_id)
+        volumeread._store_contents({volumeread.hashlib.sha256(body.encode()).hexdigest(): body})
+        article.content_hash = volumeread.hashlib.sha256(body.encode()).hexdigest()
+        volumeread.db.session.commit()
+
+
+def test_lists_leave_bodies_to_the_article_endpoint(app, client, make_feed):
+    feed_id = make_feed([('With a body', 'short summary')])
+    article_id = newest_article_id(app, feed_id)
+    store_body(app, article_id, '<p>The whole article</p>')
+
+    listed = client.get('/api/articles', query_string={'view_type': 'feed', 'view_id': feed_id}).get_json()['articles']
+    assert [a['id'] for a in listed] == [article_id]
+    assert 'full_content' not in listed[0] and listed[0]['summary'] == 'short summary'
+
+    article = client.get(f'/api/article/{article_id}').get_json()
+    assert article['full_content'] == '<p>The whole article</p>'
+    assert client.get(f'/api/article/{10**9}').status_code == 404
+
+
+def test_reopened_article_revalidates_to_304(app, client, make_feed):
+    article_id = newest_article_id(app, make_feed([('Reopened', '')]))
+    first = client.get(f'/api/article/{article_id}')
+    assert first.status_code == 200 and first.headers['Cache-Control'] == 'no-cache' and first.headers['ETag']
+
+    again = client.get(f'/api/article/{article_id}', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304 and not again.data
+
+    client.post(f'/api/article/{article_id}/mark_read')
+    changed = client.get(f'/api/article/{article_id}', headers={'If-None-Match': first.headers['ETag']})
+    assert changed.status_code == 200 and changed.get_json()['is_read'] is True
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+import app as volumeread
+
+
+@pytest.mark.parametrize('days', ['abc', None, 0, -3, 1.5, True, [7], {'days': 7}, '', 10**400, 10**9])
+def test_cleanup_rejects_bad_days(client, days):
+    response = client.post('/api/maintenance/cleanup', json={'days': days})
+    assert response.status_code == 400, response.get_data(as_text=True)
+    assert 'error' in response.get_json()
+
+
+@pytest.mark.parametrize('days, expected', [(7, 7), ('14', 14), (3.0, 3)])
+def test_cleanup_queues_job_with_days(app, client, days, expected):
+    response = client.post('/api/maintenance/cleanup', json={'days': days})
+    assert response.status_code == 202, response.get_data(as_text=True)
+    with app.app_context():
+        job = volumeread.db.session.get(volumeread.Job, response.get_json()['job_id'])
+        assert json.loads(job.params)['max_age_days'] == expected
+
+
+def test_cleanup_defaults_to_30_days(app, client):
+    response = client.post('/api/maintenance/cleanup')
+    assert response.status_code == 202
+    with app.app_context():
+        job = volumeread.db.session.get(volumeread.Job, response.get_json()['job_id'])
+        assert json.loads(job.params)['max_age_days'] == 30
+
+
+@pytest.mark.parametrize('value', ['abc', 0, -1, [1], 10**9])
+def test_feed_retention_rejects_bad_values(client, make_feed, value):
+    feed_id = make_feed([])
+    response = client.put(f'/api/feed/{feed_id}', json={'retention_max_age_days': value})
+    assert response.status_code == 400
+
+
+def test_feed_retention_accepts_and_clears(app, client, make_feed):
+    feed_id = make_feed([])
+    assert client.put(f'/api/feed/{feed_id}', json={'retention_keep_last': '50'}).status_code == 200
+    with app.app_context():
+        assert volumeread.db.session.get(volumeread.Feed, feed_id).retention_keep_last == 50
+    assert client.put(f'/api/feed/{feed_id}', json={'retention_keep_last': None}).status_code == 200
+    with app.app_context():
+        assert volumeread.db.session.get(volumeread.Feed, feed_id).retention_keep_last is None
+
+
+def age_articles(app, feed_id, count, days):
+    """Backdates the feed's first `count` articles by `days`."""
+    with app.app_context():
+        Article = volumeread.Article
+        ids = [article_id for (article_id,) in volumeread.db.session.query(Article.id)
+               .filter(Article.feed_id == feed_id).order_by(Article.id).limit(count)]
+        old = volumeread.datetime.datetime.now() - volumeread.datetime.timedelta(days=days)
+        Article.query.filter(Article.id.in_(ids)).update({Article.published: old}, synchronize_session=False)
+        volumeread.db.session.commit()
+
+
+def article_count(app, feed_id):
+    with app.app_context():
+        return volumeread.Article.query.filter_by(feed_id=feed_id).count()
+
+
+def test_feed_policy_replaces_the_global_defaults(app, make_feed):
+    keep_last_feed = make_feed([(f'Kept {i}', '') for i in range(50)])
+    default_feed = make_feed([(f'Default {i}', '') for i in range(50)])
+    for feed_id in (keep_last_feed, default_feed):
+        age_articles(app, feed_id, 20, days=90)
+    with app.app_context():
+        volumeread.db.session.get(volumeread.Feed, keep_last_feed).retention_keep_last = 100
+        volumeread.db.session.commit()
+        volumeread._apply_retention(max_age_days=30)
+
+    # keep_last only: the global 30-day cutoff doesn't apply, and 50 articles are under its limit
+    assert article_count(app, keep_last_feed) == 50
+    assert article_count(app, default_feed) == 30
+
+
+def test_feed_keep_last_trims_to_its_limit(app, make_feed):
+    feed_id = make_feed([(f'Trim {i}', '') for i in range(15)])
+    with app.app_context():
+        volumeread.db.session.get(volumeread.Feed, feed_id).retention_keep_last = 10
+        volumeread.db.session.commit()
+        volumeread._apply_retention(max_age_days=30)
+    assert article_count(app, feed_id) == 10
@@ -0,0 +1,83 @@
+import datetime
+import threading
+
+import app as volumeread
+
+READERS = 4
+BATCHES = 10
+BATCH_SIZE = 500
+
+
+def test_database_runs_in_wal_mode(app):
+    with app.app_context():
+        assert volumeread.db.session.execute(volumeread.db.text('PRAGMA journal_mode')).scalar() == 'wal'
+
+
+def test_every_new_connection_gets_the_pragmas(app):
+    """Whichever pooled connection a thread is handed was set up by the connect listener."""
+    settings = {}
+
+    def read_pragmas():
+        with app.app_context():
+            settings.update({name: volumeread.db.session.execute(volumeread.db.text(f'PRAGMA {name}')).scalar()
+                             for name in ('busy_timeout', 'synchronous', 'mmap_size', 'cache_size', 'journal_mode')})
+
+    thread = threading.Thread(target=read_pragmas)
+    thread.start()
+    thread.join()
+    assert settings == {'busy_timeout': volumeread.SQLITE_BUSY_TIMEOUT_MS, 'synchronous': 1,  # 1 = NORMAL
+                        'mmap_size': volumeread.SQLITE_MMAP_SIZE, 'cache_size': volumeread.SQLITE_CACHE_SIZE,
+                        'journal_mode': 'wal'}
+
+
+def test_readers_are_not_locked_out_during_ingest(app, make_feed):
+    """N threads read /api/articles and mark articles read while another ingests BATCHES x BATCH_SIZE rows."""
+    seeded_feed_id = make_feed([(f'Seed {i}', 'seeded for readers') for i in range(20)])
+    ingest_feed_id = make_feed([])
+    with app.app_context():
+        seeded_ids = [article_id for (article_id,) in volumeread.db.session.query(volumeread.Article.id)
+                      .filter(volumeread.Article.feed_id == seeded_feed_id)]
+
+    ingesting = threading.Event()
+    ingesting.set()
+    failures, request_counts = [], []
+    added = []
+
+    def ingest():
+        try:
+            with app.app_context():
+                feed = volumeread.db.session.get(volumeread.Feed, ingest_feed_id)
+                for batch in range(BATCHES):
+                    added.append(volumeread._update_articles_for_feed(feed, [
+                        {'title': f'Ingested {batch}-{i}', 'link': f'https://ingest.example/{ingest_feed_id}/{batch}/{i}',
+                         'summary': 'bulk ingest', 'full_content': f'<p>{batch}-{i}</p>', 'image_url': None,
+                         'author': 'Ingest', 'published': datetime.datetime.now()} for i in range(BATCH_SIZE)]))
+        except Exception as e:
+            failures.append(f'ingest: {e!r}')
+        finally:
+            ingesting.clear()
+
+    def read(n):
+        client = app.test_client()
+        count = 0
+        while ingesting.is_set():
+            try:
+                response = client.get('/api/articles', query_string={'view_type': 'all', 'smart_cap': 'false', 'page': 1 + count % 3})
+                if count % 5 == n % 5:
+                    response = client.post(f'/api/article/{seeded_ids[count % len(seeded_ids)]}/mark_read')
+                if response.status_code != 200:
+                    failures.append(f'reader {n}: HTTP {response.status_code} {response.get_data(as_text=True)[:200]}')
+            except Exception as e:
+                failures.append(f'reader {n}: {e!r}')
+            count += 1
+        request_counts.append(count)
+
+    threads = [threading.Thread(target=read, args=(n,)) for n in range(READERS)] + [threading.Thread(target=ingest)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=120)
+
+    assert not failures, failures[:5]
+    assert sum(added) == BATCHES * BATCH_SIZE
+    assert len(request_counts) == READERS and all(request_counts), request_counts
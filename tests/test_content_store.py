@@ -0,0 +1,97 @@
+import hashlib
+import threading
+import time
+
+import app as volumeread
+
+
+def body_hash(body):
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def content_row(content_hash):
+    return volumeread.db.session.get(volumeread.ArticleContent, content_hash)
+
+
+def insert_articles(feed_id, body, count):
+    articles = [{'title': f'Shared {i}', 'link': f'https://content.example/{feed_id}/{body_hash(body)[:8]}/{i}',
+                 'summary': '', 'full_content': body, 'image_url': None, 'author': 'Tester',
+                 'published': volumeread.datetime.datetime.now()} for i in range(count)]
+    added = volumeread._insert_new_articles(feed_id, articles)
+    volumeread.db.session.commit()
+    return added
+
+
+def test_bodies_are_stored_once_and_refcounted(app, make_feed):
+    body = '<p>Syndicated post</p>'
+    first_feed, second_feed = make_feed([]), make_feed([])
+    with app.app_context():
+        assert insert_articles(first_feed, body, 2) == 2
+        assert insert_articles(second_feed, body, 1) == 1
+        row = content_row(body_hash(body))
+        assert row.refs == 3
+        assert volumeread.load_content(body_hash(body)) == body
+
+        volumeread.Article.query.filter_by(feed_id=first_feed).delete()
+        volumeread.db.session.commit()
+        volumeread.db.session.expire_all()
+        assert content_row(body_hash(body)).refs == 1
+
+        volumeread.Article.query.filter_by(feed_id=second_feed).delete()
+        volumeread.db.session.commit()
+        volumeread.db.session.expire_all()
+        assert content_row(body_hash(body)) is None
+
+
+def test_concurrent_store_of_the_same_body_does_not_fail(app):
+    """A second connection that misses the first one's uncommitted row must not fail when its insert lands."""
+    body = '<p>Stored by two workers at once</p>'
+    first_stored, first_may_commit = threading.Event(), threading.Event()
+    errors = []
+
+    def first():
+        with app.app_context():
+            volumeread._store_contents({body_hash(body): body})
+            first_stored.set()
+            first_may_commit.wait(10)
+            volumeread.db.session.commit()
+
+    def second():
+        first_stored.wait(10)
+        with app.app_context():
+            try:
+                volumeread._store_contents({body_hash(body): body})  # blocks on the write lock until first commits
+                volumeread.db.session.commit()
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=first), threading.Thread(target=second)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.3)
+    first_may_commit.set()
+    for thread in threads:
+        thread.join(30)
+
+    assert not errors, errors
+    with app.app_context():
+        assert volumeread.load_content(body_hash(body)) == body
+
+
+def test_inline_bodies_are_migrated_once(app, make_feed, monkeypatch):
+    feed_id = make_feed([('Old style', 'inline body')])
+    with app.app_context():
+        article = volumeread.Article.query.filter_by(feed_id=feed_id).one()
+        article.inline_content = '<p>From before the content store</p>'
+        volumeread.db.session.delete(volumeread.db.session.get(volumeread.AppSetting, 'inline_content_migrated'))
+        volumeread.db.session.commit()
+
+        volumeread._ensure_content_store()
+        volumeread.db.session.expire_all()
+        article = volumeread.db.session.get(volumeread.Article, article.id)
+        assert article.inline_content is None
+        assert volumeread.load_content(article.content_hash) == '<p>From before the content store</p>'
+
+        # Later starts skip the table scan
+        monkeypatch.setattr(volumeread, '_migrate_inline_content', lambda: (_ for _ in ()).throw(AssertionError('rescanned')))
+        volumeread._ensure_content_store()
@@ -0,0 +1,39 @@
+import app as volumeread
+
+
+def feed_counts(client, feed_id):
+    return next(f['counts'] for f in client.get('/api/data').get_json()['feeds'] if f['id'] == feed_id)
+
+
+def test_api_data_counts_follow_flag_changes(app, client, make_feed):
+    feed_id = make_feed([(f'Counted {i}', '') for i in range(4)])
+    with app.app_context():
+        article_ids = [a.id for a in volumeread.Article.query.filter_by(feed_id=feed_id).order_by(volumeread.Article.id)]
+    assert feed_counts(client, feed_id) == {'total': 4, 'unread': 4, 'favorites': 0, 'read_later': 0}
+
+    client.post(f'/api/article/{article_ids[0]}/mark_read')
+    client.post(f'/api/article/{article_ids[1]}/favorite')
+    client.post(f'/api/article/{article_ids[2]}/bookmark')
+    assert feed_counts(client, feed_id) == {'total': 4, 'unread': 3, 'favorites': 1, 'read_later': 1}
+
+    client.post(f'/api/article/{article_ids[1]}/favorite')
+    client.post('/api/mark_all_read', json={'view_type': 'feed', 'view_id': feed_id})
+    assert feed_counts(client, feed_id) == {'total': 4, 'unread': 0, 'favorites': 0, 'read_later': 1}
+
+    with app.app_context():
+        volumeread.Article.query.filter(volumeread.Article.id.in_(article_ids[2:])).delete()
+        volumeread.db.session.commit()
+    assert feed_counts(client, feed_id) == {'total': 2, 'unread': 0, 'favorites': 0, 'read_later': 0}
+
+
+def test_category_counts_sum_their_feeds(app, client, make_feed):
+    make_feed([('Summed', '')])
+    body = client.get('/api/data').get_json()
+    for category in body['categories']:
+        feeds = [f['counts'] for f in body['feeds'] if f['category_id'] == category['id']]
+        assert category['counts']['unread'] == sum(counts['unread'] for counts in feeds)
+
+
+def test_triggers_match_a_fresh_count(app):
+    result = app.test_cli_runner().invoke(args=['rebuild-counters', '--verify'])
+    assert result.exit_code == 0, result.output
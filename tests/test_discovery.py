@@ -0,0 +1,102 @@
+import http.server
+import threading
+import time
+
+import pytest
+
+import app as volumeread
+
+FEED = (b'<?xml version="1.0"?><rss version="2.0"><channel><title>Served feed</title>'
+        b'<item><title>One</title><link>https://example.com/1</link></item></channel></rss>')
+OTHER_FEED = FEED.replace(b'Served feed', b'Fallback feed')
+PAGE = b'<html><head><link rel="alternate" type="application/rss+xml" href="/declared.xml"></head></html>'
+
+# path -> (status, content type, body); anything else is a 404
+ROUTES = {
+    '/html-feed': (200, 'text/html; charset=utf-8', FEED),
+    '/xhtml-feed': (200, 'application/xhtml+xml', FEED),
+    '/page': (200, 'text/html', PAGE),
+    '/declared.xml': (200, 'application/rss+xml', FEED),
+    '/plain-page': (200, 'text/html', b'<html><body>no feed here</body></html>'),
+    '/slow': (200, 'application/rss+xml', FEED),
+    '/slow/rss': (200, 'application/rss+xml', OTHER_FEED),
+    '/ranked/feed': (200, 'application/rss+xml', FEED),
+    '/ranked/rss': (200, 'application/rss+xml', OTHER_FEED),
+}
+SLOW = {'/slow', '/ranked/feed'}  # answered after the other candidates
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        if self.path.startswith('/down'):
+            status, ctype, body = 503, 'text/html', b'try later'
+        else:
+            status, ctype, body = ROUTES.get(self.path, (404, 'text/html', b'not found'))
+        if self.path in SLOW:
+            time.sleep(0.3)
+        self.send_response(status)
+        self.send_header('Content-Type', ctype)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture(scope='module')
+def server():
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.requests = []
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+
+
+@pytest.fixture
+def discover(app, server, monkeypatch):
+    monkeypatch.delenv('RSS_BRIDGE_URL', raising=False)
+
+    def run(path):
+        with app.app_context():
+            return volumeread.discover_feed(f'http://127.0.0.1:{server.server_port}{path}')
+    return run
+
+
+def cached(app, server, path):
+    with app.app_context():
+        return volumeread.db.session.get(volumeread.DiscoveryCache, f'http://127.0.0.1:{server.server_port}{path}')
+
+
+@pytest.mark.parametrize('path', ['/html-feed', '/xhtml-feed'])
+def test_feeds_served_with_html_content_types(discover, path):
+    feed_url, feed_data = discover(path)
+    assert feed_url.endswith(path)
+    assert feed_data.feed.title == 'Served feed'
+
+
+def test_page_with_alternate_link(discover):
+    feed_url, _ = discover('/page')
+    assert feed_url.endswith('/declared.xml')
+
+
+@pytest.mark.parametrize('path, expected', [('/slow', '/slow'), ('/ranked', '/ranked/feed')])
+def test_earlier_candidate_wins_over_a_faster_one(discover, path, expected):
+    feed_url, feed_data = discover(path)
+    assert feed_url.endswith(expected)
+    assert feed_data.feed.title == 'Served feed'
+
+
+def test_definite_miss_is_cached(app, server, discover):
+    assert discover('/plain-page') == (None, None)
+    entry = cached(app, server, '/plain-page')
+    assert entry is not None and entry.feed_url is None
+
+
+def test_transient_failure_is_not_cached(app, server, discover):
+    assert discover('/down') == (None, None)
+    assert cached(app, server, '/down') is None
+    server.requests.clear()
+    discover('/down')
+    assert '/down' in server.requests  # probed again rather than answered from the cache
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+import app as volumeread
+
+
+@pytest.fixture
+def short_streams(monkeypatch):
+    monkeypatch.setattr(volumeread, 'EVENT_STREAM_SECONDS', 0.3)
+    monkeypatch.setattr(volumeread, 'EVENT_POLL_SECONDS', 0.05)
+
+
+def newest_event_id(app):
+    with app.app_context():
+        return volumeread.db.session.query(volumeread.func.max(volumeread.Event.id)).scalar() or 0
+
+
+def read_stream(client, **headers):
+    """[(id, kind, data)] of the events in one stream, which ends after EVENT_STREAM_SECONDS."""
+    events = []
+    for block in client.get('/api/events', headers=headers).get_data(as_text=True).split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if ': ' in line and not line.startswith(':'))
+        if 'event' in fields:
+            events.append((int(fields['id']), fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def test_reconnect_replays_what_was_missed(app, client, make_feed, short_streams):
+    feed_id = make_feed([('Streamed one', ''), ('Streamed two', '')])
+    with app.app_context():
+        article_ids = [a.id for a in volumeread.Article.query.filter_by(feed_id=feed_id).order_by(volumeread.Article.id)]
+    last_seen = newest_event_id(app)
+    for article_id in article_ids:
+        client.post(f'/api/article/{article_id}/mark_read')
+
+    events = read_stream(client, **{'Last-Event-ID': str(last_seen)})
+    assert [(kind, data['ids']) for _, kind, data in events] == [('flags', [article_ids[0]]), ('flags', [article_ids[1]])]
+    assert [event_id for event_id, _, _ in events] == sorted(event_id for event_id, _, _ in events)
+    assert events[-1][2]['counts'][str(feed_id)]['unread'] == 0
+
+    # Nothing new since the last one it saw
+    assert read_stream(client, **{'Last-Event-ID': str(events[-1][0])}) == []
+
+
+def test_reconnect_older_than_the_log_is_told_to_reset(app, client, short_streams):
+    with app.app_context():
+        for n in range(2):
+            volumeread.record_event('changed', {'endpoint': f'test {n}'})
+        volumeread.db.session.commit()
+    newest = newest_event_id(app)
+    with app.app_context():
+        volumeread.Event.query.filter(volumeread.Event.id < newest).delete()
+        volumeread.db.session.commit()
+
+    # Event 1 has been trimmed, so the client can't catch up and must reload instead
+    assert read_stream(client, **{'Last-Event-ID': '0'}) == [(newest, 'reset', {})]
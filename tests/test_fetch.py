@@ -0,0 +1,78 @@
+import json
+import os
+import sys
+import urllib.request
+
+import pytest
+
+import app as volumeread
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bench'))
+import feedserver  # noqa: E402
+
+FEEDS = 20
+ENTRIES = 5
+
+
+@pytest.fixture(scope='module')
+def feed_server():
+    process, base_url = feedserver.start(entries=ENTRIES, body_bytes=200, latency_ms=(5, 30))
+    yield base_url
+    process.terminate()
+    process.wait()
+
+
+def server_stats(base_url):
+    with urllib.request.urlopen(f'{base_url}/stats') as response:
+        return json.load(response)
+
+
+def test_every_feed_on_a_shared_host_refreshes(app, feed_server):
+    """FEEDS feeds from one host go through the per-host slots over a handful of kept-alive connections."""
+    with app.app_context():
+        category_id = volumeread.Category.query.first().id
+        feeds = [volumeread.Feed(title=f'Fetch {n}', url=f'{feed_server}/f/{n}.xml', category_id=category_id) for n in range(FEEDS)]
+        volumeread.db.session.add_all(feeds)
+        volumeread.db.session.commit()
+        feed_ids = [feed.id for feed in feeds]
+
+        before = server_stats(feed_server)
+        summary = volumeread._refresh_feeds(force_refresh=True, feed_ids=feed_ids)
+        after = server_stats(feed_server)
+
+        assert not summary['errors'], summary['errors']
+        assert summary['checked_count'] == FEEDS
+        assert summary['added_count'] == FEEDS * ENTRIES
+        counts = dict(volumeread.db.session.query(volumeread.Article.feed_id, volumeread.func.count())
+                      .filter(volumeread.Article.feed_id.in_(feed_ids)).group_by(volumeread.Article.feed_id))
+        assert counts == {feed_id: ENTRIES for feed_id in feed_ids}
+
+    # Less the second /stats call's own connection and request
+    assert after['requests'] - before['requests'] - 1 == FEEDS
+    assert after['connections'] - before['connections'] - 1 <= volumeread.FETCH_PER_HOST_LIMIT
+
+
+def test_fetches_are_recorded_and_reported_per_feed(app, client, feed_server, monkeypatch):
+    monkeypatch.setattr(volumeread, 'FETCH_HISTORY_SIZE', 2)
+    with app.app_context():
+        category_id = volumeread.Category.query.first().id
+        working = volumeread.Feed(title='Healthy', url=f'{feed_server}/f/500.xml', category_id=category_id)
+        broken = volumeread.Feed(title='Broken', url=f'{feed_server}/missing.xml', category_id=category_id)
+        volumeread.db.session.add_all([working, broken])
+        volumeread.db.session.commit()
+        feed_ids = [working.id, broken.id]
+        for force_refresh in (True, False, False):
+            volumeread._refresh_feeds(force_refresh=force_refresh, feed_ids=feed_ids)
+
+        fetches = volumeread.FeedFetch.query.filter_by(feed_id=working.id).order_by(volumeread.FeedFetch.id).all()
+        assert len(fetches) == 2  # trimmed to FETCH_HISTORY_SIZE
+        assert all(f.status == 200 and f.wait_ms is not None and f.bytes for f in fetches)
+        assert [f.not_modified for f in fetches] == [True, True]  # same body as the first fetch
+
+    health = client.get('/api/feeds/health', query_string={'limit': 1000}).get_json()
+    by_id = {f['feed_id']: f for f in health['time_share']}
+    assert health['window'] == 2
+    assert by_id[feed_ids[0]]['failures'] == 0 and by_id[feed_ids[0]]['not_modified'] == 2
+    assert by_id[feed_ids[1]]['last_error'] == 'Status 404'
+    assert feed_ids[1] in [f['feed_id'] for f in health['failing']]
+    assert feed_ids[0] not in [f['feed_id'] for f in health['failing']]
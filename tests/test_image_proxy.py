@@ -0,0 +1,94 @@
+import socket
+
+import pytest
+
+import app as volumeread
+
+HOSTS = {'images.example': '93.184.216.34', 'intranet.example': '10.0.0.5'}
+
+
+@pytest.fixture
+def fake_dns(monkeypatch):
+    real_getaddrinfo = socket.getaddrinfo
+
+    def getaddrinfo(host, port, *args, **kwargs):
+        if host in HOSTS:
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', (HOSTS[host], port))]
+        return real_getaddrinfo(host, port, *args, **kwargs)
+    monkeypatch.setattr(volumeread.socket, 'getaddrinfo', getaddrinfo)
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None, body=b''):
+        self.status_code, self.headers, self.body = status_code, headers or {}, body
+
+    @property
+    def is_redirect(self):
+        return 'Location' in self.headers
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise volumeread.requests.HTTPError(str(self.status_code))
+
+    def iter_content(self, size):
+        yield self.body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.mark.parametrize('url', [
+    'http://127.0.0.1/a.jpg', 'http://localhost/a.jpg', 'http://10.1.2.3/a.jpg', 'http://192.168.0.10/a.jpg',
+    'http://172.16.0.1/a.jpg', 'http://169.254.169.254/latest/meta-data', 'http://[::1]/a.jpg',
+    'http://[::ffff:127.0.0.1]/a.jpg', 'http://0.0.0.0/a.jpg', 'http://intranet.example/a.jpg', 'file:///etc/passwd',
+])
+def test_private_addresses_are_rejected(fake_dns, url):
+    with pytest.raises(ValueError):
+        volumeread._check_public_url(url)
+
+
+def test_public_address_is_allowed(fake_dns):
+    volumeread._check_public_url('https://images.example/a.jpg')
+    volumeread._check_public_url('http://93.184.216.34/a.jpg')
+
+
+def test_redirect_to_private_address_is_not_followed(fake_dns, monkeypatch):
+    requested = []
+
+    def get(url, **kwargs):
+        requested.append(url)
+        assert kwargs['allow_redirects'] is False
+        return FakeResponse(302, {'Location': 'http://intranet.example/secret.png'})
+    monkeypatch.setattr(volumeread._fetch_session, 'get', get)
+    with pytest.raises(ValueError):
+        volumeread._download_image('https://images.example/a.jpg')
+    assert requested == ['https://images.example/a.jpg']
+
+
+def test_maxres_thumbnail_falls_back_server_side(fake_dns, monkeypatch):
+    def get(url, **kwargs):
+        if 'maxresdefault' in url:
+            return FakeResponse(404)
+        return FakeResponse(200, body=b'\xff\xd8\xff jpeg')
+    monkeypatch.setattr(volumeread._fetch_session, 'get', get)
+    assert volumeread._download_image('https://images.example/vi/x/maxresdefault.jpg') == b'\xff\xd8\xff jpeg'
+
+
+def test_failure_memory_is_capped(monkeypatch):
+    monkeypatch.setattr(volumeread, 'IMAGE_FAILURES_MAX', 100)
+    monkeypatch.setattr(volumeread, '_image_failures', {})
+    for i in range(250):
+        volumeread._note_image_failure(f'https://images.example/{i}.jpg')
+    assert len(volumeread._image_failures) == 100
+    assert 'https://images.example/249.jpg' in volumeread._image_failures
+    assert 'https://images.example/0.jpg' not in volumeread._image_failures
+
+
+def test_proxy_redirects_private_urls_to_origin(client):
+    url = 'http://127.0.0.1:9/private.jpg'
+    response = client.get(f'/img/320/{volumeread.image_signature(url)}', query_string={'url': url})
+    assert response.status_code == 302
+    assert response.headers['Location'] == url
@@ -0,0 +1,37 @@
+import io
+import tracemalloc
+
+import app as volumeread
+
+
+def opml(feed_count, folders=10):
+    body = ''.join(f'<outline text="Folder {f}">' + ''.join(
+        f'<outline type="rss" text="Feed {i}" xmlUrl="https://opml.example/{f}/{i}.xml"/>' for i in range(feed_count // folders))
+        + '</outline>' for f in range(folders))
+    return io.BytesIO(f'<?xml version="1.0"?><opml version="1.0"><body>{body}</body></opml>'.encode())
+
+
+def peak_bytes(file):
+    tracemalloc.start()
+    try:
+        for _ in volumeread._iter_opml_feeds(file):
+            pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_feeds_keep_their_innermost_folder():
+    file = io.BytesIO(b'''<opml><body><outline text="Outer"><outline text="Inner">
+        <outline text="Deep" xmlUrl="https://opml.example/deep.xml"/></outline>
+        <outline title="Shallow" xmlUrl="https://opml.example/shallow.xml"/></outline>
+        <outline xmlUrl="https://opml.example/loose.xml"/></body></opml>''')
+    assert list(volumeread._iter_opml_feeds(file)) == [
+        ('Inner', 'Deep', 'https://opml.example/deep.xml'),
+        ('Outer', 'Shallow', 'https://opml.example/shallow.xml'),
+        (None, 'Untitled', 'https://opml.example/loose.xml')]
+
+
+def test_parsing_memory_does_not_grow_with_the_file():
+    assert sum(1 for _ in volumeread._iter_opml_feeds(opml(50000))) == 50000
+    assert peak_bytes(opml(50000)) < 1.5 * peak_bytes(opml(5000))
@@ -0,0 +1,42 @@
+import datetime
+
+import app as volumeread
+
+
+def feed_page(client, feed_id, **params):
+    response = client.get('/api/articles', query_string={'view_type': 'feed', 'view_id': feed_id, 'per_page': 4, **params})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_cursor_pages_cover_ties_without_gaps_or_repeats(app, client, make_feed):
+    feed_id = make_feed([(f'Tied {i}', '') for i in range(14)])
+    with app.app_context():
+        # Ten articles published at the same moment, so only the id orders them
+        tied = datetime.datetime(2026, 5, 1, 8, 0)
+        for i, article in enumerate(volumeread.Article.query.filter_by(feed_id=feed_id).order_by(volumeread.Article.id)):
+            article.published = tied if i < 10 else tied + datetime.timedelta(hours=i)
+        volumeread.db.session.commit()
+        expected = [a.id for a in volumeread.Article.query.filter_by(feed_id=feed_id)
+                    .order_by(volumeread.Article.published.desc(), volumeread.Article.id.desc())]
+
+    seen, cursor = [], ''
+    while cursor is not None:
+        body = feed_page(client, feed_id, cursor=cursor)
+        assert 'total_pages' not in body  # keyset mode skips the COUNT(*)
+        seen += [a['id'] for a in body['articles']]
+        cursor = body['next_cursor']
+        if len(seen) == 4:
+            # An article arriving mid-scroll lands above the cursor and doesn't shift later pages
+            with app.app_context():
+                volumeread.db.session.add(volumeread.Article(feed_id=feed_id, title='Late', link=f'https://late.example/{feed_id}',
+                                                             published=datetime.datetime.now()))
+                volumeread.db.session.commit()
+    assert seen == expected
+
+
+def test_malformed_cursor_starts_from_the_top(client, make_feed):
+    feed_id = make_feed([(f'Top {i}', '') for i in range(6)])
+    first = feed_page(client, feed_id, cursor='')
+    assert feed_page(client, feed_id, cursor='not-a-cursor')['articles'] == first['articles']
+    assert first['has_next'] and first['next_cursor']
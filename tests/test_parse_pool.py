@@ -0,0 +1,35 @@
+import app as volumeread
+
+FEED = (b'<?xml version="1.0"?><rss version="2.0"><channel><title>Pooled</title><ttl>120</ttl>'
+        + b''.join(b'<item><title>Pooled %d</title><link>https://pooled.example/%d</link>'
+                   b'<pubDate>Mon, 0%d Jun 2026 10:00:00 GMT</pubDate><description>&lt;p&gt;Body %d&lt;/p&gt;</description></item>'
+                   % (i, i, i + 1, i) for i in range(5))
+        + b'</channel></rss>')
+ARGS = (FEED, {'content-type': 'application/rss+xml'}, 'https://pooled.example/rss', 'Pooled')
+
+
+def without_timing(parsed):
+    return dict(parsed, parse_ms=None)
+
+
+def test_small_refreshes_parse_inline(monkeypatch):
+    monkeypatch.setattr(volumeread, 'PARSE_WORKERS', 2)
+    assert volumeread._get_parse_pool(volumeread.PARSE_POOL_MIN_FEEDS - 1) is None
+    monkeypatch.setattr(volumeread, 'PARSE_WORKERS', 1)
+    assert volumeread._get_parse_pool(10**6) is None
+
+
+def test_pool_parses_like_inline_and_is_reused(monkeypatch):
+    monkeypatch.setattr(volumeread, 'PARSE_WORKERS', 2)
+    pool = volumeread._get_parse_pool(volumeread.PARSE_POOL_MIN_FEEDS)
+    try:
+        assert volumeread._get_parse_pool(volumeread.PARSE_POOL_MIN_FEEDS * 10) is pool
+        pooled = pool.submit(volumeread._parse_feed_payload, *ARGS).result(timeout=60)
+    finally:
+        volumeread._discard_parse_pool(pool)
+
+    inline = volumeread._parse_feed_payload(*ARGS)
+    assert without_timing(pooled) == without_timing(inline)
+    assert len(pooled['articles']) == 5 and pooled['poll_hint'] == 120 * 60
+    # A known entry list means there is nothing to normalize
+    assert volumeread._parse_feed_payload(*ARGS, inline['entries_hash'])['articles'] is None
@@ -0,0 +1,111 @@
+import datetime
+import random
+
+import pytest
+
+import app as volumeread
+
+FEEDS = 60
+ARTICLES = 12000
+# The article indexes a view may read from start to end: the global published index for the unfiltered
+# "All" view, and partial indexes that only hold the rows their view selects. Anything else must be a
+# SEARCH on an index that also delivers the rows in page order.
+WALKABLE = {
+    ('all', False, False): 'ix_article_published',
+    ('all', True, False): 'ix_article_unread_published',
+    ('all', False, True): 'ix_article_ranked_published',
+    ('all', True, True): 'ix_article_ranked_published',
+    ('favorites', False, False): 'ix_article_favorite_published',
+    ('favorites', True, False): 'ix_article_favorite_published',
+    ('readLater', False, False): 'ix_article_read_later_published',
+    ('readLater', True, False): 'ix_article_read_later_published',
+}
+
+
+@pytest.fixture(scope='module')
+def seeded(app):
+    """FEEDS feeds of all three kinds in two categories and a custom stream, ARTICLES articles, then ANALYZE."""
+    rng = random.Random(8)
+    db = volumeread.db
+    with app.app_context():
+        category = volumeread.Category(name='Query plans')
+        stream = volumeread.CustomStream(name='Query plans')
+        db.session.add_all([category, stream])
+        db.session.flush()
+        category_ids = [volumeread.Category.query.filter_by(name='Uncategorized').first().id, category.id]
+        urls = ['https://plans{}.example/rss', 'https://www.youtube.com/feeds/videos.xml?channel_id=plans{}',
+                'https://www.reddit.com/r/plans{}/.rss']
+        feeds = [volumeread.Feed(title=f'Plans {n}', url=urls[n % 3].format(n), category_id=category_ids[n % 2])
+                 for n in range(FEEDS)]
+        db.session.add_all(feeds)
+        db.session.flush()
+        db.session.execute(volumeread.custom_stream_feeds.insert(),
+                           [{'custom_stream_id': stream.id, 'feed_id': feed.id} for feed in feeds[:8]])
+        now = datetime.datetime.now()
+        db.session.execute(db.insert(volumeread.Article), [
+            {'feed_id': feeds[i % FEEDS].id, 'title': f'Plan {i}', 'link': f'https://plans.example/{i}',
+             'author': f'Planner {i % 40}', 'published': now - datetime.timedelta(minutes=i),
+             'is_read': rng.random() < 0.7, 'is_favorite': rng.random() < 0.01, 'is_read_later': rng.random() < 0.01}
+            for i in range(ARTICLES)])
+        db.session.commit()
+        volumeread.rerank_all_feeds()
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+        return {'feed': feeds[0].id, 'category': category.id, 'custom_stream': stream.id}
+
+
+def explain(query):
+    compiled = query.statement.compile(dialect=volumeread.db.engine.dialect, compile_kwargs={'literal_binds': True})
+    return [row[-1] for row in volumeread.db.session.execute(volumeread.db.text(f'EXPLAIN QUERY PLAN {compiled}'))]
+
+
+VIEW_TYPES = ('feed', 'category', 'custom_stream', 'favorites', 'readLater', 'author', 'sites', 'videos', 'threads')
+VIEWS = [(view_type, unread_only, False) for view_type in VIEW_TYPES for unread_only in (False, True)] + [
+         ('all', unread_only, smart_cap) for unread_only in (False, True) for smart_cap in (False, True)]
+
+
+@pytest.mark.parametrize('view_type, unread_only, smart_cap', VIEWS)
+@pytest.mark.parametrize('keyset', [False, True])
+def test_views_read_articles_in_index_order(app, seeded, view_type, unread_only, smart_cap, keyset):
+    with app.app_context():
+        query, order_by, _ = volumeread._articles_query(view_type, seeded.get(view_type), 'Planner 3', unread_only,
+                                                        smart_cap=smart_cap)
+        if keyset:
+            query = query.filter(volumeread.tuple_(volumeread.Article.published, volumeread.Article.id)
+                                 < (datetime.datetime.now() - datetime.timedelta(days=1), 10**9))
+        plan = explain(query.order_by(*order_by).limit(24))
+
+    walkable = WALKABLE.get((view_type, unread_only, smart_cap))
+    bad = [line for line in plan if 'TEMP B-TREE' in line or
+           (line.startswith('SCAN article') and line != f'SCAN article USING INDEX {walkable}')]
+    assert not bad, plan
+
+
+def page_ids(client, view_type, view_id, **params):
+    response = client.get('/api/articles', query_string={'view_type': view_type, 'view_id': view_id, 'per_page': 24, **params})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+@pytest.mark.parametrize('view_type', ['category', 'custom_stream', 'videos'])
+def test_merged_views_list_the_same_articles(app, client, seeded, view_type):
+    with app.app_context():
+        Article, Feed = volumeread.Article, volumeread.Feed
+        expected = Article.query.join(Feed).filter(Feed.deleted_at.is_(None))
+        if view_type == 'category':
+            expected = expected.filter(Feed.category_id == seeded['category'])
+        elif view_type == 'custom_stream':
+            expected = expected.join(volumeread.custom_stream_feeds).filter(
+                volumeread.custom_stream_feeds.c.custom_stream_id == seeded['custom_stream'])
+        else:
+            expected = expected.filter(Feed.kind == 'video')
+        expected = [a.id for a in expected.filter(Article.is_read == False)
+                    .order_by(Article.published.desc(), Article.id.desc()).limit(72)]
+
+    pages, cursor = [], ''
+    for _ in range(3):
+        body = page_ids(client, view_type, seeded.get(view_type), unread_only='true', cursor=cursor)
+        pages += [a['id'] for a in body['articles']]
+        cursor = body['next_cursor']
+    assert pages == expected
+    assert [a['id'] for a in page_ids(client, view_type, seeded.get(view_type), unread_only='true', page=2)['articles']] == expected[24:48]
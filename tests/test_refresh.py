@@ -0,0 +1,121 @@
+import http.server
+import importlib.util
+import os
+import re
+import threading
+
+import pytest
+
+import app as volumeread
+
+
+class FeedHandler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        n = re.search(r'/(?:refresh|etag)/(\d+)\.xml', self.path).group(1)
+        if self.path.startswith('/etag/') and self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        items = ''.join(f'<item><title>R{n}-{i}</title><link>https://refresh{n}.example/{i}</link></item>' for i in range(5))
+        body = f'<?xml version="1.0"?><rss version="2.0"><channel><title>Refresh {n}</title>{items}</channel></rss>'.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/rss+xml')
+        self.send_header('Content-Length', str(len(body)))
+        if self.path.startswith('/etag/'):
+            self.send_header('ETag', '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture(scope='module')
+def feed_urls(app):
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), FeedHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    urls = [f'http://127.0.0.1:{httpd.server_port}/refresh/{n}.xml' for n in range(6)]
+    with app.app_context():
+        category_id = volumeread.Category.query.first().id
+        volumeread.db.session.execute(volumeread.db.insert(volumeread.Feed),
+                                      [{'title': f'Refresh {n}', 'url': url, 'category_id': category_id} for n, url in enumerate(urls)])
+        volumeread.db.session.commit()
+    yield urls
+    httpd.shutdown()
+
+
+def refresh(app, urls, force_refresh):
+    with app.app_context():
+        feed_ids = [feed_id for (feed_id,) in volumeread.db.session.query(volumeread.Feed.id).filter(volumeread.Feed.url.in_(urls))]
+        return volumeread._refresh_feeds(force_refresh=force_refresh, feed_ids=feed_ids)
+
+
+def test_data_version_moves_while_a_refresh_stores_articles(app, feed_urls, monkeypatch):
+    bumps = []
+    real_bump = volumeread.bump_data_version
+    monkeypatch.setattr(volumeread, 'DATA_VERSION_BUMP_SECONDS', 0)
+    monkeypatch.setattr(volumeread, 'bump_data_version', lambda: (bumps.append(1), real_bump()))
+    with app.app_context():
+        feed_ids = [feed_id for (feed_id,) in volumeread.db.session.query(volumeread.Feed.id).filter(volumeread.Feed.url.in_(feed_urls))]
+        summary = volumeread._refresh_feeds(force_refresh=True, feed_ids=feed_ids)
+    assert summary['added_count'] == 30 and not summary['errors']
+    assert bumps, "the data version should be bumped before the refresh returns"
+
+
+def test_unchanged_bodies_are_not_parsed_again(app, feed_urls, monkeypatch):
+    refresh(app, feed_urls, force_refresh=True)
+    monkeypatch.setattr(volumeread, '_parse_feed_payload', lambda *args: pytest.fail('parsed an unchanged body'))
+    summary = refresh(app, feed_urls, force_refresh=False)
+    assert summary['unchanged_count'] == len(feed_urls) and summary['added_count'] == 0 and not summary['errors']
+
+
+def test_not_modified_answer_skips_the_feed(app, feed_urls):
+    url = feed_urls[0].replace('/refresh/0.xml', '/etag/90.xml')
+    with app.app_context():
+        volumeread.db.session.add(volumeread.Feed(title='ETag feed', url=url, category_id=volumeread.Category.query.first().id))
+        volumeread.db.session.commit()
+    assert refresh(app, [url], force_refresh=True)['added_count'] == 5
+    with app.app_context():
+        assert volumeread.Feed.query.filter_by(url=url).one().etag == '"v1"'
+
+    summary = refresh(app, [url], force_refresh=False)
+    assert summary['checked_count'] == 1 and summary['added_count'] == 0 and not summary['errors']
+    with app.app_context():
+        fetch = volumeread.FeedFetch.query.order_by(volumeread.FeedFetch.id.desc()).first()
+        assert (fetch.status, fetch.not_modified) == (304, True)
+
+
+def test_scheduler_tick_refreshes_a_due_feed(app, feed_urls):
+    now = volumeread.datetime.datetime.now()
+    with app.app_context():
+        volumeread.Feed.query.update({volumeread.Feed.next_fetch_at: now + volumeread.datetime.timedelta(days=1)})
+        volumeread.Job.query.filter_by(status='queued').delete()
+        due = volumeread.Feed.query.filter_by(url=feed_urls[0]).one()
+        due.next_fetch_at = None
+        volumeread.db.session.commit()
+        due_id = due.id
+        last_job_id = volumeread.db.session.query(volumeread.func.max(volumeread.Job.id)).scalar() or 0
+
+    assert volumeread._scheduler_tick()
+
+    with app.app_context():
+        job = volumeread.Job.query.filter(volumeread.Job.id > last_job_id).one()
+        assert (job.kind, job.trigger, job.status) == ('refresh', 'schedule', 'done')
+        assert volumeread.json.loads(job.result)['checked_count'] == 1
+        assert volumeread.db.session.get(volumeread.Feed, due_id).next_fetch_at > now
+
+
+def test_workers_start_their_scheduler_at_boot(monkeypatch):
+    spec = importlib.util.spec_from_file_location('gunicorn_conf', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'gunicorn.conf.py'))
+    gunicorn_conf = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(gunicorn_conf)
+    started = []
+    monkeypatch.setattr(volumeread, 'start_scheduler', lambda: started.append(True))
+
+    monkeypatch.setattr(volumeread, 'SCHEDULER_ENABLED', False)
+    gunicorn_conf.post_worker_init(worker=None)
+    assert not started
+
+    monkeypatch.setattr(volumeread, 'SCHEDULER_ENABLED', True)
+    gunicorn_conf.post_worker_init(worker=None)
+    assert started
@@ -0,0 +1,61 @@
+import gzip
+import json
+
+import brotli
+import pytest
+
+import app as volumeread
+
+
+@pytest.fixture
+def queries(app):
+    """Counts the SQL statements run while the test makes requests."""
+    statements = []
+    with app.app_context():
+        engine = volumeread.db.engine
+    listener = lambda *args: statements.append(args[2])
+    volumeread.event.listen(engine, 'before_cursor_execute', listener)
+    yield statements
+    volumeread.event.remove(engine, 'before_cursor_execute', listener)
+
+
+@pytest.mark.parametrize('path', ['/api/data', '/api/articles?view_type=all'])
+def test_unchanged_data_revalidates_to_304_without_queries(client, make_feed, queries, path):
+    feed_id = make_feed([('Revalidated', '')])
+    first = client.get(path)
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and etag.startswith('W/') and first.headers['Cache-Control'] == 'no-cache'
+
+    queries.clear()
+    again = client.get(path, headers={'If-None-Match': etag})
+    assert again.status_code == 304 and again.headers['ETag'] == etag
+    assert queries == []
+
+    with client.application.app_context():
+        article_id = volumeread.Article.query.filter_by(feed_id=feed_id).one().id
+    client.post(f'/api/article/{article_id}/mark_read')
+    changed = client.get(path, headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+
+
+@pytest.mark.parametrize('accept, encoding', [('br, gzip', 'br'), ('gzip', 'gzip'), ('identity', None)])
+def test_json_is_compressed_as_the_client_accepts(client, make_feed, accept, encoding):
+    make_feed([(f'Compressed {i}', 'padding ' * 20) for i in range(10)])
+    plain = client.get('/api/data').get_json()
+    response = client.get('/api/data', headers={'Accept-Encoding': accept})
+    assert response.headers.get('Content-Encoding') == encoding
+    decode = {'br': brotli.decompress, 'gzip': gzip.decompress, None: bytes}[encoding]
+    assert json.loads(decode(response.data)) == plain
+    if encoding:
+        assert 'Accept-Encoding' in response.headers['Vary']
+
+
+def test_gzip_when_brotli_is_not_installed(client, make_feed, monkeypatch):
+    make_feed([(f'Fallback {i}', 'padding ' * 20) for i in range(10)])
+    monkeypatch.setattr(volumeread, 'brotli', None)
+    assert client.get('/api/data', headers={'Accept-Encoding': 'br, gzip'}).headers['Content-Encoding'] == 'gzip'
+
+
+def test_small_responses_are_not_compressed(client):
+    response = client.get('/api/write_queue/stats', headers={'Accept-Encoding': 'gzip'})
+    assert len(response.data) < volumeread.COMPRESS_MIN_BYTES and 'Content-Encoding' not in response.headers
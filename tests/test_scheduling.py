@@ -0,0 +1,51 @@
+import datetime
+
+import pytest
+
+import app as volumeread
+
+NOW = datetime.datetime(2026, 6, 1, 12, 0)
+MIN_SECONDS = volumeread.REFRESH_INTERVAL_MINUTES * 60
+
+
+def next_poll_seconds(feed):
+    return (feed.next_fetch_at - NOW).total_seconds()
+
+
+@pytest.mark.parametrize('headers, channel, expected', [
+    ({'cache-control': 'public, max-age=7200'}, None, 7200),
+    ({'cache-control': 'no-cache, max-age=7200'}, None, None),
+    ({}, {'ttl': '90'}, 90 * 60),
+    ({}, {'sy_updateperiod': 'daily', 'sy_updatefrequency': '4'}, 86400 // 4),
+    ({'cache-control': 'max-age=600'}, {'ttl': '60'}, 3600),  # the longest hint wins
+    ({}, {'ttl': 'soon'}, None),
+])
+def test_poll_hints(headers, channel, expected):
+    assert volumeread._poll_hint_seconds(headers, channel) == expected
+
+
+def test_next_poll_follows_the_posting_cadence():
+    feed = volumeread.Feed(unchanged_streak=0)
+    volumeread._schedule_next_fetch(feed, NOW, added_count=3, post_interval=4 * 3600)
+    assert next_poll_seconds(feed) == 2 * 3600  # about twice per expected post
+    assert feed.last_fetched_at == NOW
+
+
+def test_unchanged_fetches_back_off_then_level_out():
+    feed = volumeread.Feed(unchanged_streak=0)
+    intervals = []
+    for _ in range(30):
+        volumeread._schedule_next_fetch(feed, NOW, added_count=0)
+        intervals.append(next_poll_seconds(feed))
+    assert intervals[0] == MIN_SECONDS * 1.5
+    assert intervals == sorted(intervals)
+    assert intervals[-1] == pytest.approx(min(MIN_SECONDS * 1.5 ** 10, volumeread.MAX_POLL_MINUTES * 60), abs=1)
+
+    volumeread._schedule_next_fetch(feed, NOW, added_count=1)
+    assert feed.unchanged_streak == 0 and next_poll_seconds(feed) == MIN_SECONDS
+
+
+def test_server_hint_is_a_floor():
+    feed = volumeread.Feed(unchanged_streak=0)
+    volumeread._schedule_next_fetch(feed, NOW, added_count=1, post_interval=60, poll_hint=3 * 3600)
+    assert next_poll_seconds(feed) == 3 * 3600
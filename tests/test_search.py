@@ -0,0 +1,81 @@
+import pytest
+
+import app as volumeread
+
+
+def search(client, text):
+    return client.get('/api/articles', query_string={'view_type': 'all', 'search': text})
+
+
+@pytest.fixture
+def searchable(make_feed):
+    return make_feed([
+        ('Rust and Go compared', 'a look at "fearless" concurrency'),
+        ('Quoted: say "hello"', 'greetings'),
+        ('NEAR field notes', 'OR gates AND logic'),
+    ])
+
+
+def titles(response):
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return {article['title'] for article in response.get_json()['articles']}
+
+
+@pytest.mark.parametrize('text', ['a"b', '"', '""', '" "', 'hello"', '"unterminated phrase', 'x"y"z', '*', '-', '^', ':', '(', 'NEAR(a b)'])
+def test_odd_quoting_does_not_error(client, searchable, text):
+    assert search(client, text).status_code == 200
+
+
+@pytest.mark.parametrize('text', ['AND', 'OR', 'NOT', 'NEAR', 'rust AND', 'OR rust', 'NEAR NEAR'])
+def test_operators_are_searched_as_words(client, searchable, text):
+    assert search(client, text).status_code == 200
+
+
+def test_operator_words_match_literally(client, searchable):
+    assert titles(search(client, 'NEAR')) >= {'NEAR field notes'}
+    assert titles(search(client, 'gates AND')) == {'NEAR field notes'}
+
+
+def test_phrase_and_prefix(client, searchable):
+    assert 'Rust and Go compared' in titles(search(client, 'compar'))
+    assert 'Rust and Go compared' in titles(search(client, '"rust and go"'))
+    assert 'Quoted: say "hello"' in titles(search(client, 'hello"'))
+
+
+def test_fts_query_escapes_inner_quotes():
+    assert volumeread._fts_query('a"b') == '"a""b"*'
+    assert volumeread._fts_query('"') == ''
+    assert volumeread._fts_query('"two words" AND') == '"two words" "AND"*'
+
+
+def test_rejected_match_is_a_400(client, searchable, monkeypatch):
+    monkeypatch.setattr(volumeread, '_fts_query', lambda text: 'unterminated "' if text else '')
+    response = search(client, 'anything')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid search query'}
+
+
+def ordered_titles(response):
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return [article['title'] for article in response.get_json()['articles']]
+
+
+def test_rare_searches_are_ranked_by_relevance(client, make_feed):
+    make_feed([('Dirigible news', 'first flight'), ('Weekly roundup', 'also a dirigible')])
+    assert ordered_titles(search(client, 'dirigible')) == ['Dirigible news', 'Weekly roundup']
+
+
+def test_common_searches_list_their_newest_matches(client, make_feed, monkeypatch):
+    make_feed([(f'Zeppelin log {i}', 'airship') for i in range(6)])
+    monkeypatch.setattr(volumeread, 'SEARCH_RANK_CANDIDATES', 4)
+    assert ordered_titles(search(client, 'zeppelin')) == [f'Zeppelin log {i}' for i in (5, 4, 3, 2)]
+
+
+def test_feed_title_match_treats_like_wildcards_literally(app, client, make_feed):
+    feed_id = make_feed([('Quarterly figures', 'numbers')])
+    with app.app_context():
+        volumeread.db.session.get(volumeread.Feed, feed_id).title = 'Growth 100% club'
+        volumeread.db.session.commit()
+    assert 'Quarterly figures' in titles(search(client, '100%'))
+    assert 'Quarterly figures' not in titles(search(client, 'growth_100'))
+    assert 'Quarterly figures' not in titles(search(client, '1%0'))
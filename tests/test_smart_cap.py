@@ -0,0 +1,43 @@
+import datetime
+
+import pytest
+
+import app as volumeread
+
+CAP = volumeread.SMART_CAP_SIZE
+
+
+def ingest(feed_id, count, start=0):
+    base = datetime.datetime(2026, 3, 1)
+    articles = [{'title': f'Capped {i}', 'link': f'https://capped.example/{feed_id}/{i}', 'summary': '', 'full_content': '',
+                 'image_url': None, 'author': 'Tester', 'published': base + datetime.timedelta(hours=i)}
+                for i in range(start, start + count)]
+    volumeread._insert_new_articles(feed_id, articles)
+    volumeread.db.session.commit()
+
+
+def capped_titles(feed_id):
+    query, order_by, _ = volumeread._articles_query('all', smart_cap=True)
+    return [a.title for a in query.filter(volumeread.Article.feed_id == feed_id).order_by(*order_by)]
+
+
+@pytest.mark.parametrize('count', [CAP - 1, CAP, CAP + 1])
+def test_all_view_lists_at_most_the_newest_cap_per_feed(app, make_feed, count):
+    feed_id = make_feed([])
+    with app.app_context():
+        ingest(feed_id, count)
+        assert capped_titles(feed_id) == [f'Capped {i}' for i in reversed(range(count))][:CAP]
+
+
+def test_new_articles_push_the_oldest_out_of_the_cap(app, make_feed):
+    feed_id = make_feed([])
+    with app.app_context():
+        ingest(feed_id, CAP)
+        ingest(feed_id, 2, start=CAP)
+        assert capped_titles(feed_id) == [f'Capped {i}' for i in reversed(range(2, CAP + 2))]
+        ranks = dict(volumeread.db.session.query(volumeread.Article.id, volumeread.Article.feed_rank).filter_by(feed_id=feed_id))
+
+        # The startup re-rank over all feeds agrees with the per-feed one done at ingest
+        volumeread.rerank_all_feeds()
+        assert dict(volumeread.db.session.query(volumeread.Article.id, volumeread.Article.feed_rank).filter_by(feed_id=feed_id)) == ranks
+        assert sorted(rank for rank in ranks.values() if rank) == list(range(1, CAP + 1))
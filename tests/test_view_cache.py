@@ -0,0 +1,49 @@
+import datetime
+
+import app as volumeread
+
+
+def titles(client, view_type, view_id=None, **params):
+    response = client.get('/api/articles', query_string={'view_type': view_type, 'view_id': view_id, 'smart_cap': 'false', **params})
+    return [a['title'] for a in response.get_json()['articles']]
+
+
+def hits():
+    return volumeread.view_cache_stats()['hits']
+
+
+def test_mark_read_drops_the_pages_showing_the_article(app, client, make_feed):
+    feed_id = make_feed([('Cached one', ''), ('Cached two', '')])
+    with app.app_context():
+        category_id = volumeread.db.session.get(volumeread.Feed, feed_id).category_id
+        article_id = volumeread.Article.query.filter_by(feed_id=feed_id, title='Cached one').one().id
+
+    assert sorted(titles(client, 'feed', feed_id, unread_only='true')) == ['Cached one', 'Cached two']
+    before = hits()
+    assert sorted(titles(client, 'feed', feed_id, unread_only='true')) == ['Cached one', 'Cached two']
+    assert hits() == before + 1  # served from the cache
+    titles(client, 'category', category_id, unread_only='true')
+
+    assert client.post(f'/api/article/{article_id}/mark_read').status_code == 200
+    assert titles(client, 'feed', feed_id, unread_only='true') == ['Cached two']
+    assert 'Cached one' not in titles(client, 'category', category_id, unread_only='true')
+    read_flags = {a['title']: a['is_read'] for a in client.get(
+        '/api/articles', query_string={'view_type': 'feed', 'view_id': feed_id}).get_json()['articles']}
+    assert read_flags == {'Cached one': True, 'Cached two': False}
+
+
+def test_refresh_drops_the_pages_of_the_feed(app, client, make_feed):
+    feed_id = make_feed([('Before refresh', '')])
+    with app.app_context():
+        category_id = volumeread.db.session.get(volumeread.Feed, feed_id).category_id
+    assert titles(client, 'feed', feed_id) == ['Before refresh']
+    assert 'Before refresh' in titles(client, 'category', category_id)
+
+    with app.app_context():
+        feed = volumeread.db.session.get(volumeread.Feed, feed_id)
+        volumeread._update_articles_for_feed(feed, [
+            {'title': 'After refresh', 'link': f'https://cache.example/{feed_id}/new', 'summary': '', 'full_content': '',
+             'image_url': None, 'author': 'Tester', 'published': datetime.datetime.now() + datetime.timedelta(minutes=1)}])
+
+    assert titles(client, 'feed', feed_id) == ['After refresh', 'Before refresh']
+    assert titles(client, 'category', category_id)[0] == 'After refresh'
@@ -0,0 +1,57 @@
+import io
+
+import pytest
+
+import app as volumeread
+
+OPML = b'''<?xml version="1.0"?><opml version="1.0"><body>
+<outline text="Imported folder">
+  <outline type="rss" text="Imported one" xmlUrl="https://imported.example/one.xml"/>
+  <outline type="rss" text="Imported two" xmlUrl="https://imported.example/two.xml"/>
+</outline>
+<outline type="rss" text="Loose" xmlUrl="https://imported.example/loose.xml"/>
+</body></opml>'''
+
+
+def written_ops():
+    return volumeread._write_stats['ops']
+
+
+@pytest.mark.parametrize('action, flag', [('mark_read', 'is_read'), ('favorite', 'is_favorite'), ('bookmark', 'is_read_later')])
+def test_article_flags_go_through_the_write_queue(app, client, make_feed, action, flag):
+    make_feed([('Flagged', 'flag me')])
+    with app.app_context():
+        article_id = volumeread.db.session.query(volumeread.func.max(volumeread.Article.id)).scalar()
+
+    before = written_ops()
+    assert client.post(f'/api/article/{article_id}/{action}').status_code == 200
+    assert written_ops() == before + 1
+    with app.app_context():
+        assert getattr(volumeread.db.session.get(volumeread.Article, article_id), flag) is True
+    assert client.post(f'/api/article/{10**9}/{action}').status_code == 404
+
+
+def test_mark_all_read_goes_through_the_write_queue(app, client, make_feed):
+    feed_id = make_feed([(f'Unread {i}', '') for i in range(3)])
+    before = written_ops()
+    response = client.post('/api/mark_all_read', json={'view_type': 'feed', 'view_id': feed_id})
+    assert response.get_json()['updated_count'] == 3
+    assert written_ops() == before + 1
+    with app.app_context():
+        assert volumeread.Article.query.filter_by(feed_id=feed_id, is_read=False).count() == 0
+
+
+def test_import_opml_adds_each_feed_once(app, client):
+    before = written_ops()
+    first = client.post('/api/import_opml', data={'file': (io.BytesIO(OPML), 'feeds.opml')}).get_json()
+    assert first['success'] and first['job_id']
+    assert written_ops() == before + 1
+    with app.app_context():
+        feeds = {feed.url: feed.category.name for feed in volumeread.Feed.query.filter(volumeread.Feed.url.like('https://imported.example/%'))}
+        job = volumeread.db.session.get(volumeread.Job, first['job_id'])
+        assert len(volumeread.json.loads(job.params)['feed_ids']) == 3
+    assert feeds == {'https://imported.example/one.xml': 'Imported folder', 'https://imported.example/two.xml': 'Imported folder',
+                     'https://imported.example/loose.xml': 'Uncategorized'}
+
+    again = client.post('/api/import_opml', data={'file': (io.BytesIO(OPML), 'feeds.opml')}).get_json()
+    assert again['job_id'] is None and again['message'].startswith('Successfully imported 0 feeds')